@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class AccountsConfig(AppConfig):
     name = 'accounts'
+
+    def ready(self):
+        from .backends import invalidate_user
+        from .models import User
+
+        post_save.connect(invalidate_user, sender=User, dispatch_uid='accounts_user_cache_save')
+        post_delete.connect(invalidate_user, sender=User, dispatch_uid='accounts_user_cache_delete')
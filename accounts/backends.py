@@ -0,0 +1,133 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied
+from django.db import DEFAULT_DB_ALIAS, transaction
+from graphql_jwt.backends import JSONWebTokenBackend
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.settings import jwt_settings
+from graphql_jwt.utils import get_credentials, get_payload
+
+from core.throttling import Throttled
+from core.utils import LRUCache
+from .models import User
+from .passwords import HashingPoolBusy, hash_password, throttle_password_attempt, verify_password
+
+USER_KEY_PREFIX = 'accounts:user:'
+
+claims_cache = LRUCache(maxsize=getattr(settings, 'GRAPHQL_JWT_CLAIMS_CACHE_SIZE', 1024))
+
+
+def get_cached_payload(token, context=None):
+    """Decode and verify `token` once and reuse its claims until it expires.
+
+    Tokens past their `exp` claim are verified again, so the usual
+    "Signature has expired" error is raised.
+    """
+    payload = claims_cache.get(token)
+    if payload is not None:
+        if not jwt_settings.JWT_VERIFY_EXPIRATION or \
+                payload.get('exp', 0) + jwt_settings.JWT_LEEWAY > time.time():
+            return payload
+        claims_cache.delete(token)
+    payload = get_payload(token, context)
+    claims_cache.set(token, payload)
+    return payload
+
+
+def get_user_cache():
+    return caches[getattr(settings, 'GRAPHQL_USER_CACHE_ALIAS', 'default')]
+
+
+def get_user_key(username):
+    return f'{USER_KEY_PREFIX}{username}'
+
+
+def get_cached_user(username):
+    """Return the user with the natural key `username` or None.
+
+    Users are kept `GRAPHQL_USER_CACHE_TIMEOUT` seconds and dropped from the
+    cache whenever they are saved or deleted, see `invalidate_user`. They
+    are read from the primary database, a lagging replica could cache a
+    deactivated user again. Unknown users are not cached.
+    """
+    cache, key = get_user_cache(), get_user_key(username)
+    user = cache.get(key)
+    if user is None:
+        try:
+            user = User.objects.db_manager(DEFAULT_DB_ALIAS).get_by_natural_key(username)
+        except User.DoesNotExist:
+            return None
+        cache.set(key, user, getattr(settings, 'GRAPHQL_USER_CACHE_TIMEOUT', 60))
+    return user
+
+
+def invalidate_user(sender, instance, **kwargs):
+    """`post_save`/`post_delete` receiver dropping cached copies of a user,
+    under its current and its previous natural key."""
+    usernames = {instance.get_username(), getattr(instance, '_loaded_username', None)}
+    keys = [get_user_key(username) for username in usernames if username]
+    get_user_cache().delete_many(keys)
+    # a concurrent request may have cached the old row before the commit
+    transaction.on_commit(lambda: get_user_cache().delete_many(keys), using=kwargs.get('using'))
+
+
+class CachedJSONWebTokenBackend(JSONWebTokenBackend):
+    """`JSONWebTokenBackend` skipping signature verification and the user
+    query for tokens seen recently."""
+
+    def authenticate(self, request=None, skip_jwt_backend=False, **kwargs):
+        if request is None or skip_jwt_backend:
+            return None
+
+        token = get_credentials(request, **kwargs)
+        if token is None:
+            return None
+
+        payload = get_cached_payload(token, request)
+        username = jwt_settings.JWT_PAYLOAD_GET_USERNAME_HANDLER(payload)
+        if not username:
+            raise JSONWebTokenError('Invalid payload')
+
+        user = get_cached_user(username)
+        if user is not None and not user.is_active:
+            raise JSONWebTokenError('User is disabled')
+        return user
+
+    def get_user(self, user_id):
+        return get_cached_user(user_id)
+
+
+class PasswordHashingPoolBackend(ModelBackend):
+    """`ModelBackend` throttling password attempts and verifying passwords in
+    the hashing pool, see `accounts.passwords`.
+
+    Failed attempts raise `PermissionDenied`, so no later backend verifies
+    the password again in the request thread. Throttled attempts and those
+    the busy pool rejects too, as `authenticate()` only handles
+    `PermissionDenied` (the admin login would fail otherwise); their error
+    is kept as `request.password_attempt_error` for the `tokenAuth`
+    mutation to report.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            throttle_password_attempt(request, username)
+            try:
+                user = User._default_manager.get_by_natural_key(username)
+            except User.DoesNotExist:
+                # as long as for an existing user, see `ModelBackend.authenticate`
+                hash_password(password)
+            else:
+                if verify_password(user, password) and self.user_can_authenticate(user):
+                    return user
+        except (Throttled, HashingPoolBusy) as e:
+            if request is not None:
+                request.password_attempt_error = e
+        raise PermissionDenied
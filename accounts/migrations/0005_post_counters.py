@@ -0,0 +1,52 @@
+# Generated by Django 2.2.3 on 2026-10-18 01:55
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+POST_STATUS_COUNTERS = {1: 'draft_post_count', 2: 'published_post_count', 3: 'archived_post_count'}
+
+
+def count_posts(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Post = apps.get_model('blog', 'Post')
+    posts = Post.objects.filter(author_id=OuterRef('pk')).order_by().values('author_id')
+
+    def count(posts):
+        return Coalesce(Subquery(posts.annotate(count=Count('pk')).values('count')), 0)
+
+    User.objects.update(post_count=count(posts), **{
+        field: count(posts.filter(status=status)) for status, field in POST_STATUS_COUNTERS.items()
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_auto_20190731_1257'),
+        ('blog', '0004_auto_20261018_0151'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='archived_post_count',
+            field=models.IntegerField(default=0, editable=False, help_text='Number of archived posts of the user'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='draft_post_count',
+            field=models.IntegerField(default=0, editable=False, help_text='Number of draft posts of the user'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='post_count',
+            field=models.IntegerField(default=0, editable=False, help_text='Number of posts of the user'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='published_post_count',
+            field=models.IntegerField(default=0, editable=False, help_text='Number of published posts of the user'),
+        ),
+        migrations.RunPython(count_posts, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,31 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.db import models
 
+# pks of the users whose deletion is in progress, receivers of cascaded
+# deletes may skip work on rows about to disappear with them
+deleting_users = ContextVar('deleting_users', default=frozenset())
+
+
+@contextmanager
+def deleting(pks):
+    token = deleting_users.set(deleting_users.get() | set(pks))
+    try:
+        yield
+    finally:
+        deleting_users.reset(token)
+
+
+class UserQuerySet(models.QuerySet):
+
+    def delete(self):
+        with deleting(self.values_list('pk', flat=True)):
+            return super().delete()
+
 
-class UserManager(BaseUserManager):
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     def create_user(self, email, username, password, is_active=True, is_staff=False, is_admin=False):
         if not email:
             raise ValueError("User must contain an email")
@@ -46,12 +69,48 @@ class User(AbstractBaseUser):
     is_staff = models.BooleanField(default=False)
     is_admin = models.BooleanField(default=False)
 
+    # maintained by `blog.counters`
+    post_count = models.IntegerField(default=0, editable=False, help_text='Number of posts of the user')
+    draft_post_count = models.IntegerField(default=0, editable=False, help_text='Number of draft posts of the user')
+    published_post_count = models.IntegerField(
+        default=0, editable=False, help_text='Number of published posts of the user')
+    archived_post_count = models.IntegerField(
+        default=0, editable=False, help_text='Number of archived posts of the user')
+
+    POST_COUNTER_FIELDS = ('post_count', 'draft_post_count', 'published_post_count', 'archived_post_count')
+
     USERNAME_FIELD = 'email'
 
     REQUIRED_FIELDS = ['username']
 
     objects = UserManager()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        # cached copies are stored under the natural key the user was loaded with
+        user._loaded_username = user.__dict__.get(cls.USERNAME_FIELD)
+        return user
+
+    def save(self, *args, **kwargs):
+        # counters are only written with F() expressions, saving a copy
+        # loaded earlier must not overwrite changes made since. Unlike
+        # `Model.save()`, saving a user whose row was deleted therefore
+        # raises `DatabaseError` instead of inserting it again, pass
+        # `force_insert=True` to recreate it.
+        if not self._state.adding and not args and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.POST_COUNTER_FIELDS and f.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with deleting([self.pk]):
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         return self.get_full_name()
 
@@ -1,7 +1,25 @@
+from contextlib import contextmanager
+
 import graphene
+import graphql_jwt
+from graphql import GraphQLError
+from graphql_jwt.exceptions import JSONWebTokenError
 
 from core.mutations import ModelMutation, ModelDeleteMutation, BaseInput
+from core.throttling import Throttled
 from .models import User
+from .passwords import HashingPoolBusy, hash_password, throttle_password_attempt
+from .types import UserType  # noqa: F401 registers the output type
+
+
+@contextmanager
+def report_rejected_attempts():
+    """Fail with a GraphQL error when a password attempt is throttled or the
+    hashing pool is busy."""
+    try:
+        yield
+    except (Throttled, HashingPoolBusy) as e:
+        raise GraphQLError(str(e)) from e
 
 
 class UserInput(BaseInput):
@@ -25,11 +43,28 @@ class RegisterUser(ModelMutation):
 
     @classmethod
     def save(cls, info, user: User, cleaned_input: dict):
-        password = cleaned_input['password']
-        user.set_password(password)
+        with report_rejected_attempts():
+            throttle_password_attempt(info.context)
+            user.password = hash_password(cleaned_input['password'])
         user.save()
 
 
+class ObtainJSONWebToken(graphql_jwt.ObtainJSONWebToken):
+    """Obtain JSON Web Token mutation"""
+
+    @classmethod
+    def mutate(cls, root, info, **kwargs):
+        try:
+            return super().mutate(root, info, **kwargs)
+        except JSONWebTokenError:
+            # the authentication backend rejected the attempt without
+            # verifying the password, see `PasswordHashingPoolBackend`
+            error = getattr(info.context, 'password_attempt_error', None)
+            if error is None:
+                raise
+            raise GraphQLError(str(error)) from error
+
+
 class UpdateUser(ModelMutation):
     class Arguments:
         id = graphene.ID(description='User id for update', required=True)
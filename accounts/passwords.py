@@ -0,0 +1,139 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from threading import Lock
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+from core.metrics import Counter, Gauge, Histogram, registry
+from core.throttling import Throttle, Throttled, get_client_ip
+
+hashing_duration = registry.register(Histogram(
+    'accounts_password_hashing_seconds', 'Time spent hashing or verifying a password in the hashing pool.',
+    ('operation',), buckets=(.01, .025, .05, .1, .25, .5, 1, 2.5),
+))
+hashing_rejected = registry.register(Counter(
+    'accounts_password_hashing_rejected', 'Password hashing calls rejected because the pool queue was full.',
+    ('operation',),
+))
+login_throttled = registry.register(Counter(
+    'accounts_password_attempts_throttled', 'Password attempts rejected by a throttle.', ('scope',),
+))
+
+
+class HashingPoolBusy(Exception):
+
+    def __init__(self):
+        super().__init__('The server is busy, try again later.')
+
+
+class HashingPool:
+    """Bounded pool of threads hashing and verifying passwords.
+
+    PBKDF2 releases the GIL, so at most `workers` cores hash passwords no
+    matter how many requests are served. Up to `max_queue` calls wait for a
+    worker, further calls fail right away with `HashingPoolBusy`.
+    """
+
+    def __init__(self, workers, max_queue):
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self._lock = Lock()
+
+    @property
+    def queue_depth(self):
+        return max(self.pending - self.workers, 0)
+
+    def run(self, operation, fn, *args):
+        """Run `fn(*args)` in the pool and wait for its result."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                hashing_rejected.inc(operation)
+                raise HashingPoolBusy()
+            self.pending += 1
+        try:
+            return self.executor.submit(self.timed, operation, fn, *args).result()
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    @staticmethod
+    def timed(operation, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            hashing_duration.observe(time.perf_counter() - started, operation)
+
+
+_pool = None
+_pool_lock = Lock()
+
+
+def get_hashing_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    workers=getattr(settings, 'GRAPHQL_PASSWORD_HASHING_WORKERS', 2),
+                    max_queue=getattr(settings, 'GRAPHQL_PASSWORD_HASHING_QUEUE_SIZE', 8),
+                )
+    return _pool
+
+
+hashing_queue_depth = registry.register(Gauge(
+    'accounts_password_hashing_queue_depth', 'Password hashing calls waiting for a worker of the pool.',
+    function=lambda: _pool.queue_depth if _pool is not None else 0,
+))
+
+
+def hash_password(password):
+    return get_hashing_pool().run('hash', make_password, password)
+
+
+def verify_password(user, password):
+    """`user.check_password()` verifying in the hashing pool.
+
+    A hash made with outdated parameters is replaced by a new one and saved,
+    as `check_password()` does.
+    """
+    outdated = []
+    valid = get_hashing_pool().run('verify', check_password, password, user.password, outdated.append)
+    if valid and outdated:
+        user.password = hash_password(password)
+        user.save(update_fields=['password'])
+    return valid
+
+
+@lru_cache(maxsize=None)
+def get_throttle(scope, burst, period):
+    return Throttle(burst, period)
+
+
+def throttle_password_attempt(request, username=None):
+    """Count a password attempt from the IP of `request` and, when given, on
+    the account `username` against `GRAPHQL_PASSWORD_THROTTLES`.
+
+    Raises `Throttled` without hashing anything once a bucket is exhausted.
+    Attempts on an account are counted from all IPs, so spreading them over
+    many IPs doesn't help, and separately from each IP at a tighter rate, so
+    a single client is throttled long before the owner is locked out.
+    """
+    rates = getattr(settings, 'GRAPHQL_PASSWORD_THROTTLES',
+                    {'ip': (20, 60), 'account_ip': (5, 60), 'account': (30, 300)})
+    ip = get_client_ip(request) if request is not None else None
+    keys = {'ip': ip}
+    if username:
+        keys['account_ip'] = (username.lower(), ip)
+        keys['account'] = username.lower()
+    for scope, key in keys.items():
+        if key is not None and rates.get(scope):
+            try:
+                get_throttle(scope, *rates[scope]).consume(key)
+            except Throttled:
+                login_throttled.inc(scope)
+                raise
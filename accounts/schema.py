@@ -2,6 +2,9 @@ from __future__ import annotations
 
 import graphene
 
+from core.cost import FieldCost
+from core.fields import KeysetConnectionField
+from core.optimizer import optimize_queryset
 from .models import User
 from .mutations import (
     RegisterUser,
@@ -17,13 +20,19 @@ class UserQuery(graphene.ObjectType):
         id=graphene.Argument(graphene.ID, required=True)
     )
     current_user = graphene.Field(UserType)
-    all_users = graphene.List(UserType)
+    all_users = KeysetConnectionField(UserType._meta.connection, ordering=('id',))
+
+    field_costs = {
+        'user': FieldCost(cost=1),
+        'current_user': FieldCost(cost=0),
+        'all_users': FieldCost(cost=2),
+    }
 
     def resolve_user(self, info: graphene.ResolveInfo, id: graphene.ID):
-        return User.objects.get(id=id) if id else None
+        return optimize_queryset(User.objects.all(), info).get(id=id) if id else None
 
     def resolve_all_users(self, info: graphene.ResolveInfo, **kwargs):
-        return User.objects.all()
+        return optimize_queryset(User.objects.all(), info)
 
     def resolve_current_user(self, info: graphene.ResolveInfo):
         user = info.context.user
@@ -0,0 +1,45 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client, override_settings
+from graphql_jwt.shortcuts import get_token
+
+from .backends import claims_cache, get_user_cache
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class CachedJSONWebTokenBackendTestCase(TestCase):
+
+    def setUp(self):
+        self._client = Client()
+        claims_cache.clear()
+        get_user_cache().clear()
+        self.user = get_user_model().objects.create_user(username='test', password='test', email='test@test.com')
+        self.token = get_token(self.user)
+
+    def current_user(self, token):
+        response = self._client.post(
+            '/graphql', json.dumps({'query': '{ currentUser { username } }'}),
+            content_type='application/json', HTTP_AUTHORIZATION=f'JWT {token}')
+        return json.loads(response.content.decode())
+
+    def test_token_and_user_are_cached(self):
+        self.assertEqual(self.current_user(self.token)['data'], {'currentUser': {'username': 'test'}})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.current_user(self.token)['data'], {'currentUser': {'username': 'test'}})
+        self.assertEqual(claims_cache.stats()['hits'], 1)
+
+    def test_updated_user_is_reloaded(self):
+        self.current_user(self.token)
+        self.user.username = 'updated'
+        self.user.save()
+        self.assertEqual(self.current_user(self.token)['data'], {'currentUser': {'username': 'updated'}})
+
+    def test_deactivated_user_is_rejected(self):
+        self.current_user(self.token)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.current_user(self.token)['errors'][0]['message'], 'User is disabled')
+
+    def test_invalid_token_is_rejected(self):
+        self.assertEqual(self.current_user('invalid')['errors'][0]['message'], 'Error decoding signature')
@@ -0,0 +1,125 @@
+import json
+from threading import Event, Thread
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import Client, TestCase, override_settings
+
+from core.metrics import registry
+from core.throttling import Throttle, Throttled
+from .passwords import HashingPool, HashingPoolBusy, get_throttle, verify_password
+
+TOKEN_AUTH = 'mutation tokenAuth($password: String!) { tokenAuth(email: "test@test.com", password: $password) { token } }'
+
+
+class ThrottleTestCase(TestCase):
+
+    def test_bucket_refills(self):
+        throttle = Throttle(burst=2, period=10)
+        throttle.consume('key', now=0)
+        throttle.consume('key', now=0)
+        with self.assertRaises(Throttled) as raised:
+            throttle.consume('key', now=1)
+        self.assertAlmostEqual(raised.exception.wait, 4)
+        throttle.consume('other', now=1)
+        throttle.consume('key', now=5)
+
+
+class HashingPoolTestCase(TestCase):
+
+    def test_full_queue_is_rejected(self):
+        pool = HashingPool(workers=1, max_queue=1)
+        started, release = Event(), Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        threads = [Thread(target=pool.run, args=('hash', block)) for _ in range(2)]
+        threads[0].start()
+        started.wait(5)
+        threads[1].start()
+        while pool.queue_depth < 1:
+            pass
+        with self.assertRaises(HashingPoolBusy):
+            pool.run('hash', block)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(pool.pending, 0)
+
+    def test_outdated_hash_is_upgraded(self):
+        user = get_user_model().objects.create_user(username='test', password='test', email='test@test.com')
+        user.password = make_password('secret', hasher='pbkdf2_sha1')
+        user.save()
+        self.assertFalse(verify_password(user, 'wrong'))
+        self.assertTrue(verify_password(user, 'secret'))
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class PasswordAttemptsTestCase(TestCase):
+
+    def setUp(self):
+        self._client = Client()
+        get_throttle.cache_clear()
+        self.user = get_user_model().objects.create_user(username='test', password='secret', email='test@test.com')
+
+    def query(self, query, variables):
+        response = self._client.post(
+            '/graphql', json.dumps({'query': query, 'variables': variables}), content_type='application/json')
+        return json.loads(response.content.decode())
+
+    def test_token_auth_verifies_in_the_pool(self):
+        self.assertTrue(self.query(TOKEN_AUTH, {'password': 'secret'})['data']['tokenAuth']['token'])
+        self.assertEqual(self.query(TOKEN_AUTH, {'password': 'wrong'})['errors'][0]['message'],
+                         'Please, enter valid credentials')
+        self.assertIn('accounts_password_hashing_seconds_count{operation="verify"}', registry.render())
+
+    @override_settings(GRAPHQL_PASSWORD_THROTTLES={'ip': (10, 60), 'account': (2, 60)})
+    def test_attempts_are_throttled_per_account(self):
+        # spread over several IPs
+        for address in ('10.0.0.1', '10.0.0.2'):
+            self._client = Client(REMOTE_ADDR=address)
+            self.query(TOKEN_AUTH, {'password': 'wrong'})
+        self._client = Client(REMOTE_ADDR='10.0.0.3')
+        response = self.query(TOKEN_AUTH, {'password': 'secret'})
+        self.assertTrue(response['errors'][0]['message'].startswith('Too many attempts'))
+
+    @override_settings(GRAPHQL_PASSWORD_THROTTLES={'ip': (10, 60), 'account_ip': (2, 60), 'account': (10, 60)})
+    def test_account_is_throttled_per_ip(self):
+        for _ in range(2):
+            self.query(TOKEN_AUTH, {'password': 'wrong'})
+        self.assertIn('errors', self.query(TOKEN_AUTH, {'password': 'secret'}))
+        self._client = Client(REMOTE_ADDR='10.0.0.2')
+        self.assertTrue(self.query(TOKEN_AUTH, {'password': 'secret'})['data']['tokenAuth']['token'])
+
+    @override_settings(GRAPHQL_PASSWORD_THROTTLES={'ip': (1, 60)})
+    def test_throttled_admin_login_is_refused(self):
+        data = {'username': 'test@test.com', 'password': 'secret'}
+        self._client.post('/admin/login/', data)
+        response = self._client.post('/admin/login/', data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+
+    @override_settings(GRAPHQL_PASSWORD_THROTTLES={'ip': (1, 60)}, GRAPHQL_CLIENT_IP_HEADER='HTTP_X_FORWARDED_FOR',
+                       GRAPHQL_TRUSTED_PROXIES=1)
+    def test_ip_is_read_from_the_proxy_header(self):
+        # every request comes from the proxy, the client address is the last one it appended
+        self._client = Client(HTTP_X_FORWARDED_FOR='10.0.0.1')
+        self.assertTrue(self.query(TOKEN_AUTH, {'password': 'secret'})['data']['tokenAuth']['token'])
+        self.assertIn('errors', self.query(TOKEN_AUTH, {'password': 'secret'}))
+        self._client = Client(HTTP_X_FORWARDED_FOR='10.0.0.1, 10.0.0.2')
+        self.assertTrue(self.query(TOKEN_AUTH, {'password': 'secret'})['data']['tokenAuth']['token'])
+
+    @override_settings(GRAPHQL_PASSWORD_THROTTLES={'ip': (1, 60)})
+    def test_registrations_are_throttled_per_ip(self):
+        query = '''mutation registerUser($input: UserRegisterInput!) {
+            registerUser(input: $input) { user { username } errors { message } }
+        }'''
+        response = self.query(query, {'input': {'email': 'new@test.com', 'username': 'new', 'password': 'pw'}})
+        self.assertEqual(response['data']['registerUser']['user'], {'username': 'new'})
+        self.assertTrue(get_user_model().objects.get(email='new@test.com').check_password('pw'))
+        response = self.query(query, {'input': {'email': 'other@test.com', 'username': 'other', 'password': 'pw'}})
+        self.assertTrue(response['errors'][0]['message'].startswith('Too many attempts'))
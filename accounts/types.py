@@ -1,12 +1,27 @@
+import graphene
 from graphene import relay
 from graphene_django import DjangoObjectType
 
+from blog.models import Post
+from core.cost import FieldCost
+from core.dataloaders import batched_reverse_foreign_key
 from .models import User
 
 
 class UserType(DjangoObjectType):
+    posts = graphene.List(
+        graphene.NonNull('blog.types.PostType'),
+        description='Posts written by the user'
+    )
+
     class Meta:
         description = 'Represents a user'
         model = User
         exclude_fields = ['password']
         interfaces = [relay.Node]
+
+    field_costs = {
+        'posts': FieldCost(cost=2, multiplier=20),
+    }
+
+    resolve_posts = batched_reverse_foreign_key(Post, 'author_id')
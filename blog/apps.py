@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save, pre_save
 
 
 class BlogConfig(AppConfig):
     name = 'blog'
+
+    def ready(self):
+        # registers the publishing lag metric
+        from . import publishing  # noqa: F401
+        from .counters import count_deleted_post, count_saved_post, load_old_key
+        from .models import Post
+
+        pre_save.connect(load_old_key, sender=Post, dispatch_uid='blog_post_counters_pre_save')
+        post_save.connect(count_saved_post, sender=Post, dispatch_uid='blog_post_counters_save')
+        post_delete.connect(count_deleted_post, sender=Post, dispatch_uid='blog_post_counters_delete')
@@ -0,0 +1,148 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from accounts.backends import get_user_cache, get_user_key
+from accounts.models import deleting_users
+from core.response_cache import invalidate_model_on_commit
+from .models import Post, PostStatusEnum
+
+TOTAL_COUNTER = 'post_count'
+STATUS_COUNTERS = {
+    PostStatusEnum.DRAFT.value: 'draft_post_count',
+    PostStatusEnum.PUBLISHED.value: 'published_post_count',
+    PostStatusEnum.ARCHIVED.value: 'archived_post_count',
+}
+
+# changes collected by `batch_counter_updates`
+pending_changes = ContextVar('post_counter_changes', default=None)
+
+
+def get_counter_key(post):
+    return post.author_id_id, post.status
+
+
+def add_change(changes, key, delta):
+    author_id, status = key
+    changes[author_id][TOTAL_COUNTER] += delta
+    changes[author_id][STATUS_COUNTERS[status]] += delta
+
+
+def apply_changes(changes):
+    """Add `{author_id: {counter: delta}}` to the counters of the authors
+    with one `UPDATE` per author."""
+    pending = pending_changes.get()
+    if pending is not None:
+        for author_id, deltas in changes.items():
+            for counter, delta in deltas.items():
+                pending[author_id][counter] += delta
+        return
+
+    User = get_user_model()
+    updates = {
+        author_id: {counter: F(counter) + delta for counter, delta in deltas.items() if delta}
+        for author_id, deltas in changes.items() if author_id is not None
+    }
+    updates = {author_id: values for author_id, values in updates.items() if values}
+    if not updates:
+        return
+    for author_id, values in updates.items():
+        User.objects.filter(pk=author_id).update(**values)
+    # `update()` sends no `post_save`, drop cached copies of the authors
+    invalidate_model_on_commit(User)
+    keys = [get_user_key(email) for email in User.objects.filter(pk__in=updates).values_list('email', flat=True)]
+    transaction.on_commit(lambda: get_user_cache().delete_many(keys))
+
+
+def new_changes():
+    return defaultdict(lambda: defaultdict(int))
+
+
+@contextmanager
+def batch_counter_updates():
+    """Apply the counter changes made within at once on exit."""
+    if pending_changes.get() is not None:
+        yield
+        return
+    changes = new_changes()
+    token = pending_changes.set(changes)
+    try:
+        yield
+    finally:
+        pending_changes.reset(token)
+    apply_changes(changes)
+
+
+@contextmanager
+def track_post_counters(posts):
+    """Update the counters for `posts` created or changed within without
+    model signals, e.g. by `bulk_create()`/`bulk_update()`. Posts saved with
+    model signals within were counted by `count_saved_post`."""
+    loaded_keys = [getattr(post, '_loaded_counter_key', None) for post in posts]
+    old_keys = [None if post.pk is None else key for post, key in zip(posts, loaded_keys)]
+    yield
+    changes = new_changes()
+    for post, loaded_key, old_key in zip(posts, loaded_keys, old_keys):
+        if getattr(post, '_loaded_counter_key', None) != loaded_key:
+            continue
+        new_key = get_counter_key(post)
+        if old_key != new_key:
+            if old_key is not None:
+                add_change(changes, old_key, -1)
+            add_change(changes, new_key, 1)
+        post._loaded_counter_key = new_key
+    apply_changes(changes)
+
+
+def load_old_key(sender, instance, raw=False, update_fields=None, **kwargs):
+    """`pre_save` receiver of `Post` loading the counter key of posts loaded
+    without author or status."""
+    if raw or instance._state.adding or None not in (getattr(instance, '_loaded_counter_key', None) or (None,)):
+        return
+    instance._loaded_counter_key = Post.objects.filter(pk=instance.pk).values_list('author_id', 'status').first()
+
+
+def count_saved_post(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """`post_save` receiver of `Post`."""
+    if raw or update_fields is not None and not {'author_id', 'status'} & set(update_fields):
+        return
+    old_key = None if created else getattr(instance, '_loaded_counter_key', None)
+    new_key = get_counter_key(instance)
+    if old_key != new_key:
+        changes = new_changes()
+        if old_key is not None:
+            add_change(changes, old_key, -1)
+        add_change(changes, new_key, 1)
+        apply_changes(changes)
+    instance._loaded_counter_key = new_key
+
+
+def count_deleted_post(sender, instance, **kwargs):
+    """`post_delete` receiver of `Post`, cascaded deletes included."""
+    key = getattr(instance, '_loaded_counter_key', None)
+    if key is None or None in key:
+        key = get_counter_key(instance)
+    # the counters of a deleted author don't matter
+    if key[0] in deleting_users.get():
+        return
+    changes = new_changes()
+    add_change(changes, key, -1)
+    apply_changes(changes)
+
+
+def recount_post_counters(users):
+    """Recompute the counters of `users` (a queryset) from their posts with
+    one `UPDATE`."""
+    posts = Post.objects.filter(author_id=OuterRef('pk')).order_by().values('author_id')
+
+    def count(posts):
+        return Coalesce(Subquery(posts.annotate(count=Count('pk')).values('count')), 0)
+
+    return users.update(**{TOTAL_COUNTER: count(posts)}, **{
+        counter: count(posts.filter(status=status)) for status, counter in STATUS_COUNTERS.items()
+    })
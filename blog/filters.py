@@ -0,0 +1,15 @@
+import django_filters
+from graphene_django.filter import GlobalIDFilter
+
+from .models import Post, PostStatusEnum
+
+
+class PostFilter(django_filters.FilterSet):
+    status = django_filters.TypedChoiceFilter(choices=PostStatusEnum.choices(), coerce=int)
+    author_id = GlobalIDFilter()
+    published_after = django_filters.DateTimeFilter(field_name='publish_date', lookup_expr='gte')
+    published_before = django_filters.DateTimeFilter(field_name='publish_date', lookup_expr='lt')
+
+    class Meta:
+        model = Post
+        fields = ['status', 'author_id']
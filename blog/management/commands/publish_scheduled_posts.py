@@ -0,0 +1,66 @@
+import os
+import signal
+import socket
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from blog.publishing import get_publish_lag, publish_due_posts
+from core.leases import acquire_lease, release_lease
+
+LEASE_NAME = 'blog.publish_scheduled_posts'
+
+
+class Command(BaseCommand):
+    help = (
+        'Publish drafts whose publish date has passed, polling every `--interval` seconds. '
+        'Any number of instances may run, a lease in the database lets only one of them publish.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Posts published by one UPDATE')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds between two runs')
+        parser.add_argument('--lease', type=float, default=None,
+                            help='Seconds the lease is held without renewal, three intervals by default')
+        parser.add_argument('--once', action='store_true', help='Run once and exit')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        lease = timedelta(seconds=options['lease'] or 3 * interval)
+        owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}'
+        self.stopping = False
+        if not options['once']:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        try:
+            while not self.stopping:
+                if acquire_lease(LEASE_NAME, owner, lease):
+                    self.publish(owner, lease, options['batch_size'])
+                elif options['once']:
+                    self.stdout.write('Another instance holds the lease')
+                if options['once']:
+                    break
+                self.sleep(interval)
+        finally:
+            release_lease(LEASE_NAME, owner)
+
+    def publish(self, owner, lease, batch_size):
+        lag = get_publish_lag()
+        started = time.perf_counter()
+        # renewed before every batch, stop as soon as another instance took over
+        published = publish_due_posts(
+            batch_size, should_continue=lambda: not self.stopping and acquire_lease(LEASE_NAME, owner, lease))
+        if published:
+            self.stdout.write(
+                f'Published {published} posts in {time.perf_counter() - started:.3f}s, lag was {lag:.1f}s')
+
+    def sleep(self, seconds):
+        deadline = time.monotonic() + seconds
+        while not self.stopping and time.monotonic() < deadline:
+            time.sleep(min(1, deadline - time.monotonic()))
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.counters import recount_post_counters
+from core.response_cache import invalidate_model
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the post counters of every user from their posts, one transaction per batch of users. '
+        'Posts written while a batch is recounted may be missed, run it again when in doubt.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users recounted by one UPDATE')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        last_pk, repaired = None, 0
+        while True:
+            users = User.objects.order_by('pk')
+            if last_pk is not None:
+                users = users.filter(pk__gt=last_pk)
+            pks = list(users.values_list('pk', flat=True)[:options['batch_size']])
+            if not pks:
+                break
+            with transaction.atomic():
+                repaired += recount_post_counters(User.objects.filter(pk__in=pks))
+            last_pk = pks[-1]
+        invalidate_model(User)
+        self.stdout.write(f'Recounted the posts of {repaired} users')
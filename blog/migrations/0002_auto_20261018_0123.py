@@ -0,0 +1,27 @@
+# Generated by Django 2.2.3 on 2026-10-18 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='post',
+            old_name='author',
+            new_name='author_id',
+        ),
+        migrations.RenameField(
+            model_name='post',
+            old_name='published_date',
+            new_name='publish_date',
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['created', 'id'], name='blog_post_created_9d24f0_idx'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+from django.db import migrations
+
+# Full-text index of `Post.title` and `Post.body`, kept up to date by
+# triggers so bulk inserts and queryset updates are indexed as well. Django
+# rebuilds tables altered on SQLite, which drops their triggers: migrations
+# altering `blog_post` there have to run `SQLITE_TRIGGERS` again.
+
+POSTGRESQL_SEARCH_VECTOR = (
+    "setweight(to_tsvector('pg_catalog.english', coalesce({table}.title, '')), 'A') || "
+    "setweight(to_tsvector('pg_catalog.english', coalesce({table}.body, '')), 'B')"
+)
+
+POSTGRESQL_CREATE = [
+    'ALTER TABLE blog_post ADD COLUMN search_vector tsvector',
+    f'''
+    CREATE FUNCTION blog_post_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {POSTGRESQL_SEARCH_VECTOR.format(table='NEW')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE TRIGGER blog_post_search_vector_update BEFORE INSERT OR UPDATE OF title, body ON blog_post
+    FOR EACH ROW EXECUTE PROCEDURE blog_post_search_vector_update()
+    ''',
+    f'UPDATE blog_post SET search_vector = {POSTGRESQL_SEARCH_VECTOR.format(table="blog_post")}',
+    'CREATE INDEX blog_post_search_vector_idx ON blog_post USING GIN (search_vector)',
+]
+
+POSTGRESQL_DROP = [
+    'DROP TRIGGER blog_post_search_vector_update ON blog_post',
+    'DROP FUNCTION blog_post_search_vector_update()',
+    'ALTER TABLE blog_post DROP COLUMN search_vector',
+]
+
+SQLITE_TRIGGERS = [
+    '''
+    CREATE TRIGGER blog_post_fts_insert AFTER INSERT ON blog_post BEGIN
+        INSERT INTO blog_post_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    ''',
+    '''
+    CREATE TRIGGER blog_post_fts_delete AFTER DELETE ON blog_post BEGIN
+        INSERT INTO blog_post_fts(blog_post_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END
+    ''',
+    '''
+    CREATE TRIGGER blog_post_fts_update AFTER UPDATE OF title, body ON blog_post BEGIN
+        INSERT INTO blog_post_fts(blog_post_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO blog_post_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    ''',
+]
+
+SQLITE_CREATE = [
+    # external content table, only the inverted index is stored
+    '''
+    CREATE VIRTUAL TABLE blog_post_fts USING fts5(
+        title, body, content='blog_post', content_rowid='id', tokenize='porter unicode61'
+    )
+    ''',
+    *SQLITE_TRIGGERS,
+    "INSERT INTO blog_post_fts(blog_post_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    'DROP TRIGGER blog_post_fts_insert',
+    'DROP TRIGGER blog_post_fts_delete',
+    'DROP TRIGGER blog_post_fts_update',
+    'DROP TABLE blog_post_fts',
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_auto_20261018_0123'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({'postgresql': POSTGRESQL_CREATE, 'sqlite': SQLITE_CREATE}),
+            run_for_vendor({'postgresql': POSTGRESQL_DROP, 'sqlite': SQLITE_DROP}),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.3 on 2026-10-18 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', 'publish_date', 'id'], name='blog_post_status_50300b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author_id', 'created', 'id'], name='blog_post_author__bfb764_idx'),
+        ),
+    ]
@@ -9,15 +9,9 @@ class PostStatusEnum(Enum):
     PUBLISHED = 2
     ARCHIVED = 3
 
-    @classmethod
-    def label(cls):
-        import ipdb;
-        ipdb.set_trace()
-        return {
-            cls.DRAFT.value: 'Draft',
-            cls.PUBLISHED.value: 'Published',
-            cls.ARCHIVED.value: 'Archived',
-        }[cls.value]
+    @property
+    def label(self):
+        return dict(self.choices())[self.value]
 
     @classmethod
     def choices(cls):
@@ -37,5 +31,21 @@ class Post(models.Model):
     publish_date = models.DateTimeField(blank=True, default=None, null=True)
     status = models.SmallIntegerField(choices=PostStatusEnum.choices(), default=PostStatusEnum.DRAFT.value)
 
+    class Meta:
+        indexes = [
+            # keyset pagination of `allPosts`, see `PostQuery.all_posts` for
+            # the orderings each index serves
+            models.Index(fields=['created', 'id']),
+            models.Index(fields=['status', 'publish_date', 'id']),
+            models.Index(fields=['author_id', 'created', 'id']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # author counters to decrement once the post is changed or deleted
+        post._loaded_counter_key = (post.__dict__.get('author_id_id'), post.__dict__.get('status'))
+        return post
+
     def __str__(self):
         return self.title
@@ -1,24 +1,28 @@
 import graphene
 
 from accounts.models import User
-from core.mutations import BaseInput, ModelMutation, ModelDeleteMutation
-from .models import Post, PostStatusEnum
+from core.mutations import (
+    BaseInput, BulkModelDeleteMutation, BulkModelMutation, ModelMutation, ModelDeleteMutation)
+from .counters import batch_counter_updates, track_post_counters
+from .models import Post
+from .types import PostType, PostStatus  # noqa: F401 registers the output type
 
 
 class PostInput(BaseInput):
     title = graphene.String(description='Post title')
     body = graphene.String(description='Post body')
     publish_date = graphene.DateTime(description='DateTime when Post will be published')
-    status = graphene.Argument(graphene.Enum.from_enum(
-        PostStatusEnum,
-        description=lambda v: f'{v} status',
-    ))
+    status = graphene.Argument(PostStatus)
 
 
 class PostCreateInput(PostInput):
     author_id = graphene.ID(description='Author id for post', required=True)
 
 
+class PostBulkUpdateInput(PostInput):
+    id = graphene.ID(description='Id of the post to update', required=True)
+
+
 class CreatePost(ModelMutation):
     class Arguments:
         input = PostCreateInput(description='Input for create post')
@@ -53,3 +57,61 @@ class DeletePost(ModelDeleteMutation):
     @classmethod
     def user_is_allowed(cls, user, input=None, id=None):
         return user.is_authenticated and (user.is_admin or user.id == id)
+
+
+class PostCountersMixin:
+    """Update the post counters of authors for bulk writes, which skip the
+    model signals doing so for single posts."""
+
+    @classmethod
+    def bulk_save(cls, info, instances, cleaned_inputs):
+        # posts inserted one by one send `post_save`, update each author once
+        with batch_counter_updates(), track_post_counters(instances):
+            super().bulk_save(info, instances, cleaned_inputs)
+
+    @classmethod
+    def bulk_delete(cls, info, instances):
+        # every deleted post sends `post_delete`, update each author once
+        with batch_counter_updates():
+            super().bulk_delete(info, instances)
+
+
+class BulkCreatePosts(PostCountersMixin, BulkModelMutation):
+    class Arguments:
+        input = graphene.List(graphene.NonNull(PostCreateInput), required=True,
+                              description='Inputs for the posts to create')
+
+    class Meta:
+        model = Post
+        description = 'Mutation for creating many posts at once'
+
+    @classmethod
+    def user_is_allowed(cls, user: User, input: dict = None, id: graphene.ID = None):
+        return user.is_authenticated and (user.is_admin or user.is_staff)
+
+
+class BulkUpdatePosts(PostCountersMixin, BulkModelMutation):
+    class Arguments:
+        input = graphene.List(graphene.NonNull(PostBulkUpdateInput), required=True,
+                              description='Inputs for the posts to update')
+
+    class Meta:
+        model = Post
+        description = 'Mutation for updating many posts at once'
+
+    @classmethod
+    def user_is_allowed(cls, user: User, input: dict = None, id: graphene.ID = None):
+        return user.is_authenticated and (user.is_admin or user.is_staff)
+
+
+class BulkDeletePosts(PostCountersMixin, BulkModelDeleteMutation):
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True, description='Ids of posts to delete')
+
+    class Meta:
+        model = Post
+        description = 'Mutation for deleting many posts at once'
+
+    @classmethod
+    def user_is_allowed(cls, user: User, input: dict = None, id: graphene.ID = None):
+        return user.is_authenticated and (user.is_admin or user.is_staff)
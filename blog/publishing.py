@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from core.metrics import Gauge, registry
+from core.response_cache import invalidate_model_on_commit
+from .counters import add_change, apply_changes, new_changes
+from .models import Post, PostStatusEnum
+
+# sent once the posts of a batch published by `publish_due_posts` are
+# committed; `QuerySet.update()` sends no `post_save`
+posts_published = Signal(providing_args=['post_ids'])
+
+
+def get_due_posts(now):
+    """Drafts whose publish date has passed, served by the
+    `(status, publish_date, id)` index."""
+    return Post.objects.filter(status=PostStatusEnum.DRAFT.value, publish_date__lte=now)
+
+
+def get_publish_lag():
+    """Seconds since the publish date of the longest overdue draft."""
+    now = timezone.now()
+    oldest = get_due_posts(now).order_by('publish_date').values_list('publish_date', flat=True).first()
+    return (now - oldest).total_seconds() if oldest is not None else 0
+
+
+# computed at most every 30 seconds by scrapes of each process, the
+# publisher runs in another process
+publish_lag = registry.register(Gauge(
+    'blog_posts_publish_lag_seconds', 'Time since the longest overdue draft should have been published.',
+    function=get_publish_lag, max_age=30,
+))
+
+
+def publish_due_posts(batch_size, now=None, should_continue=lambda: True):
+    """Publish drafts whose publish date is before `now` in batches of at
+    most `batch_size` posts, one transaction and posts `UPDATE` each. The
+    post counters of the authors are updated in the same transaction.
+
+    `should_continue` is checked before every batch, e.g. to stop once the
+    scheduler lost its lease. Returns the number of published posts.
+    """
+    now = now or timezone.now()
+    published = 0
+    while should_continue():
+        with transaction.atomic():
+            # locked rows are being edited, they are published by a later run
+            due_posts = get_due_posts(now).select_for_update(skip_locked=True).order_by('publish_date', 'id')
+            rows = list(due_posts.values_list('id', 'author_id')[:batch_size])
+            if not rows:
+                break
+            ids = [id for id, _ in rows]
+            count = Post.objects.filter(id__in=ids).update(
+                status=PostStatusEnum.PUBLISHED.value, modified=timezone.now())
+            changes = new_changes()
+            for _, author_id in rows:
+                add_change(changes, (author_id, PostStatusEnum.DRAFT.value), -1)
+                add_change(changes, (author_id, PostStatusEnum.PUBLISHED.value), 1)
+            apply_changes(changes)
+            invalidate_model_on_commit(Post)
+            transaction.on_commit(lambda ids=ids: posts_published.send(sender=Post, post_ids=ids))
+        published += count
+        if len(rows) < batch_size:
+            break
+    return published
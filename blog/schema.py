@@ -1,22 +1,59 @@
 import graphene
 
+from core.cost import FieldCost
+from core.fields import KeysetConnectionField, KeysetOrdering
+from core.optimizer import optimize_queryset
+from .filters import PostFilter
 from .models import Post
-from .mutations import CreatePost, UpdatePost, DeletePost
-from .types import PostType
+from .mutations import (
+    CreatePost, UpdatePost, DeletePost, BulkCreatePosts, BulkUpdatePosts, BulkDeletePosts)
+from .search import search_posts
+from .types import PostType, PostSearchConnection, PostStatus
 
 
 class PostQuery(graphene.ObjectType):
     post = graphene.Field(PostType, id=graphene.ID())
-    all_posts = graphene.List(PostType)
+    all_posts = KeysetConnectionField(
+        PostType._meta.connection,
+        ordering=('created', 'id'),
+        filterset_class=PostFilter,
+        status=PostStatus(),
+        # each ordering is a range scan of an index of `Post.Meta.indexes`,
+        # with `authorId` (author_id, created, id) serves the created ones
+        orderings={
+            'CREATED': KeysetOrdering('created', 'id', description='Oldest first, the default'),
+            'CREATED_DESC': KeysetOrdering('-created', '-id', description='Newest first'),
+            'PUBLISH_DATE': KeysetOrdering(
+                'publish_date', 'id', requires=('status',),
+                description='Earliest published first, posts without a publish date are left out'),
+            'PUBLISH_DATE_DESC': KeysetOrdering(
+                '-publish_date', '-id', requires=('status',),
+                description='Latest published first, posts without a publish date are left out'),
+        },
+    )
+    search_posts = KeysetConnectionField(
+        PostSearchConnection, query=graphene.String(required=True), ordering=('-search_rank', 'id'))
+
+    field_costs = {
+        'post': FieldCost(cost=1),
+        'all_posts': FieldCost(cost=2),
+        'search_posts': FieldCost(cost=5),
+    }
 
     def resolve_post(self, info: graphene.ResolveInfo, id):
-        return Post.objects.get(id=id) if id else None
+        return optimize_queryset(Post.objects.all(), info).get(id=id) if id else None
 
     def resolve_all_posts(self, info: graphene.ResolveInfo, **kwargs):
-        return Post.objects.all()
+        return optimize_queryset(Post.objects.all(), info)
+
+    def resolve_search_posts(self, info: graphene.ResolveInfo, query, **kwargs):
+        return search_posts(optimize_queryset(Post.objects.all(), info), query)
 
 
 class PostMutation(graphene.ObjectType):
     create_post = CreatePost.Field()
     update_post = UpdatePost.Field()
     delete_post = DeletePost.Field()
+    bulk_create_posts = BulkCreatePosts.Field()
+    bulk_update_posts = BulkUpdatePosts.Field()
+    bulk_delete_posts = BulkDeletePosts.Field()
@@ -0,0 +1,95 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+# Maintained by the `0003_post_search_index` migration
+POSTGRESQL_QUERY = "plainto_tsquery('pg_catalog.english', %s)"
+SQLITE_TABLE = 'blog_post_fts'
+
+# The database marks matched terms in snippets with these private use
+# characters, replaced by <b> tags once the post text is escaped
+MATCH_START, MATCH_STOP = '\ue000', '\ue001'
+SNIPPET_START, SNIPPET_STOP = '<b>', '</b>'
+SNIPPET_WORDS = 20
+
+# the title weighs ten times more than the body when ranking SQLite results
+SQLITE_COLUMN_WEIGHTS = (10.0, 1.0)
+
+
+def get_terms(query):
+    return re.findall(r'\w+', query)
+
+
+def search_posts(queryset, query):
+    """Filter `queryset` of posts to the ones matching the full-text `query`.
+
+    Matching posts are annotated with `search_rank` (higher is better) and a
+    `search_snippet` of the body marking the matched terms, see `highlight`. Databases
+    without a full-text index fall back to a substring search without
+    ranking.
+    """
+    terms = get_terms(query)
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+    if not terms:
+        # still annotated, the connection orders by `search_rank`
+        return search_fallback(queryset, table, terms).none()
+    search = {
+        'postgresql': search_postgresql,
+        'sqlite': search_sqlite,
+    }.get(connection.vendor, search_fallback)
+    return search(queryset, table, terms)
+
+
+def highlight(snippet):
+    """Return the HTML of a `search_snippet`: the escaped post text with the
+    matched terms in <b> tags."""
+    if snippet is None:
+        return None
+    return str(escape(snippet)).replace(MATCH_START, SNIPPET_START).replace(MATCH_STOP, SNIPPET_STOP)
+
+
+def search_postgresql(queryset, table, terms):
+    query = ' '.join(terms)
+    headline_options = f'StartSel="{MATCH_START}", StopSel="{MATCH_STOP}", MaxWords={SNIPPET_WORDS}, MinWords=5'
+    return queryset.extra(
+        where=[f'{table}.search_vector @@ {POSTGRESQL_QUERY}'],
+        params=[query],
+    ).annotate(
+        search_rank=RawSQL(f'ts_rank_cd({table}.search_vector, {POSTGRESQL_QUERY})', [query],
+                           output_field=FloatField()),
+        # evaluated after ORDER BY ... LIMIT, only for the returned page
+        search_snippet=RawSQL(
+            f"ts_headline('pg_catalog.english', {table}.body, {POSTGRESQL_QUERY}, %s)",
+            [query, headline_options], output_field=TextField()),
+    )
+
+
+def search_sqlite(queryset, table, terms):
+    # quoted terms can't be mistaken for FTS5 query syntax
+    query = ' '.join(f'"{term}"' for term in terms)
+    weights = ', '.join(str(weight) for weight in SQLITE_COLUMN_WEIGHTS)
+    match = f'FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s AND rowid = {table}.id'
+    return queryset.extra(
+        where=[f'{table}.id IN (SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s)'],
+        params=[query],
+    ).annotate(
+        # bm25() is lower for better matches
+        search_rank=RawSQL(f'SELECT -bm25({SQLITE_TABLE}, {weights}) {match}', [query],
+                           output_field=FloatField()),
+        search_snippet=RawSQL(
+            f"SELECT snippet({SQLITE_TABLE}, 1, %s, %s, '…', {SNIPPET_WORDS}) {match}",
+            [MATCH_START, MATCH_STOP, query], output_field=TextField()),
+    )
+
+
+def search_fallback(queryset, table, terms):
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(body__icontains=term)
+    return queryset.filter(condition).annotate(
+        search_rank=Value(0.0, output_field=FloatField()),
+        search_snippet=Value(None, output_field=TextField()),
+    )
@@ -0,0 +1,131 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.db.models.signals import pre_delete
+from graphql_relay import to_global_id
+
+from core.testing import GraphQlTestHelper
+from .models import Post, PostStatusEnum
+
+DRAFT, PUBLISHED, ARCHIVED = (status.value for status in PostStatusEnum)
+
+
+class PostCountersTestCase(GraphQlTestHelper):
+
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        self.user = User.objects.create_user(username='test', password='test', email='test@test.com', is_admin=True)
+        self.other = User.objects.create_user(username='other', password='test', email='other@test.com')
+        self._client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+
+    def assertCounters(self, user, total, draft, published, archived):
+        user.refresh_from_db()
+        self.assertEqual(
+            (user.post_count, user.draft_post_count, user.published_post_count, user.archived_post_count),
+            (total, draft, published, archived),
+        )
+
+    def test_single_post_changes(self):
+        post = Post.objects.create(title='Post', body='body', author_id=self.user)
+        self.assertCounters(self.user, 1, 1, 0, 0)
+
+        post = Post.objects.only('id', 'title').get(pk=post.pk)
+        post.status = PUBLISHED
+        post.save()
+        self.assertCounters(self.user, 1, 0, 1, 0)
+
+        post.author_id = self.other
+        post.save()
+        self.assertCounters(self.user, 0, 0, 0, 0)
+        self.assertCounters(self.other, 1, 0, 1, 0)
+
+        post.delete()
+        self.assertCounters(self.other, 0, 0, 0, 0)
+
+    def test_mutations(self):
+        response = self.query(
+            '''mutation createPost($input: PostCreateInput!) { createPost(input: $input) { post { id } } }''',
+            variables={'input': {'title': 'Post', 'body': 'body', 'authorId': to_global_id('UserType', self.user.pk)}},
+        )
+        post_id = response['data']['createPost']['post']['id']
+        self.assertCounters(self.user, 1, 1, 0, 0)
+
+        self.query(
+            '''mutation updatePost($id: ID!, $input: PostInput!) { updatePost(id: $id, input: $input) { post { id } } }''',
+            variables={'id': post_id, 'input': {'status': 'ARCHIVED'}},
+        )
+        self.assertCounters(self.user, 1, 0, 0, 1)
+
+        self.query('mutation deletePost($id: ID!) { deletePost(id: $id) { errors { message } } }',
+                   variables={'id': post_id})
+        self.assertCounters(self.user, 0, 0, 0, 0)
+
+    def test_bulk_mutations(self):
+        author_id = to_global_id('UserType', self.other.pk)
+        self.query(
+            '''mutation bulkCreatePosts($input: [PostCreateInput!]!) { bulkCreatePosts(input: $input) { count } }''',
+            variables={'input': [{'title': f'Post {i}', 'body': 'body', 'authorId': author_id} for i in range(3)]},
+        )
+        self.assertCounters(self.other, 3, 3, 0, 0)
+
+        ids = [to_global_id('PostType', pk) for pk in Post.objects.values_list('pk', flat=True)]
+        self.query(
+            '''mutation bulkUpdatePosts($input: [PostBulkUpdateInput!]!) { bulkUpdatePosts(input: $input) { count } }''',
+            variables={'input': [{'id': id, 'status': 'PUBLISHED'} for id in ids[:2]]},
+        )
+        self.assertCounters(self.other, 3, 1, 2, 0)
+
+        self.query('mutation bulkDeletePosts($ids: [ID!]!) { bulkDeletePosts(ids: $ids) { count } }',
+                   variables={'ids': ids[1:]})
+        self.assertCounters(self.other, 1, 0, 1, 0)
+
+    def test_counters_are_fields_of_user(self):
+        Post.objects.create(title='Post', body='body', author_id=self.user, status=PUBLISHED)
+        response = self.query('{ currentUser { postCount draftPostCount publishedPostCount archivedPostCount } }')
+        self.assertResponseNoErrors(response, {'currentUser': {
+            'postCount': 1, 'draftPostCount': 0, 'publishedPostCount': 1, 'archivedPostCount': 0,
+        }})
+
+    def test_saving_a_stale_user_keeps_counters(self):
+        stale = get_user_model().objects.get(pk=self.user.pk)
+        Post.objects.create(title='Post', body='body', author_id=self.user)
+        stale.username = 'renamed'
+        stale.save()
+        self.assertCounters(self.user, 1, 1, 0, 0)
+
+    def test_cascaded_deletes_skip_counters(self):
+        Post.objects.create(title='Post', body='body', author_id=self.other)
+        self.other.delete()
+        self.assertFalse(Post.objects.exists())
+
+    def test_failed_user_delete_keeps_counting(self):
+        post = Post.objects.create(title='Post', body='body', author_id=self.other)
+
+        def fail(sender, **kwargs):
+            raise DatabaseError()
+
+        pre_delete.connect(fail, sender=get_user_model())
+        try:
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                get_user_model().objects.filter(pk=self.other.pk).delete()
+        finally:
+            pre_delete.disconnect(fail, sender=get_user_model())
+        post.delete()
+        self.assertCounters(self.other, 0, 0, 0, 0)
+
+    def test_repair(self):
+        Post.objects.bulk_create([
+            Post(title='Draft', body='body', author_id=self.user, status=DRAFT),
+            Post(title='Archived', body='body', author_id=self.user, status=ARCHIVED),
+            Post(title='Published', body='body', author_id=self.other, status=PUBLISHED),
+        ])
+        self.assertCounters(self.user, 0, 0, 0, 0)
+
+        stdout = StringIO()
+        call_command('repair_post_counters', batch_size=1, stdout=stdout)
+        self.assertIn('Recounted the posts of 2 users', stdout.getvalue())
+        self.assertCounters(self.user, 2, 1, 0, 1)
+        self.assertCounters(self.other, 1, 0, 1, 0)
@@ -1,93 +1,109 @@
 import json
+from datetime import timedelta
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from graphql_relay import from_global_id, to_global_id
 
-from .models import Post
-
-
-class GraphQlTestHelper(TestCase):
-    def setUp(self):
-        self._client = Client()
-
-    def query(self, query: str, op_name: str = None, variables: dict = None):
-        """
-        Args:
-            query (string) - GraphQL query to run
-            op_name (string) - If the query is a mutation or named query, you must supply the op_name.
-                               For anonymous queries ("{ ... }"), should be None (default).
-            variables (dict) - If provided, the all $variable in GraphQL will be set to this value
-
-        Returns:
-            dict, response from graphql endpoint.  The response has the "data" key.
-                  It will have the "error" key if any error happened.
-        """
-        body = {'query': query}
-        if op_name:
-            body['operation_name'] = op_name
-        if variables:
-            body['variables'] = variables
-
-        response = self._client.post('/graphql', json.dumps(body), content_type='application/json')
-        json_response = json.loads(response.content.decode())
-        return json_response
-
-    def assertResponseNoErrors(self, resp: dict, expected: dict):
-        """
-        Assert that the resp (as returned from query) has the data from expected
-        """
-        self.assertNotIn('errors', resp, 'Response had errors')
-        self.assertEqual(resp['data'], expected, 'Response has correct data')
+from core.testing import GraphQlTestHelper
+from .models import Post, PostStatusEnum
 
 
 class PostTestCase(GraphQlTestHelper):
 
     def setUp(self):
         super().setUp()
-        credentials = dict(username='test', password='test')
-        self.user = get_user_model().objects.create_user(**credentials, email='test@test.com')
-        self._client.login(**credentials)
+        self.user = get_user_model().objects.create_user(username='test', password='test', email='test@test.com')
+        self._client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
 
         Post.objects.bulk_create([
             Post(
                 title="First",
                 body="first",
                 author_id=self.user,
-                status=Post.ARCHIVED,
+                status=PostStatusEnum.ARCHIVED.value,
             ), Post(
                 title="Second",
                 body="second",
                 author_id=self.user,
-                status=Post.DRAFT,
+                status=PostStatusEnum.DRAFT.value,
             ), Post(
                 title="Third",
                 body="third",
                 author_id=self.user,
-                status=Post.PUBLISHED,
+                status=PostStatusEnum.PUBLISHED.value,
             )
         ])
 
     def test_get_all_posts(self):
         query = """
             {
-                allPosts {
-                    title
-                    body
-                    status
+                allPosts(first: 10) {
+                    edges {
+                        node {
+                            title
+                            body
+                            status
+                        }
+                    }
                 }
             }
             """
         json_resp = self.query(query)
         self.assertResponseNoErrors(json_resp,
-                                    {'allPosts': [{'title': 'First', 'body': 'first', 'status': 'A_3'},
-                                                  {'title': 'Second', 'body': 'second', 'status': 'A_1'},
-                                                  {'title': 'Third', 'body': 'third', 'status': 'A_2'}]
+                                    {'allPosts': {'edges': [
+                                        {'node': {'title': 'First', 'body': 'first', 'status': 'A_3'}},
+                                        {'node': {'title': 'Second', 'body': 'second', 'status': 'A_1'}},
+                                        {'node': {'title': 'Third', 'body': 'third', 'status': 'A_2'}}]}
                                      })
 
+    def test_all_posts_keyset_pagination(self):
+        query = """
+            query allPosts($first: Int, $last: Int, $after: String, $before: String) {
+                allPosts(first: $first, last: $last, after: $after, before: $before) {
+                    edges {
+                        node {
+                            title
+                        }
+                    }
+                    pageInfo {
+                        hasNextPage
+                        hasPreviousPage
+                        startCursor
+                        endCursor
+                    }
+                }
+            }
+            """
+        first_page = self.query(query, op_name='allPosts', variables={'first': 2})['data']['allPosts']
+        self.assertEqual([e['node']['title'] for e in first_page['edges']], ['First', 'Second'])
+        self.assertTrue(first_page['pageInfo']['hasNextPage'])
+
+        after = first_page['pageInfo']['endCursor']
+        second_page = self.query(query, op_name='allPosts', variables={'first': 2, 'after': after})['data']['allPosts']
+        self.assertEqual([e['node']['title'] for e in second_page['edges']], ['Third'])
+        self.assertFalse(second_page['pageInfo']['hasNextPage'])
+
+        before = second_page['pageInfo']['startCursor']
+        last_page = self.query(query, op_name='allPosts', variables={'last': 1, 'before': before})['data']['allPosts']
+        self.assertEqual([e['node']['title'] for e in last_page['edges']], ['Second'])
+        self.assertTrue(last_page['pageInfo']['hasPreviousPage'])
+
+    def test_all_posts_requires_capped_limit(self):
+        json_resp = self.query('{ allPosts { edges { node { title } } } }')
+        self.assertIn('errors', json_resp)
+        json_resp = self.query('{ allPosts(first: 1000) { edges { node { title } } } }')
+        self.assertIn('errors', json_resp)
+
     def test_create_and_get_post(self):
+        self.user.is_admin = True
+        self.user.save()
         query = """
-            mutation createPost($title: String!, $body: String!) {
-                createPost(title: $title, body: $body) {
+            mutation createPost($input: PostCreateInput!) {
+                createPost(input: $input) {
                     post {
                         id
                         title
@@ -100,25 +116,438 @@ class PostTestCase(GraphQlTestHelper):
         res = {'title': 'Fourth',
                'body': 'fourth',
                'status': 'A_1'}
-        json_resp_create = self.query(query, op_name='createPost', variables={'title': 'Fourth',
-                                                                              'body': 'fourth'})
-        if 'errors' not in json_resp_create:
-            query = """
-                query getPost($id: ID) {
-                    post(id: $id) {
-                        title
-                        body
-                        status
-                    }
+        json_resp_create = self.query(query, op_name='createPost', variables={'input': {
+            'title': 'Fourth', 'body': 'fourth', 'authorId': to_global_id('UserType', self.user.id)}})
+        self.assertNotIn('errors', json_resp_create)
+        query = """
+            query getPost($id: ID) {
+                post(id: $id) {
+                    title
+                    body
+                    status
                 }
-            """
-            id = json_resp_create['data']['createPost']['post']['id']
-            json_resp_get = self.query(query, op_name='getPost', variables={'id': id})
-            self.assertResponseNoErrors(json_resp_get, {'post': {**res}})
-            del json_resp_create['data']['createPost']['post']['id']
+            }
+        """
+        # `post` takes the database id
+        _, id = from_global_id(json_resp_create['data']['createPost']['post'].pop('id'))
+        json_resp_get = self.query(query, op_name='getPost', variables={'id': id})
+        self.assertResponseNoErrors(json_resp_get, {'post': {**res}})
         self.assertResponseNoErrors(json_resp_create, {'createPost': {'post': {**res}}})
 
     def test_graphql_POST(self):
         response = self._client.post('/graphql', json.dumps({'query': "{}"}), content_type='application/json')
-        print(response.content)
-        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('errors', json.loads(response.content.decode()))
+
+
+class PostFilteringTestCase(GraphQlTestHelper):
+
+    filter_query = """
+        query allPosts($status: PostStatusEnum, $authorId: ID, $publishedAfter: DateTime, $orderBy: PostTypeOrderBy,
+                       $after: String) {
+            allPosts(status: $status, authorId: $authorId, publishedAfter: $publishedAfter, orderBy: $orderBy,
+                     first: 2, after: $after) {
+                edges { node { title } }
+                pageInfo { hasNextPage endCursor }
+            }
+        }
+    """
+
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        self.user = User.objects.create_user(username='test', password='test', email='test@test.com')
+        self.other = User.objects.create_user(username='other', password='test', email='other@test.com')
+        now = timezone.now()
+        published = PostStatusEnum.PUBLISHED.value
+        for title, author, status, publish_date in [
+            ('Old', self.user, published, now - timedelta(days=3)),
+            ('Draft', self.user, PostStatusEnum.DRAFT.value, None),
+            ('Recent', self.user, published, now - timedelta(days=1)),
+            ('Other', self.other, published, now - timedelta(days=2)),
+        ]:
+            Post.objects.create(title=title, body=title, author_id=author, status=status, publish_date=publish_date)
+        self.now = now
+
+    def titles(self, **variables):
+        response = self.query(self.filter_query, variables=variables)
+        self.assertNotIn('errors', response)
+        return [edge['node']['title'] for edge in response['data']['allPosts']['edges']]
+
+    def test_filters(self):
+        self.assertEqual(self.titles(status='DRAFT'), ['Draft'])
+        self.assertEqual(self.titles(authorId=to_global_id('UserType', self.other.pk)), ['Other'])
+        published_after = (self.now - timedelta(days=2, hours=1)).isoformat()
+        self.assertEqual(self.titles(publishedAfter=published_after, orderBy='CREATED_DESC'), ['Other', 'Recent'])
+
+    def test_order_by_publish_date(self):
+        response = self.query(self.filter_query, variables={'status': 'PUBLISHED', 'orderBy': 'PUBLISH_DATE_DESC'})
+        connection = response['data']['allPosts']
+        self.assertEqual([edge['node']['title'] for edge in connection['edges']], ['Recent', 'Other'])
+        after = connection['pageInfo']['endCursor']
+        self.assertEqual(self.titles(status='PUBLISHED', orderBy='PUBLISH_DATE_DESC', after=after), ['Old'])
+
+    def test_order_by_publish_date_requires_status(self):
+        response = self.query(self.filter_query, variables={'orderBy': 'PUBLISH_DATE'})
+        self.assertEqual(response['errors'][0]['message'], 'Ordering by PUBLISH_DATE requires the status argument.')
+
+
+class PostAuthorBatchingTestCase(GraphQlTestHelper):
+
+    def setUp(self):
+        super().setUp()
+        users = [
+            get_user_model().objects.create_user(username=f'user{i}', password='test', email=f'user{i}@test.com')
+            for i in range(3)
+        ]
+        Post.objects.bulk_create([
+            Post(title=f'Post {i}', body='body', author_id=users[i % len(users)])
+            for i in range(9)
+        ])
+
+    def test_authors_and_their_posts_are_batched(self):
+        query = """
+            {
+                allPosts(first: 10) {
+                    edges {
+                        node {
+                            title
+                            authorId {
+                                username
+                                posts {
+                                    title
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+            """
+        # posts joined with their authors, then one query for all authors' posts
+        with self.assertNumQueries(2):
+            json_resp = self.query(query)
+        self.assertNotIn('errors', json_resp)
+        first = json_resp['data']['allPosts']['edges'][0]['node']
+        self.assertEqual(first['authorId']['username'], 'user0')
+        self.assertEqual([p['title'] for p in first['authorId']['posts']], ['Post 0', 'Post 3', 'Post 6'])
+
+
+class PostQueryOptimizerTestCase(GraphQlTestHelper):
+
+    def setUp(self):
+        super().setUp()
+        user = get_user_model().objects.create_user(username='test', password='test', email='test@test.com')
+        self.post = Post.objects.create(title='Title', body='body', author_id=user)
+
+    def test_only_selected_columns_are_fetched(self):
+        query = """
+            query getPost($id: ID) {
+                post(id: $id) {
+                    ...PostTitle
+                }
+            }
+
+            fragment PostTitle on PostType {
+                title
+            }
+        """
+        with CaptureQueriesContext(connection) as queries:
+            json_resp = self.query(query, op_name='getPost', variables={'id': self.post.id})
+        self.assertResponseNoErrors(json_resp, {'post': {'title': 'Title'}})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"body"', queries[0]['sql'])
+
+    def test_author_is_joined(self):
+        query = """
+            query getPost($id: ID) {
+                post(id: $id) {
+                    title
+                    authorId {
+                        username
+                    }
+                }
+            }
+        """
+        with self.assertNumQueries(1):
+            json_resp = self.query(query, op_name='getPost', variables={'id': self.post.id})
+        self.assertResponseNoErrors(json_resp, {'post': {'title': 'Title', 'authorId': {'username': 'test'}}})
+
+
+class BulkPostMutationsTestCase(GraphQlTestHelper):
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(
+            username='staff', password='test', email='staff@test.com', is_staff=True)
+        self._client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.author_id = to_global_id('UserType', self.user.id)
+
+    def test_bulk_create_posts(self):
+        query = """
+            mutation bulkCreatePosts($input: [PostCreateInput!]!) {
+                bulkCreatePosts(input: $input) {
+                    count
+                    errors {
+                        index
+                        field
+                        message
+                    }
+                }
+            }
+        """
+        variables = {'input': [{'title': f'Post {i}', 'body': 'body', 'authorId': self.author_id} for i in range(3)]}
+        json_resp = self.query(query, op_name='bulkCreatePosts', variables=variables)
+        self.assertResponseNoErrors(json_resp, {'bulkCreatePosts': {'count': 3, 'errors': []}})
+        self.assertEqual(list(Post.objects.order_by('id').values_list('title', flat=True)),
+                         ['Post 0', 'Post 1', 'Post 2'])
+
+    def test_bulk_create_returns_the_created_posts(self):
+        query = """
+            mutation bulkCreatePosts($input: [PostCreateInput!]!) {
+                bulkCreatePosts(input: $input) {
+                    posts {
+                        id
+                        title
+                    }
+                }
+            }
+        """
+        variables = {'input': [{'title': f'Post {i}', 'body': 'body', 'authorId': self.author_id} for i in range(3)]}
+        json_resp = self.query(query, op_name='bulkCreatePosts', variables=variables)
+        posts = Post.objects.order_by('id')
+        self.assertResponseNoErrors(json_resp, {'bulkCreatePosts': {'posts': [
+            {'id': to_global_id('PostType', post.id), 'title': post.title} for post in posts]}})
+
+    def test_bulk_create_reports_errors_with_index(self):
+        query = """
+            mutation bulkCreatePosts($input: [PostCreateInput!]!) {
+                bulkCreatePosts(input: $input) {
+                    count
+                    errors {
+                        index
+                        field
+                    }
+                }
+            }
+        """
+        variables = {'input': [
+            {'title': 'Valid', 'body': 'body', 'authorId': self.author_id},
+            {'title': 'x' * 51, 'body': 'body', 'authorId': self.author_id},
+        ]}
+        json_resp = self.query(query, op_name='bulkCreatePosts', variables=variables)
+        self.assertResponseNoErrors(json_resp, {'bulkCreatePosts': {
+            'count': 0, 'errors': [{'index': 1, 'field': 'title'}]}})
+        self.assertFalse(Post.objects.exists())
+
+    def test_bulk_update_and_delete_posts(self):
+        posts = [Post.objects.create(title=f'Post {i}', body='body', author_id=self.user) for i in range(3)]
+        ids = [to_global_id('PostType', post.id) for post in posts]
+        query = """
+            mutation bulkUpdatePosts($input: [PostBulkUpdateInput!]!) {
+                bulkUpdatePosts(input: $input) {
+                    count
+                }
+            }
+        """
+        variables = {'input': [{'id': id, 'title': 'Updated', 'body': 'updated'} for id in ids[:2]]}
+        with CaptureQueriesContext(connection) as queries:
+            json_resp = self.query(query, op_name='bulkUpdatePosts', variables=variables)
+        self.assertResponseNoErrors(json_resp, {'bulkUpdatePosts': {'count': 2}})
+        post_queries = [q['sql'] for q in queries if 'blog_post' in q['sql']]
+        self.assertEqual(len(post_queries), 2)  # fetch the posts, then a single UPDATE
+        self.assertTrue(post_queries[1].startswith('UPDATE'))
+        self.assertEqual(Post.objects.filter(title='Updated').count(), 2)
+
+        query = """
+            mutation bulkDeletePosts($ids: [ID!]!) {
+                bulkDeletePosts(ids: $ids) {
+                    count
+                    errors {
+                        index
+                    }
+                }
+            }
+        """
+        missing_id = to_global_id('PostType', 0)
+        json_resp = self.query(query, op_name='bulkDeletePosts', variables={'ids': [ids[0], missing_id]})
+        self.assertResponseNoErrors(json_resp, {'bulkDeletePosts': {'count': 0, 'errors': [{'index': 1}]}})
+
+        json_resp = self.query(query, op_name='bulkDeletePosts', variables={'ids': ids})
+        self.assertResponseNoErrors(json_resp, {'bulkDeletePosts': {'count': 3, 'errors': []}})
+        self.assertFalse(Post.objects.exists())
+
+    def test_repeated_ids_are_rejected(self):
+        post = Post.objects.create(title='Post', body='body', author_id=self.user)
+        id = to_global_id('PostType', post.id)
+        query = """
+            mutation bulkDeletePosts($ids: [ID!]!) {
+                bulkDeletePosts(ids: $ids) {
+                    count
+                    errors {
+                        index
+                        field
+                    }
+                }
+            }
+        """
+        json_resp = self.query(query, op_name='bulkDeletePosts', variables={'ids': [id, id]})
+        self.assertResponseNoErrors(json_resp, {'bulkDeletePosts': {
+            'count': 0, 'errors': [{'index': 1, 'field': 'id'}]}})
+        self.assertTrue(Post.objects.exists())
+
+    @override_settings(GRAPHQL_MAX_BULK_ITEMS=2)
+    def test_max_items(self):
+        query = """
+            mutation bulkCreatePosts($input: [PostCreateInput!]!) {
+                bulkCreatePosts(input: $input) {
+                    count
+                    errors {
+                        message
+                    }
+                }
+            }
+        """
+        variables = {'input': [{'title': f'Post {i}', 'body': 'body', 'authorId': self.author_id} for i in range(3)]}
+        json_resp = self.query(query, op_name='bulkCreatePosts', variables=variables)
+        self.assertResponseNoErrors(json_resp, {'bulkCreatePosts': {
+            'count': 0, 'errors': [{'message': 'At most 2 items are allowed'}]}})
+
+
+class PostMutationsTestCase(GraphQlTestHelper):
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(
+            username='admin', password='test', email='admin@test.com', is_admin=True)
+        self._client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+
+    def test_id_of_another_type_is_rejected(self):
+        post = Post.objects.create(title='Post', body='body', author_id=self.user)
+        query = """
+            mutation createPost($input: PostCreateInput!) {
+                createPost(input: $input) {
+                    post {
+                        id
+                    }
+                    errors {
+                        field
+                        message
+                    }
+                }
+            }
+        """
+        variables = {'input': {'title': 'Title', 'body': 'body', 'authorId': to_global_id('PostType', post.id)}}
+        json_resp = self.query(query, op_name='createPost', variables=variables)
+        self.assertIsNone(json_resp['data']['createPost']['post'])
+        self.assertIn({'field': 'authorId', 'message': 'Must receive a UserType id.'},
+                      json_resp['data']['createPost']['errors'])
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_create_and_update_post(self):
+        query = """
+            mutation createPost($input: PostCreateInput!) {
+                createPost(input: $input) {
+                    post {
+                        id
+                        title
+                    }
+                    errors {
+                        field
+                        message
+                    }
+                }
+            }
+        """
+        variables = {'input': {'title': 'Title', 'body': 'body', 'authorId': to_global_id('UserType', self.user.id)}}
+        json_resp = self.query(query, op_name='createPost', variables=variables)
+        post_id = json_resp['data']['createPost']['post']['id']
+        self.assertEqual(json_resp['data']['createPost']['errors'], [])
+        self.assertEqual(Post.objects.get().author_id, self.user)
+
+        query = """
+            mutation updatePost($id: ID!, $input: PostInput!) {
+                updatePost(id: $id, input: $input) {
+                    post {
+                        title
+                    }
+                }
+            }
+        """
+        json_resp = self.query(query, op_name='updatePost', variables={
+            'id': post_id, 'input': {'title': 'Updated', 'body': 'body'}})
+        self.assertResponseNoErrors(json_resp, {'updatePost': {'post': {'title': 'Updated'}}})
+
+    def test_unknown_author_is_reported(self):
+        query = """
+            mutation createPost($input: PostCreateInput!) {
+                createPost(input: $input) {
+                    errors {
+                        field
+                    }
+                }
+            }
+        """
+        variables = {'input': {'title': 'Title', 'body': 'body', 'authorId': to_global_id('UserType', 0)}}
+        json_resp = self.query(query, op_name='createPost', variables=variables)
+        self.assertIn({'field': 'authorId'}, json_resp['data']['createPost']['errors'])
+        self.assertFalse(Post.objects.exists())
+
+
+class SearchPostsTestCase(GraphQlTestHelper):
+
+    search_query = '''
+        query searchPosts($query: String!, $after: String) {
+            searchPosts(query: $query, first: 2, after: $after) {
+                edges { rank snippet node { title } }
+                pageInfo { hasNextPage endCursor }
+            }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username='test', password='test', email='test@test.com')
+        self.posts = Post.objects.bulk_create([
+            Post(title='Graphs', body='Queries over graphs of posts', author_id=self.user),
+            Post(title='Cooking', body='A recipe mentioning a graph once', author_id=self.user),
+            Post(title='Travel', body='Nothing related', author_id=self.user),
+            Post(title='Graph databases', body='Storing a graph', author_id=self.user),
+        ])
+
+    def search(self, query, after=None):
+        response = self.query(self.search_query, variables={'query': query, 'after': after})
+        self.assertNotIn('errors', response)
+        return response['data']['searchPosts']
+
+    def test_results_are_ranked_with_snippets(self):
+        result = self.search('graph')
+        titles = [edge['node']['title'] for edge in result['edges']]
+        self.assertEqual(set(titles), {'Graphs', 'Graph databases'})
+        self.assertGreaterEqual(result['edges'][0]['rank'], result['edges'][1]['rank'])
+        self.assertTrue(result['pageInfo']['hasNextPage'])
+
+        result = self.search('graph', after=result['pageInfo']['endCursor'])
+        self.assertEqual([edge['node']['title'] for edge in result['edges']], ['Cooking'])
+        self.assertIn('<b>graph</b>', result['edges'][0]['snippet'])
+        self.assertFalse(result['pageInfo']['hasNextPage'])
+
+    def test_index_follows_changes(self):
+        post = Post.objects.get(title='Travel')
+        post.body = 'A graph of flights'
+        post.save()
+        Post.objects.filter(title='Cooking').delete()
+        Post.objects.filter(title='Graphs').update(title='Charts', body='Plots')
+
+        titles = [edge['node']['title'] for edge in self.search('graph')['edges']]
+        self.assertEqual(set(titles), {'Graph databases', 'Travel'})
+
+    def test_snippets_are_escaped(self):
+        Post.objects.filter(title='Travel').update(body='<script>alert(1)</script> & a graph')
+        snippets = [edge['snippet'] for edge in self.search('alert')['edges']]
+        self.assertEqual(len(snippets), 1)
+        self.assertNotIn('<script>', snippets[0])
+        self.assertIn('&lt;script&gt;<b>alert</b>(1)&lt;/script&gt; &amp; a graph', snippets[0])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('"graph* (databases')['edges'][0]['node']['title'], 'Graph databases')
+        self.assertEqual(self.search('!!!')['edges'], [])
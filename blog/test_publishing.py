@@ -0,0 +1,107 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.leases import acquire_lease
+from .management.commands.publish_scheduled_posts import LEASE_NAME
+from .counters import recount_post_counters
+from .models import Post, PostStatusEnum
+from .publishing import get_publish_lag, posts_published, publish_due_posts, publish_lag
+
+DRAFT, PUBLISHED = PostStatusEnum.DRAFT.value, PostStatusEnum.PUBLISHED.value
+
+
+class PublishDuePostsTestCase(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='test', password='test', email='test@test.com')
+        now = timezone.now()
+        Post.objects.bulk_create([
+            Post(title=f'Due {index}', body='body', author_id=self.user, status=DRAFT,
+                 publish_date=now - timedelta(minutes=index + 1))
+            for index in range(5)
+        ] + [
+            Post(title='Scheduled', body='body', author_id=self.user, status=DRAFT,
+                 publish_date=now + timedelta(hours=1)),
+            Post(title='Draft', body='body', author_id=self.user, status=DRAFT),
+        ])
+        recount_post_counters(get_user_model().objects.all())
+
+    def test_due_drafts_are_published_in_batches(self):
+        self.assertGreaterEqual(get_publish_lag(), 5 * 60)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(publish_due_posts(batch_size=2), 5)
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "blog_post"')]
+        self.assertEqual(len(updates), 3)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.draft_post_count, self.user.published_post_count), (2, 5))
+
+        self.assertEqual(
+            set(Post.objects.filter(status=PUBLISHED).values_list('title', flat=True)),
+            {f'Due {index}' for index in range(5)},
+        )
+        self.assertEqual(get_publish_lag(), 0)
+
+    def test_stops_when_asked(self):
+        batches = iter([True, False])
+        self.assertEqual(publish_due_posts(batch_size=2, should_continue=lambda: next(batches)), 2)
+
+    @override_settings(GRAPHQL_METRICS_TOKEN='secret')
+    def test_lag_is_exposed_as_metric(self):
+        publish_lag.clear()
+        content = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').content.decode()
+        self.assertIn('# TYPE blog_posts_publish_lag_seconds gauge', content)
+        self.assertIn('\nblog_posts_publish_lag_seconds ', content)
+
+    @override_settings(GRAPHQL_METRICS_TOKEN='secret')
+    def test_database_errors_only_drop_the_lag(self):
+        publish_lag.clear()
+        with mock.patch('blog.publishing.get_due_posts', side_effect=OperationalError('down')), \
+                self.assertLogs('core.metrics', 'ERROR'):
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn('# TYPE graphql_operation_duration_seconds histogram', content)
+        self.assertNotIn('\nblog_posts_publish_lag_seconds ', content)
+
+
+class PublishScheduledPostsCommandTestCase(TransactionTestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='test', password='test', email='test@test.com')
+        self.post = Post.objects.create(title='Due', body='body', author_id=user, status=DRAFT,
+                                        publish_date=timezone.now() - timedelta(minutes=1))
+
+    def test_publishes_once_committed(self):
+        published = []
+
+        def receiver(post_ids, **kwargs):
+            published.extend(post_ids)
+
+        posts_published.connect(receiver)
+        try:
+            stdout = StringIO()
+            call_command('publish_scheduled_posts', '--once', stdout=stdout)
+        finally:
+            posts_published.disconnect(receiver)
+
+        self.assertIn('Published 1 posts', stdout.getvalue())
+        self.assertEqual(published, [self.post.pk])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.status, PUBLISHED)
+
+    def test_waits_for_the_lease(self):
+        acquire_lease(LEASE_NAME, 'other', timedelta(minutes=1))
+        stdout = StringIO()
+        call_command('publish_scheduled_posts', '--once', stdout=stdout)
+
+        self.assertIn('Another instance holds the lease', stdout.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.status, DRAFT)
@@ -1,7 +1,16 @@
+import graphene
 from graphene import relay
 from graphene_django import DjangoObjectType
 
-from .models import Post
+from core.cost import FieldCost
+from core.dataloaders import batched_foreign_key
+from .models import Post, PostStatusEnum
+from .search import highlight
+
+PostStatus = graphene.Enum.from_enum(
+    PostStatusEnum,
+    description=lambda v: f'{v} status',
+)
 
 
 class PostType(DjangoObjectType):
@@ -9,3 +18,25 @@ class PostType(DjangoObjectType):
         description = 'Represents a post'
         model = Post
         interfaces = [relay.Node]
+
+    field_costs = {
+        'author_id': FieldCost(cost=1),
+    }
+
+    resolve_author_id = batched_foreign_key('author_id')
+
+
+class PostSearchConnection(relay.Connection):
+    class Meta:
+        node = PostType
+
+    class Edge:
+        rank = graphene.Float(description='Relevance of the post to the query, higher is better')
+        snippet = graphene.String(
+            description='HTML excerpt of the body: the text is escaped and the matched terms are in <b> tags')
+
+        def resolve_rank(self, info):
+            return self.node.search_rank
+
+        def resolve_snippet(self, info):
+            return highlight(self.node.search_snippet)
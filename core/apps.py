@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .metrics import install_sql_wrapper
+        from .response_cache import invalidate_on_change
+
+        post_save.connect(invalidate_on_change, dispatch_uid='graphql_response_cache_save')
+        post_delete.connect(invalidate_on_change, dispatch_uid='graphql_response_cache_delete')
+        connection_created.connect(install_sql_wrapper, dispatch_uid='graphql_metrics_sql_wrapper')
@@ -0,0 +1,283 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import DisallowedHost
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+from django.db import close_old_connections, models
+from django.db.models import QuerySet
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene.relay.node import GlobalID
+from graphene.types.resolver import dict_or_attr_resolver
+from graphene_django import DjangoObjectType
+from graphene_django.views import HttpError
+from graphql.execution import ExecutionResult
+from graphql.execution.executors.asyncio import AsyncioExecutor
+from promise import Promise
+
+from .db import route_operation, set_pin_cookie
+from .metrics import track_operation
+from .views import GraphQLView
+
+
+def call_with_connections(fn, *args):
+    """Run `fn` in a pool thread, dropping database connections of the thread
+    which are past `CONN_MAX_AGE` first, as Django does at request start."""
+    close_old_connections()
+    return fn(*args)
+
+
+def never_queries(root, info):
+    """Whether resolving the field of `info` on `root` can't query the
+    database: reading an attribute of anything but a model instance, or a
+    loaded one of a model instance, and resolvers batching their queries in
+    a dataloader, which runs them through `context.run_sync`."""
+    resolver = info.parent_type.fields[info.field_name].resolver
+    if getattr(resolver, 'batched', False):
+        return True
+    if not isinstance(resolver, partial):
+        return False
+    if resolver.func is dict_or_attr_resolver:
+        name = resolver.args[0]
+    elif resolver.func is GlobalID.id_resolver and resolver.args[0] is DjangoObjectType.resolve_id:
+        name = root._meta.pk.attname if isinstance(root, models.Model) else None
+    else:
+        return False
+    if isinstance(root, models.Model):
+        # deferred columns and relations that weren't prefetched are loaded
+        # on access
+        return name in root.__dict__
+    return name is not None
+
+
+class ThreadPoolMiddleware:
+    """Resolve fields which may query the database in the thread pool.
+
+    Root fields of one operation therefore resolve concurrently and no query
+    blocks the event loop. Lazy querysets are evaluated in the pool too.
+    Nested fields reading loaded rows resolve on the event loop, and batched
+    loaders run their queries through `context.run_sync`; resolvers loading
+    through a dataloader must be built by `core.dataloaders` to stay on the
+    loop, as waiting for the loader from the pool would block.
+    """
+
+    def __init__(self, run_sync):
+        self.run_sync = run_sync
+
+    @staticmethod
+    def resolve_sync(next, root, info, args):
+        result = next(root, info, **args)
+        if Promise.is_thenable(result):
+            result = Promise.resolve(result).get()
+        if isinstance(result, QuerySet):
+            result = list(result)
+        return result
+
+    def resolve(self, next, root, info, **args):
+        if len(info.path) > 1 and never_queries(root, info):
+            return next(root, info, **args)
+        return self.run_sync(self.resolve_sync, next, root, info, args)
+
+
+class AsyncGraphQLView(GraphQLView):
+    """`GraphQLView` executing documents with the asyncio executor.
+
+    Every blocking step (persisted query lookup, parsing and validation,
+    response cache, ORM access) runs in `pool`, so the event loop only
+    waits on them. Only JSON requests are supported: no GraphiQL, no
+    streamed queries and no session authentication, users authenticate
+    with a JWT.
+    """
+
+    def __init__(self, *args, loop, pool, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loop = loop
+        self.pool = pool
+
+    def run_sync(self, fn, *args):
+        # the context carries the statistics of the operation being executed
+        context = contextvars.copy_context()
+        return self.loop.run_in_executor(self.pool, partial(context.run, call_with_connections, fn, *args))
+
+    def get_context(self, request):
+        request.run_sync = self.run_sync
+        return request
+
+    def get_middleware(self, request):
+        # last, so it wraps the others: the JWT middleware authenticates in
+        # the pool too
+        return list(self.middleware or []) + [ThreadPoolMiddleware(self.run_sync)]
+
+    async def dispatch_async(self, request):
+        try:
+            if request.method.lower() not in ('get', 'post'):
+                raise HttpError(HttpResponseNotAllowed(['GET', 'POST'], 'GraphQL only supports GET and POST requests.'))
+            data = self.parse_body(request)
+            if self.batch:
+                responses = [await self.get_response_async(request, entry) for entry in data]
+                result = '[{}]'.format(','.join(response[0] for response in responses))
+                status_code = max(response[1] for response in responses) if responses else 200
+            else:
+                result, status_code = await self.get_response_async(request, data)
+            response = HttpResponse(status=status_code, content=result, content_type='application/json')
+        except HttpError as e:
+            response = e.response
+            response['Content-Type'] = 'application/json'
+            response.content = self.json_encode(request, {'errors': [self.format_error(e)]})
+        self.add_cache_headers(request, response)
+        set_pin_cookie(request, response)
+        return response
+
+    async def get_response_async(self, request, data):
+        try:
+            query, variables, operation_name, id = await self.run_sync(self.get_graphql_params, request, data)
+            execution_result = await self.execute_graphql_request_async(request, query, variables, operation_name)
+        except HttpError as e:
+            return self.encode_batch_error(request, data, e)
+        return self.encode_execution_result(request, execution_result, id)
+
+    async def execute_graphql_request_async(self, request, query, variables, operation_name):
+        document, response_cache, result = await self.run_sync(
+            self.prepare_execution, request, query, variables, operation_name)
+        if document is None or result is not None:
+            return result
+        if self.stream:
+            # reading the rows would block the event loop
+            raise HttpError(HttpResponseBadRequest('Streamed queries are only served by the WSGI endpoint.'))
+
+        operation_type = document.get_operation_type(operation_name)
+        routing = route_operation(request, operation_type, fills_cache=response_cache is not None)
+        try:
+            with routing, track_operation(operation_type, operation_name) as stats:
+                result = await document.execute(
+                    executor=AsyncioExecutor(loop=self.loop),
+                    return_promise=True,
+                    **self.get_execute_options(request, variables, operation_name)
+                )
+                stats.failed = bool(result.errors)
+        except Exception as e:
+            return ExecutionResult(errors=[e], invalid=True)
+
+        await self.run_sync(self.store_result, request, document, operation_name, result, response_cache)
+        return result
+
+
+def get_wsgi_environ(scope, body):
+    """Build the WSGI environ of an ASGI HTTP `scope` so the request can be
+    handled by Django's `WSGIRequest`."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+    }
+    for name, value in scope.get('headers', []):
+        name, value = name.decode('latin1').upper().replace('-', '_'), value.decode('latin1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        if name != 'CONTENT_TYPE':
+            name = f'HTTP_{name}'
+        environ[name] = f'{environ[name]},{value}' if name in environ else value
+    return environ
+
+
+class GraphQLASGIHandler:
+    """ASGI application serving the GraphQL endpoint at `path`.
+
+    A request only holds a pool thread while it runs blocking code, so one
+    process serves many more concurrent requests than it has threads.
+    GraphQL requests skip the Django middleware, their Host header is
+    checked against `ALLOWED_HOSTS` as Django does and the graphene
+    middleware, metrics included, runs as usual. Other paths (metrics,
+    schema, admin) are answered in the pool by Django's own handler, with
+    the whole middleware stack.
+    """
+
+    def __init__(self, path='/graphql', max_workers=None):
+        self.path = path.rstrip('/')
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers or getattr(settings, 'GRAPHQL_ASGI_THREAD_POOL_SIZE', 8),
+            thread_name_prefix='graphql',
+        )
+        self.django = WSGIHandler()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Unsupported ASGI scope type: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.pool.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body.extend(message.get('body', b''))
+            if not message.get('more_body', False):
+                return bytes(body)
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        environ, loop = get_wsgi_environ(scope, body), asyncio.get_running_loop()
+        if scope['path'].rstrip('/') != self.path:
+            response, content = await loop.run_in_executor(self.pool, self.get_django_response, environ)
+            await self.send_response(response, send, content)
+            return
+
+        request = WSGIRequest(environ)
+        try:
+            request.get_host()
+        except DisallowedHost as e:
+            response = await loop.run_in_executor(self.pool, response_for_exception, request, e)
+        else:
+            request.user = AnonymousUser()
+            view = AsyncGraphQLView(loop=loop, pool=self.pool)
+            response = await view.dispatch_async(request)
+        await self.send_response(response, send)
+
+    def get_django_response(self, environ):
+        """Return the response of Django's handler to `environ` and its
+        content, read in the calling thread."""
+        response = self.django(environ, lambda status, headers, exc_info=None: None)
+        try:
+            return response, b''.join(response)
+        finally:
+            # sends `request_finished`, closing the connections of this thread
+            response.close()
+
+    @staticmethod
+    async def send_response(response, send, content=None):
+        headers = [(name.encode('latin1'), value.encode('latin1')) for name, value in response.items()]
+        for cookie in response.cookies.values():
+            headers.append((b'Set-Cookie', cookie.output(header='').strip().encode('latin1')))
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': response.content if content is None else content})
@@ -0,0 +1,153 @@
+from graphene.relay import Connection
+from graphene.utils.str_converters import to_snake_case
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+from graphql.language.ast import Field, FragmentSpread, InlineFragment, IntValue, OperationDefinition
+from graphql.type.definition import GraphQLObjectType, GraphQLInterfaceType, get_named_type
+
+
+class FieldCost:
+    """Cost of resolving a field, declared in the `field_costs` mapping of a
+    graphene type keyed by field name.
+
+    `cost` is paid once per resolved field. `multiplier` is the expected
+    number of items returned by a list field; the cost of the field's
+    selection set is multiplied by it. Fields taking `first`/`last`
+    arguments use the requested page size unless a multiplier is declared.
+    """
+
+    def __init__(self, cost=1, multiplier=None):
+        self.cost = cost
+        self.multiplier = multiplier
+
+
+def is_connection_wrapper(parent_type):
+    """Relay `edges`/`node`/`pageInfo` fields carry no cost of their own."""
+    graphene_type = getattr(parent_type, 'graphene_type', None)
+    if graphene_type is not None and issubclass(graphene_type, Connection):
+        return True
+    return 'node' in parent_type.fields and 'cursor' in parent_type.fields
+
+
+class QueryCostAnalyzer:
+    """Compute the depth and cost of every operation of a validated document
+    without executing it.
+
+    Variables are not known at this point, so page sizes passed through
+    variables are assumed to be `RELAY_CONNECTION_MAX_LIMIT`.
+    """
+
+    def __init__(self, schema, document_ast):
+        self.schema = schema
+        self.streamed = False
+        self.fragments = {}
+        self.operations = []
+        self.visited_types = set()
+        for definition in document_ast.definitions:
+            if isinstance(definition, OperationDefinition):
+                self.operations.append(definition)
+            else:
+                self.fragments[definition.name.value] = definition
+
+    def get_root_type(self, operation):
+        return {
+            'query': self.schema.get_query_type(),
+            'mutation': self.schema.get_mutation_type(),
+            'subscription': self.schema.get_subscription_type(),
+        }[operation.operation]
+
+    @staticmethod
+    def get_field_cost(parent_type, field_name, field_def):
+        graphene_type = getattr(parent_type, 'graphene_type', None)
+        declared = getattr(graphene_type, 'field_costs', {}).get(to_snake_case(field_name))
+        if declared is not None:
+            return declared
+        named_type = get_named_type(field_def.type)
+        if not isinstance(named_type, (GraphQLObjectType, GraphQLInterfaceType)) \
+                or is_connection_wrapper(parent_type):
+            return FieldCost(cost=0)
+        return FieldCost()
+
+    @staticmethod
+    def get_multiplier(field_cost, field):
+        if field_cost.multiplier is not None:
+            return field_cost.multiplier
+        for argument in field.arguments or []:
+            if argument.name.value in ('first', 'last'):
+                if isinstance(argument.value, IntValue):
+                    return int(argument.value.value)
+                return graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        return 1
+
+    def get_selection_cost(self, parent_type, selection_set, depth):
+        """Return `(cost, depth)` of a selection set."""
+        cost, max_depth = 0, depth
+        if selection_set is None:
+            return cost, max_depth
+        self.visited_types.add(parent_type)
+        for selection in selection_set.selections:
+            if isinstance(selection, Field):
+                field_name = selection.name.value
+                if field_name.startswith('__'):
+                    continue
+                field_def = parent_type.fields[field_name]
+                field_cost = self.get_field_cost(parent_type, field_name, field_def)
+                child_cost, child_depth = self.get_selection_cost(
+                    get_named_type(field_def.type), selection.selection_set, depth + 1)
+                # the rows of a streamed root connection are bounded by `GRAPHQL_STREAM_MAX_LIMIT`
+                multiplier = 1 if self.streamed and depth == 0 else self.get_multiplier(field_cost, selection)
+                cost += field_cost.cost + multiplier * child_cost
+                max_depth = max(max_depth, child_depth)
+                continue
+            if isinstance(selection, FragmentSpread):
+                fragment = self.fragments[selection.name.value]
+            else:
+                fragment = selection
+            fragment_type = parent_type
+            if fragment.type_condition is not None:
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+            child_cost, child_depth = self.get_selection_cost(fragment_type, fragment.selection_set, depth)
+            cost += child_cost
+            max_depth = max(max_depth, child_depth)
+        return cost, max_depth
+
+    @property
+    def models(self):
+        """Django models behind the object types selected by the document."""
+        graphene_types = (getattr(type_, 'graphene_type', None) for type_ in self.visited_types)
+        return {
+            graphene_type._meta.model for graphene_type in graphene_types
+            if getattr(getattr(graphene_type, '_meta', None), 'model', None) is not None
+        }
+
+    def analyze(self, streamed=False):
+        """Return `{operation_name: (cost, depth)}`.
+
+        When `streamed`, the cost is the one of a single edge of the root
+        connections: the page size of streamed connections is capped
+        separately, the cost of nested lists is not.
+        """
+        self.streamed = streamed
+        try:
+            return {
+                operation.name.value if operation.name else None:
+                    self.get_selection_cost(self.get_root_type(operation), operation.selection_set, 0)
+                for operation in self.operations
+            }
+        finally:
+            self.streamed = False
+
+
+def check_query_cost(costs, max_cost, max_depth):
+    """Return errors for every operation exceeding the depth or cost budget.
+
+    `costs` is the result of `QueryCostAnalyzer.analyze()`.
+    """
+    errors = []
+    for operation_name, (cost, depth) in costs.items():
+        name = operation_name or 'anonymous'
+        if depth > max_depth:
+            errors.append(GraphQLError(f'Operation {name} has depth {depth}, the maximum allowed depth is {max_depth}.'))
+        if cost > max_cost:
+            errors.append(GraphQLError(f'Operation {name} has cost {cost}, the maximum allowed cost is {max_cost}.'))
+    return errors
@@ -0,0 +1,105 @@
+from abc import ABCMeta, abstractmethod
+from collections import defaultdict
+
+from promise import Promise
+from promise.dataloader import DataLoader
+
+
+def get_loader(context, loader_cls, *args):
+    """Return the `loader_cls(*args)` instance bound to the request `context`.
+
+    Loaders are created lazily and cached on the context, so every resolver
+    running within one execution shares the same batch queue and cache.
+    """
+    loaders = getattr(context, 'dataloaders', None)
+    if loaders is None:
+        loaders = context.dataloaders = {}
+    key = (loader_cls,) + args
+    if key not in loaders:
+        loaders[key] = loader_cls(*args)
+        loaders[key].run_sync = getattr(context, 'run_sync', None)
+    return loaders[key]
+
+
+def clear_loaders(context):
+    """Drop the loaders bound to `context` together with the rows they cached."""
+    context.dataloaders = {}
+
+
+class QueryLoader(DataLoader, metaclass=ABCMeta):
+    """Loader running one query per batch in `load_batch()`.
+
+    When the context provides `run_sync` (see `core.asgi`) the query runs
+    through it, off the event loop.
+    """
+
+    run_sync = None
+
+    @abstractmethod
+    def load_batch(self, keys):
+        """Return the values of `keys`, in the same order."""
+
+    def batch_load_fn(self, keys):
+        if self.run_sync is None:
+            return Promise.resolve(self.load_batch(keys))
+        return Promise.resolve(self.run_sync(self.load_batch, keys))
+
+
+class ModelByIdLoader(QueryLoader):
+    """Load model instances by primary key with a single `pk IN (...)` query."""
+
+    def __init__(self, model):
+        self.model = model
+        super().__init__()
+
+    def load_batch(self, keys):
+        instances = self.model._default_manager.in_bulk(keys)
+        return [instances.get(key) for key in keys]
+
+
+class ModelsByForeignKeyLoader(QueryLoader):
+    """Load lists of model instances grouped by the value of a foreign key."""
+
+    def __init__(self, model, field_name):
+        self.model = model
+        self.attname = model._meta.get_field(field_name).attname
+        super().__init__()
+
+    def load_batch(self, keys):
+        grouped = defaultdict(list)
+        lookup = {f'{self.attname}__in': keys}
+        for instance in self.model._default_manager.filter(**lookup).order_by('pk'):
+            grouped[getattr(instance, self.attname)].append(instance)
+        return [grouped.get(key, []) for key in keys]
+
+
+def batched_foreign_key(field_name):
+    """Return a resolver loading the object referenced by a forward relation.
+
+    Instances which already have the relation cached (e.g. fetched with
+    `select_related()`) are returned without touching the loader.
+    """
+
+    def resolver(root, info, **kwargs):
+        field = root._meta.get_field(field_name)
+        if field.is_cached(root):
+            return getattr(root, field_name)
+        pk = getattr(root, field.attname)
+        if pk is None:
+            return None
+        return get_loader(info.context, ModelByIdLoader, field.related_model).load(pk)
+
+    # queries run in the loader, see `core.asgi.never_queries`
+    resolver.batched = True
+    return resolver
+
+
+def batched_reverse_foreign_key(model, field_name):
+    """Return a resolver loading all `model` instances pointing to the root
+    object through the `field_name` foreign key."""
+
+    def resolver(root, info, **kwargs):
+        return get_loader(info.context, ModelsByForeignKeyLoader, model, field_name).load(root.pk)
+
+    resolver.batched = True
+    return resolver
@@ -0,0 +1,104 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'db_primary_pin'
+PIN_KEY_PREFIX = 'core:db-pin:'
+
+# replica alias reads of the current operation go to, None for the primary
+current_replica = ContextVar('db_replica', default=None)
+
+
+class ReplicaRouter:
+    """Send the reads of GraphQL query operations to a replica of
+    `DATABASE_REPLICAS`, everything else to the primary, see
+    `route_operation`."""
+
+    def db_for_read(self, model, **hints):
+        return current_replica.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def get_pin_cache():
+    return caches[getattr(settings, 'GRAPHQL_REPLICA_PIN_CACHE_ALIAS', 'default')]
+
+
+def get_pin_key(request):
+    """Key pinning clients authenticated with a header, which may not keep
+    cookies."""
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if authorization:
+        return PIN_KEY_PREFIX + sha256(authorization.encode('utf-8')).hexdigest()
+    return None
+
+
+def is_pinned(request):
+    if getattr(request, 'db_pinned', False) or PIN_COOKIE in request.COOKIES:
+        return True
+    key = get_pin_key(request)
+    return key is not None and bool(get_pin_cache().get(key))
+
+
+def pin_to_primary(request):
+    """Read from the primary for `GRAPHQL_REPLICA_PIN_SECONDS`, so the client
+    sees its own writes while the replicas catch up."""
+    request.db_pinned = True
+    key = get_pin_key(request)
+    if key is not None:
+        get_pin_cache().set(key, True, getattr(settings, 'GRAPHQL_REPLICA_PIN_SECONDS', 10))
+
+
+def set_pin_cookie(request, response):
+    """Pin the client of a response whose request wrote."""
+    if getattr(request, 'db_pinned', False):
+        response.set_cookie(PIN_COOKIE, '1', max_age=getattr(settings, 'GRAPHQL_REPLICA_PIN_SECONDS', 10),
+                            httponly=True, samesite='Lax')
+
+
+@contextmanager
+def read_from(replica):
+    """Send the reads made within to `replica`, the primary when None."""
+    token = current_replica.set(replica)
+    try:
+        yield
+    finally:
+        current_replica.reset(token)
+
+
+@contextmanager
+def route_operation(request, operation_type, fills_cache=False):
+    """Route the reads of an operation of `operation_type` made within and
+    yield the replica they go to, None for the primary.
+
+    Queries read from a random replica unless the client is pinned to the
+    primary or the result `fills_cache` shared by all clients: rows of a
+    lagging replica would be cached after the invalidation of a write and
+    served until they expire. Anything else, mutations included, reads from
+    the primary and pins the client afterwards. Reads of the same operation
+    made later, e.g. while streaming, go to the yielded replica with
+    `read_from`.
+    """
+    replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+    replica = None
+    if replicas and operation_type == 'query' and not fills_cache and not is_pinned(request):
+        replica = random.choice(replicas)
+    try:
+        with read_from(replica):
+            yield replica
+    finally:
+        if replicas and operation_type == 'mutation':
+            pin_to_primary(request)
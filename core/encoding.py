@@ -0,0 +1,97 @@
+import json
+import logging
+from decimal import Decimal
+from enum import Enum
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+try:
+    import orjson
+except ImportError:  # optional, `get_json_backend` falls back to `StdlibJSONBackend`
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class JSONEncoder(DjangoJSONEncoder):
+    """`DjangoJSONEncoder` also encoding enums by value, like orjson."""
+
+    def default(self, o):
+        if isinstance(o, Enum):
+            return o.value
+        return super().default(o)
+
+
+class StdlibJSONBackend:
+    """Request decoder and response encoder of `GraphQLView`.
+
+    Subclasses may override `loads()` and `dumps()`, selected with the
+    `GRAPHQL_JSON_BACKEND` setting.
+    """
+
+    name = 'json'
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+    def loads(self, data):
+        """Decode `data` (bytes or str), raising `ValueError` when invalid."""
+        return json.loads(data)
+
+    def dumps(self, value, pretty=False):
+        """Encode `value` to a str, sorted and indented when `pretty`."""
+        if pretty:
+            return json.dumps(value, cls=JSONEncoder, sort_keys=True, indent=2, separators=(',', ': '))
+        return json.dumps(value, cls=JSONEncoder, separators=(',', ':'))
+
+
+def _orjson_default(value):
+    # the only type of `DjangoJSONEncoder` orjson doesn't encode itself
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError
+
+
+class OrjsonBackend(StdlibJSONBackend):
+    """Backend built on orjson, several times faster on large responses.
+
+    Datetimes, dates, times, UUIDs and enums are encoded by orjson itself,
+    without calling back into Python for every value. Unlike
+    `DjangoJSONEncoder` datetimes keep their microseconds.
+    """
+
+    name = 'orjson'
+    options = 0 if orjson is None else orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    @classmethod
+    def is_available(cls):
+        return orjson is not None
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, value, pretty=False):
+        options = self.options | (orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS if pretty else 0)
+        return orjson.dumps(value, default=_orjson_default, option=options).decode()
+
+
+BACKENDS = {backend.name: backend for backend in (StdlibJSONBackend, OrjsonBackend)}
+
+
+@lru_cache(maxsize=None)
+def load_json_backend(path):
+    backend = import_string(path)
+    if not backend.is_available():
+        logger.warning('The library of %s is not installed, falling back to the json module.', path)
+        backend = StdlibJSONBackend
+    return backend()
+
+
+def get_json_backend():
+    """Return the backend of the `GRAPHQL_JSON_BACKEND` setting, or the
+    stdlib one when its library isn't installed."""
+    return load_json_backend(getattr(settings, 'GRAPHQL_JSON_BACKEND', 'core.encoding.OrjsonBackend'))
@@ -0,0 +1,257 @@
+import json
+from functools import partial, reduce
+from itertools import islice
+
+import graphene
+from django.conf import settings
+from django.db.models import Q, prefetch_related_objects
+from graphene.relay import PageInfo
+from graphene.utils.str_converters import to_camel_case
+from graphene_django.filter.utils import get_filtering_args_from_filterset
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+from graphql_relay.utils import base64, unbase64
+from promise import Promise
+
+from .optimizer import ensure_loaded
+
+
+def _cursor_value(value):
+    # unlike DjangoJSONEncoder keep the full microsecond precision, the
+    # cursor has to compare equal to the stored value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetOrdering:
+    """Ordering of a `KeysetConnectionField` selectable with `orderBy`.
+
+    `ordering` must be unique and served by an index once the filters named
+    in `requires` are given; requesting it without them is an error, so no
+    combination of arguments ends up sorting the whole table.
+    """
+
+    def __init__(self, *ordering, requires=(), description=None):
+        self.ordering = ordering
+        self.requires = tuple(requires)
+        self.description = description
+
+
+class KeysetConnectionField(graphene.relay.ConnectionField):
+    """Relay connection paginated by a unique ordering instead of OFFSET.
+
+    The resolver must return a queryset. Cursors encode the values of the
+    `ordering` fields of an edge, so fetching a page is a range scan over an
+    index covering `ordering` no matter how deep the client pages. One of
+    `first`/`last` is required and capped at `RELAY_CONNECTION_MAX_LIMIT`.
+
+    `ordering` may also name annotations of the queryset (e.g. a search
+    rank); their cursor values are compared as decoded from JSON. Rows
+    whose ordering fields are NULL can't be paged through and are left out.
+
+    The filters of `filterset_class` become arguments of the field and are
+    applied to the resolved queryset. `orderings` maps `orderBy` enum names
+    to `KeysetOrdering`s, `ordering` is used when none is requested.
+    Explicit keyword arguments override the generated filter arguments.
+
+    Root fields executed by `core.streaming` are resolved with edges read
+    from a server-side cursor while they are serialized, see
+    `stream_connection()`. Streamed pages are reserved to staff users and
+    capped at `GRAPHQL_STREAM_MAX_LIMIT` instead.
+    """
+
+    def __init__(self, type, *args, ordering=('pk',), orderings=None, filterset_class=None, **kwargs):
+        self.ordering = tuple(ordering)
+        self.orderings = orderings or {}
+        self.filterset_class = filterset_class
+        if filterset_class is not None:
+            kwargs = {**get_filtering_args_from_filterset(filterset_class, type._meta.node), **kwargs}
+        if self.orderings:
+            kwargs['order_by'] = graphene.Argument(graphene.Enum(
+                f'{type._meta.node._meta.name}OrderBy',
+                [(name, name) for name in self.orderings],
+                description=lambda value: value and self.orderings[value.value].description,
+            ))
+        super().__init__(type, *args, **kwargs)
+
+    @staticmethod
+    def get_limit(first, last, max_limit=None):
+        if (first is None) == (last is None):
+            raise GraphQLError('You must provide exactly one of `first` or `last` to paginate the connection.')
+        limit = first if first is not None else last
+        max_limit = max_limit or graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        if limit < 0:
+            raise GraphQLError('`first` and `last` must be non-negative integers.')
+        if limit > max_limit:
+            raise GraphQLError(f'Requesting {limit} records exceeds the limit of {max_limit} records.')
+        return limit
+
+    def get_ordering(self, args):
+        name = args.get('order_by')
+        if name is None:
+            return self.ordering
+        ordering = self.orderings[name]
+        missing = [to_camel_case(filter_name) for filter_name in ordering.requires if args.get(filter_name) is None]
+        if missing:
+            raise GraphQLError(f'Ordering by {name} requires the {", ".join(missing)} argument.')
+        return ordering.ordering
+
+    def filter_queryset(self, queryset, info, args):
+        if self.filterset_class is None:
+            return queryset
+        data = {name: args[name] for name in self.filterset_class.base_filters if args.get(name) is not None}
+        filterset = self.filterset_class(data=data, queryset=queryset, request=info.context)
+        if not filterset.is_valid():
+            raise GraphQLError(' '.join(
+                f'{to_camel_case(name)}: {message}'
+                for name, messages in filterset.errors.items() for message in messages
+            ))
+        return filterset.qs
+
+    @staticmethod
+    def parse_ordering(ordering):
+        """Return a list of (field_name, descending) pairs."""
+        return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+    @staticmethod
+    def get_cursor_values(instance, ordering):
+        return [getattr(instance, name) for name, _ in ordering]
+
+    @classmethod
+    def encode_cursor(cls, instance, ordering):
+        return base64(json.dumps(cls.get_cursor_values(instance, ordering), default=_cursor_value))
+
+    @staticmethod
+    def decode_cursor(queryset, cursor, ordering):
+        model = queryset.model
+        try:
+            values = json.loads(unbase64(cursor))
+            assert isinstance(values, list) and len(values) == len(ordering)
+            return [
+                value if name in queryset.query.annotations else
+                (model._meta.pk if name == 'pk' else model._meta.get_field(name)).to_python(value)
+                for (name, _), value in zip(ordering, values)
+            ]
+        except Exception:
+            raise GraphQLError(f'Invalid cursor: {cursor}')
+
+    @staticmethod
+    def seek_filter(ordering, values, forward):
+        """Build the condition selecting rows strictly after (or before) the
+        row whose ordering fields equal `values`.
+
+        For ordering `(a, b)` moving forward this is
+        `a > x OR (a = x AND b > y)`.
+        """
+        conditions = []
+        for index, ((name, descending), value) in enumerate(zip(ordering, values)):
+            lookup = 'gt' if forward != descending else 'lt'
+            equal = {prev_name: prev_value for (prev_name, _), prev_value in zip(ordering[:index], values)}
+            conditions.append(Q(**equal, **{f'{name}__{lookup}': value}))
+        return reduce(lambda left, right: left | right, conditions)
+
+    @classmethod
+    def resolve_connection(cls, connection_type, ordering, args, queryset, chunk_size=None):
+        """Resolve one page, streamed `chunk_size` rows at a time when given."""
+        if isinstance(queryset, connection_type):
+            return queryset
+
+        first, last = args.get('first'), args.get('last')
+        after, before = args.get('after'), args.get('before')
+        if chunk_size is not None:
+            if first is None:
+                raise GraphQLError('Streamed connections must be paginated with `first`.')
+            limit = cls.get_limit(first, last, getattr(settings, 'GRAPHQL_STREAM_MAX_LIMIT', 10000))
+        else:
+            limit = cls.get_limit(first, last)
+        fields = cls.parse_ordering(ordering)
+        model_fields = [name for name, _ in fields if name not in queryset.query.annotations]
+        # cursors are built from the ordering fields, never defer them
+        queryset = ensure_loaded(queryset, *model_fields)
+        nullable = [
+            name for name in model_fields
+            if name != 'pk' and queryset.model._meta.get_field(name).null
+        ]
+        if nullable:
+            queryset = queryset.filter(**{f'{name}__isnull': False for name in nullable})
+
+        if after:
+            queryset = queryset.filter(cls.seek_filter(fields, cls.decode_cursor(queryset, after, fields), True))
+        if before:
+            queryset = queryset.filter(cls.seek_filter(fields, cls.decode_cursor(queryset, before, fields), False))
+
+        if chunk_size is not None:
+            return cls.stream_connection(
+                connection_type, fields, queryset.order_by(*ordering)[:limit + 1], limit, bool(after), chunk_size)
+        if first is not None:
+            rows = list(queryset.order_by(*ordering)[:limit + 1])
+            has_next_page, has_previous_page = len(rows) > limit, bool(after)
+            rows = rows[:limit]
+        else:
+            reverse_ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+            rows = list(queryset.order_by(*reverse_ordering)[:limit + 1])
+            has_previous_page, has_next_page = len(rows) > limit, bool(before)
+            rows = rows[:limit][::-1]
+
+        edges = [connection_type.Edge(node=row, cursor=cls.encode_cursor(row, fields)) for row in rows]
+        page_info = PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_previous_page,
+            has_next_page=has_next_page,
+        )
+        return connection_type(edges=edges, page_info=page_info)
+
+    @classmethod
+    def stream_connection(cls, connection_type, fields, rows, limit, has_previous_page, chunk_size):
+        """Return a connection whose edges are a generator reading `rows`
+        with `QuerySet.iterator()`, a server-side cursor on PostgreSQL.
+
+        Prefetches, which `iterator()` ignores, are made for every chunk of
+        `chunk_size` rows. The page info is only complete once the edges
+        were iterated.
+        """
+        page_info = PageInfo(has_previous_page=has_previous_page, has_next_page=False)
+
+        def edges():
+            iterator = rows.iterator(chunk_size=chunk_size)
+            index = 0
+            for chunk in iter(lambda: list(islice(iterator, chunk_size)), []):
+                prefetch_related_objects(chunk, *rows._prefetch_related_lookups)
+                for row in chunk:
+                    if index == limit:
+                        # the lookahead row
+                        page_info.has_next_page = True
+                        return
+                    cursor = cls.encode_cursor(row, fields)
+                    page_info.start_cursor = page_info.start_cursor or cursor
+                    page_info.end_cursor = cursor
+                    index += 1
+                    yield connection_type.Edge(node=row, cursor=cursor)
+
+        return connection_type(edges=edges(), page_info=page_info)
+
+    def connection_resolver(self, resolver, connection_type, root, info, **args):
+        # set by `core.streaming` while resolving a streamed root field
+        chunk_size = getattr(info.context, 'graphql_stream_chunk_size', None)
+        if chunk_size is not None and not info.context.user.is_staff:
+            raise GraphQLError('Only staff users can stream connections.')
+        ordering = self.get_ordering(args)
+        resolved = resolver(root, info, **args)
+        if isinstance(connection_type, graphene.NonNull):
+            connection_type = connection_type.of_type
+
+        def on_resolve(queryset):
+            if isinstance(queryset, connection_type):
+                return queryset
+            return self.resolve_connection(
+                connection_type, ordering, args, self.filter_queryset(queryset, info, args), chunk_size)
+
+        if Promise.is_thenable(resolved):
+            return Promise.resolve(resolved).then(on_resolve)
+        return on_resolve(resolved)
+
+    def get_resolver(self, parent_resolver):
+        resolver = super(graphene.relay.ConnectionField, self).get_resolver(parent_resolver)
+        return partial(self.connection_resolver, resolver, self.type)
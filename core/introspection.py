@@ -0,0 +1,120 @@
+import json
+import logging
+from hashlib import sha256
+from threading import Lock
+from weakref import WeakKeyDictionary
+
+from django.conf import settings
+from graphene_django.settings import graphene_settings
+from graphql.execution import ExecutionResult
+from graphql.language import ast
+from graphql.utils.introspection_query import introspection_query
+from graphql.utils.schema_printer import print_schema
+from promise import Promise
+
+logger = logging.getLogger(__name__)
+
+_introspections = WeakKeyDictionary()
+_lock = Lock()
+
+
+class SchemaIntrospection:
+    """SDL and result of the standard introspection query of a schema.
+
+    `version` is the sha256 of the SDL, so a file written by the
+    `build_introspection` command is only used for the schema it was
+    built from.
+    """
+
+    def __init__(self, schema, path=None):
+        self.schema = schema
+        self.sdl = print_schema(schema)
+        self.version = sha256(self.sdl.encode('utf-8')).hexdigest()
+        self.result = self.load(path) if path else None
+        if self.result is None:
+            self.result = self.execute()
+
+    def execute(self):
+        result = self.schema.execute(introspection_query)
+        if result.errors:
+            raise result.errors[0]
+        return result.data
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                built = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning('Ignoring the introspection file %s: %s', path, e)
+            return None
+        if built.get('version') != self.version:
+            logger.warning('Ignoring the introspection file %s built for another schema version', path)
+            return None
+        return built['introspection']
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump({'version': self.version, 'sdl': self.sdl, 'introspection': self.result}, f)
+
+
+def get_schema_introspection(schema):
+    """Return the `SchemaIntrospection` of `schema`, computed on first use or
+    read from `GRAPHQL_INTROSPECTION_FILE`."""
+    introspection = _introspections.get(schema)
+    if introspection is None:
+        with _lock:
+            introspection = _introspections.get(schema)
+            if introspection is None:
+                introspection = SchemaIntrospection(schema, getattr(settings, 'GRAPHQL_INTROSPECTION_FILE', None))
+                _introspections[schema] = introspection
+    return introspection
+
+
+def warm_up():
+    """Build the schema and its introspection before serving requests, e.g.
+    once in the master process of a preforking server instead of in every
+    worker."""
+    get_schema_introspection(graphene_settings.SCHEMA)
+
+
+def is_introspection_only(document_ast):
+    """Whether the result of `document_ast` only depends on the schema: it
+    selects nothing but introspection fields and has no variables."""
+    for definition in document_ast.definitions:
+        if isinstance(definition, ast.OperationDefinition):
+            if definition.operation != 'query' or definition.variable_definitions:
+                return False
+            for selection in definition.selection_set.selections:
+                if not isinstance(selection, ast.Field) or not selection.name.value.startswith('__'):
+                    return False
+    return True
+
+
+def memoize_introspection(schema, document_string, execute, costs):
+    """Wrap the `execute` of an introspection-only document so every
+    operation runs once. The standard introspection query is answered with
+    `get_schema_introspection()` right away, with the cost `execute` would
+    report from `costs` in its extensions.
+    """
+    results = {}
+    if document_string.strip() == introspection_query.strip():
+        extensions = {'cost': costs['IntrospectionQuery']} if 'IntrospectionQuery' in costs else {}
+        result = ExecutionResult(data=get_schema_introspection(schema).result, extensions=extensions)
+        results[None] = results['IntrospectionQuery'] = result
+
+    def execute_once(*args, return_promise=False, **kwargs):
+        operation_name = kwargs.get('operation_name')
+        result = results.get(operation_name)
+        if result is None:
+            result = execute(*args, return_promise=return_promise, **kwargs)
+            if Promise.is_thenable(result):
+                return Promise.resolve(result).then(lambda result: store(operation_name, result))
+            store(operation_name, result)
+        return Promise.resolve(result) if return_promise else result
+
+    def store(operation_name, result):
+        if not result.errors and not result.invalid:
+            results[operation_name] = result
+        return result
+
+    return execute_once
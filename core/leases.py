@@ -0,0 +1,30 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Lease
+
+
+def acquire_lease(name, owner, duration):
+    """Take the lease `name` for `owner` for `duration` (a timedelta).
+
+    Renews the lease when `owner` already holds it. Returns whether `owner`
+    holds the lease, which is only the case for one owner at a time as long
+    as the clocks of the processes agree.
+    """
+    now = timezone.now()
+    expires = now + duration
+    if Lease.objects.filter(Q(owner=owner) | Q(expires__lte=now), name=name).update(owner=owner, expires=expires):
+        return True
+    try:
+        with transaction.atomic():
+            Lease.objects.create(name=name, owner=owner, expires=expires)
+    except IntegrityError:
+        # held by someone else
+        return False
+    return True
+
+
+def release_lease(name, owner):
+    """Give up the lease `name` if `owner` holds it."""
+    Lease.objects.filter(name=name, owner=owner).delete()
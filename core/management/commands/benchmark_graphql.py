@@ -0,0 +1,174 @@
+import json
+import math
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from graphql_jwt.shortcuts import get_token
+from graphql_relay import to_global_id
+
+from accounts.models import User
+from blog.models import Post
+
+ALL_POSTS = '''
+query allPosts($first: Int!, $after: String) {
+    allPosts(first: $first, after: $after) {
+        edges { cursor node { id title status publishDate authorId { id username } } }
+        pageInfo { hasNextPage endCursor }
+    }
+}
+'''
+POST = 'query post($id: ID!) { post(id: $id) { id title body status authorId { username } } }'
+CURRENT_USER = '{ currentUser { id username email } }'
+CREATE_POST = '''
+mutation createPost($input: PostCreateInput!) {
+    createPost(input: $input) { post { id } errors { field message } }
+}
+'''
+UPDATE_POST = '''
+mutation updatePost($id: ID!, $input: PostInput!) {
+    updatePost(id: $id, input: $input) { post { id title } errors { field message } }
+}
+'''
+DELETE_POST = 'mutation deletePost($id: ID!) { deletePost(id: $id) { errors { field message } } }'
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of sorted `values`."""
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=settings.BASE_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Run canonical GraphQL operations through the Django test client and report latency '
+        'percentiles, SQL query counts and peak memory as JSON. Writes are rolled back, so '
+        'runs against the same dataset (see `generate_dataset`) can be compared between commits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--deep-page', type=int, default=50,
+                            help='Number of pages walked before measuring a deep `allPosts` page')
+        parser.add_argument('--output', help='Write the report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_admin=True, is_active=True).order_by('pk').first()
+        post = Post.objects.order_by('pk').first()
+        if user is None or post is None:
+            raise CommandError('The database needs an active admin user and posts, run `generate_dataset` first.')
+
+        self.client = Client(HTTP_AUTHORIZATION=f'JWT {get_token(user)}')
+        self.user, self.post = user, post
+        self.page_size = options['page_size']
+
+        with override_settings(ALLOWED_HOSTS=['testserver']), transaction.atomic():
+            deep_cursor = self.walk_pages(options['deep_page'])
+            operations = {
+                'allPosts.firstPage': lambda _: (ALL_POSTS, {'first': self.page_size}),
+                'allPosts.deepPage': lambda _: (ALL_POSTS, {'first': self.page_size, 'after': deep_cursor}),
+                'post': lambda _: (POST, {'id': self.post.pk}),
+                'currentUser': lambda _: (CURRENT_USER, None),
+                'createPost': self.create_post_operation,
+                'updatePost': lambda index: (UPDATE_POST, {
+                    'id': to_global_id('PostType', self.post.pk), 'input': {'title': f'Updated {index}'}}),
+                'deletePost': self.delete_post_operation,
+            }
+            report = {
+                'commit': get_commit(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'dataset': {'users': User.objects.count(), 'posts': Post.objects.count()},
+                'iterations': options['iterations'],
+                'operations': {
+                    name: self.measure(operation, options['iterations'], options['warmup'])
+                    for name, operation in operations.items()
+                },
+            }
+            transaction.set_rollback(True)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def run_operation(self, query, variables=None):
+        body = json.dumps({'query': query, 'variables': variables})
+        response = self.client.post('/graphql', body, content_type='application/json')
+        result = json.loads(response.content.decode())
+        if response.status_code != 200 or result.get('errors'):
+            raise CommandError(f'Operation failed: {result}')
+        return result['data']
+
+    def walk_pages(self, pages):
+        cursor = None
+        for _ in range(pages):
+            page_info = self.run_operation(ALL_POSTS, {'first': self.page_size, 'after': cursor})['allPosts']['pageInfo']
+            if not page_info['hasNextPage']:
+                break
+            cursor = page_info['endCursor']
+        return cursor
+
+    def create_post_operation(self, index):
+        return CREATE_POST, {'input': {
+            'title': f'Benchmark {index}', 'body': 'body ' * 200, 'authorId': to_global_id('UserType', self.user.pk),
+        }}
+
+    def delete_post_operation(self, index):
+        post = Post.objects.create(title=f'Benchmark {index}', body='body', author_id=self.user)
+        return DELETE_POST, {'id': to_global_id('PostType', post.pk)}
+
+    def measure(self, operation, iterations, warmup):
+        for index in range(warmup):
+            self.run_operation(*operation(-index - 1))
+
+        durations, queries = [], []
+        for index in range(iterations):
+            query, variables = operation(index)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                self.run_operation(query, variables)
+                durations.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+
+        # tracemalloc slows execution down, memory is measured in a separate run
+        query, variables = operation(iterations)
+        tracemalloc.start()
+        try:
+            self.run_operation(query, variables)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        durations.sort()
+        return {
+            'latency_ms': {
+                'min': round(durations[0], 3),
+                'p50': round(percentile(durations, 50), 3),
+                'p90': round(percentile(durations, 90), 3),
+                'p99': round(percentile(durations, 99), 3),
+                'max': round(durations[-1], 3),
+                'mean': round(sum(durations) / len(durations), 3),
+            },
+            'sql_queries': {'min': min(queries), 'max': max(queries), 'mean': round(sum(queries) / len(queries), 2)},
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
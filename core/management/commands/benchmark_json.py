@@ -0,0 +1,115 @@
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from graphql_relay import to_global_id
+
+from blog.models import PostStatusEnum
+from core.encoding import BACKENDS
+from .benchmark_graphql import get_commit, percentile
+
+
+def generate_posts(count, body_size, seed=0):
+    """Rows of `count` posts with native values: datetimes, enums and
+    decimals."""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    words = ['graphql', 'django', 'vlog', 'post', 'query', 'cursor', 'index', 'cache']
+    return [{
+        'id': index,
+        'title': f'Post {index}',
+        'body': ' '.join(rng.choice(words) for _ in range(body_size // 6)),
+        'status': rng.choice(list(PostStatusEnum)),
+        'created': start + timedelta(seconds=rng.randrange(10 ** 7), microseconds=rng.randrange(10 ** 6)),
+        'score': Decimal(rng.randrange(10 ** 4)) / 100,
+        'author': {'id': index % 50, 'username': f'author{index % 50}'},
+    } for index in range(count)]
+
+
+def to_response(posts):
+    """The `allPosts` response built from `posts`, which only holds the
+    strings and numbers GraphQL scalars serialize to."""
+    return {'data': {'allPosts': {
+        'edges': [{
+            'cursor': f'cursor:{post["id"]}',
+            'node': {
+                'id': to_global_id('PostType', post['id']),
+                'title': post['title'],
+                'body': post['body'],
+                'status': post['status'].name,
+                'created': post['created'].isoformat(),
+                'authorId': {'id': to_global_id('UserType', post['author']['id']),
+                             'username': post['author']['username']},
+            },
+        } for post in posts],
+        'pageInfo': {'hasNextPage': True, 'endCursor': f'cursor:{posts[-1]["id"]}' if posts else None},
+    }}}
+
+
+def summarize(durations):
+    durations = sorted(durations)
+    return {
+        'min': round(durations[0], 3),
+        'p50': round(percentile(durations, 50), 3),
+        'p90': round(percentile(durations, 90), 3),
+        'mean': round(sum(durations) / len(durations), 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the JSON backends of `core.encoding` encoding and decoding generated post payloads '
+        'and report the timings as JSON. Backends whose library is not installed are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000, help='Posts per payload')
+        parser.add_argument('--body-size', type=int, default=2000, help='Characters of every post body')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--output', help='Write the report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        posts = generate_posts(options['posts'], options['body_size'])
+        payloads = {'response': to_response(posts), 'rows': posts}
+        report = {
+            'commit': get_commit(),
+            'posts': options['posts'],
+            'body_size': options['body_size'],
+            'iterations': options['iterations'],
+            'backends': {
+                name: self.measure(backend(), payloads, options['iterations']) if backend.is_available() else None
+                for name, backend in BACKENDS.items()
+            },
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def measure(backend, payloads, iterations):
+        results = {}
+        for name, payload in payloads.items():
+            encoded = backend.dumps(payload)
+            data = encoded.encode()
+            encode_durations, decode_durations = [], []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                backend.dumps(payload)
+                encode_durations.append((time.perf_counter() - started) * 1000)
+                started = time.perf_counter()
+                backend.loads(data)
+                decode_durations.append((time.perf_counter() - started) * 1000)
+            results[name] = {
+                'bytes': len(data),
+                'encode_ms': summarize(encode_durations),
+                'decode_ms': summarize(decode_durations),
+            }
+        return results
@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .benchmark_graphql import get_commit, percentile
+
+# run in a fresh interpreter, prints the seconds spent in each phase
+STARTUP_SCRIPT = '''
+import json, os, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vlog.settings')
+import django
+django.setup()
+setup = time.perf_counter()
+from graphene_django.settings import graphene_settings
+schema = graphene_settings.SCHEMA
+schema_built = time.perf_counter()
+from core.introspection import get_schema_introspection
+get_schema_introspection(schema)
+introspected = time.perf_counter()
+print(json.dumps({
+    'django_setup': setup - started,
+    'schema': schema_built - setup,
+    'introspection': introspected - schema_built,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Start fresh interpreters loading Django, the schema and its introspection, like a new worker, '
+        'and report the startup time of each phase as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=10)
+        parser.add_argument('--introspection-file', help='Start workers with this GRAPHQL_INTROSPECTION_FILE')
+        parser.add_argument('--output', help='Write the report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'vlog.settings'))
+        if options['introspection_file']:
+            env['GRAPHQL_INTROSPECTION_FILE'] = options['introspection_file']
+        runs = [self.run(env) for _ in range(options['runs'])]
+        report = {
+            'commit': get_commit(),
+            'python': '.'.join(map(str, sys.version_info[:3])),
+            'runs': options['runs'],
+            'introspection_file': options['introspection_file'],
+            'startup_ms': {phase: self.summarize([run[phase] for run in runs]) for phase in runs[0]},
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def run(env):
+        started = time.perf_counter()
+        process = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=settings.BASE_DIR, env=env,
+                                 capture_output=True, text=True)
+        total = time.perf_counter() - started
+        if process.returncode:
+            raise CommandError(f'Startup failed: {process.stderr}')
+        phases = json.loads(process.stdout.strip().splitlines()[-1])
+        # interpreter startup and shutdown included
+        phases['total'] = total
+        return phases
+
+    @staticmethod
+    def summarize(durations):
+        durations = sorted(duration * 1000 for duration in durations)
+        return {
+            'min': round(durations[0], 3),
+            'p50': round(percentile(durations, 50), 3),
+            'max': round(durations[-1], 3),
+        }
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from graphene_django.settings import graphene_settings
+
+from core.introspection import SchemaIntrospection
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the SDL and introspection result of the schema to a file, e.g. at build time. '
+        'Workers pointed at it with `GRAPHQL_INTROSPECTION_FILE` read it instead of introspecting the schema.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Defaults to the GRAPHQL_INTROSPECTION_FILE setting')
+
+    def handle(self, *args, **options):
+        path = options['output'] or getattr(settings, 'GRAPHQL_INTROSPECTION_FILE', None)
+        if not path:
+            raise CommandError('Pass --output or set GRAPHQL_INTROSPECTION_FILE.')
+        introspection = SchemaIntrospection(graphene_settings.SCHEMA)
+        introspection.dump(path)
+        self.stdout.write(f'Wrote the introspection of schema version {introspection.version} to {path}')
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.core.management.base import BaseCommand
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+
+from core.asgi import GraphQLASGIHandler
+
+DEFAULT_QUERY = '{ allPosts(first: 10) { edges { node { title authorId { username } } } } }'
+
+
+class InFlightCounter:
+    """Count requests being served at the same time."""
+
+    def __init__(self):
+        self.current = self.peak = 0
+        self._lock = Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.current -= 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve the same GraphQL request through the WSGI and the ASGI handler in '
+        'this process and compare how many requests each one has in flight.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests sent to each handler')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests sent at the same time')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='WSGI worker threads and size of the ASGI thread pool')
+        parser.add_argument('--latency', type=float, default=5,
+                            help='Milliseconds added to every SQL query to emulate a remote database')
+        parser.add_argument('--query', default=DEFAULT_QUERY)
+        parser.add_argument('--response-cache', action='store_true',
+                            help='Keep the response cache enabled, responses are then served from it')
+
+    def handle(self, *args, **options):
+        self.body = json.dumps({'query': options['query']})
+        latency = options['latency'] / 1000
+
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            connection.execute_wrappers.append(slow_query)
+
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if not options['response_cache']:
+            overrides['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+        connection_created.connect(add_latency)
+        try:
+            with override_settings(**overrides):
+                results = [
+                    ('WSGI', self.run_wsgi(options['requests'], options['concurrency'], options['threads'])),
+                    ('ASGI', self.run_asgi(options['requests'], options['concurrency'], options['threads'])),
+                ]
+        finally:
+            connection_created.disconnect(add_latency)
+
+        self.stdout.write(f'{options["requests"]} requests, {options["concurrency"]} concurrent clients, '
+                          f'{options["threads"]} threads, {options["latency"]} ms per query')
+        for name, (elapsed, peak) in results:
+            self.stdout.write(f'{name}: {options["requests"] / elapsed:8.1f} requests/s, '
+                              f'{peak:4d} requests in flight at most')
+
+    def run_wsgi(self, requests, concurrency, threads):
+        counter = InFlightCounter()
+
+        def request(_):
+            with counter:
+                response = Client().post('/graphql', self.body, content_type='application/json')
+            assert response.status_code == 200, response.content
+
+        # the clients only queue requests, `threads` of them are served at once
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(concurrency, threads)) as pool:
+            list(pool.map(request, range(requests)))
+        return time.perf_counter() - started, counter.peak
+
+    def run_asgi(self, requests, concurrency, threads):
+        counter = InFlightCounter()
+        handler = GraphQLASGIHandler(max_workers=threads)
+        body = self.body.encode()
+
+        async def request(semaphore):
+            messages = [{'type': 'http.request', 'body': body}]
+            sent = []
+
+            async def receive():
+                return messages.pop(0)
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {
+                'type': 'http', 'method': 'POST', 'path': '/graphql', 'query_string': b'',
+                'headers': [(b'content-type', b'application/json')],
+            }
+            async with semaphore:
+                with counter:
+                    await handler(scope, receive, send)
+            assert sent[0]['status'] == 200, sent[1]['body']
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+            await asyncio.gather(*(request(semaphore) for _ in range(requests)))
+
+        started = time.perf_counter()
+        asyncio.run(run())
+        handler.pool.shutdown()
+        return time.perf_counter() - started, counter.peak
@@ -0,0 +1,155 @@
+import math
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from django.apps.registry import Apps
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from blog.models import Post, PostStatusEnum
+from core.response_cache import invalidate_model
+
+EMAIL_DOMAIN = 'dataset.example.com'
+PASSWORD = 'password'
+
+WORDS = (
+    'graph query schema field resolver post author draft publish archive cache index page cursor edge node '
+    'django python server client request response token user status title body date time scale batch load '
+    'the a an of to in and for with on at by from is are was be this that it as or not'
+).split()
+
+# share of generated posts per status, publish dates depend on the status
+STATUS_WEIGHTS = {
+    PostStatusEnum.PUBLISHED.value: 70,
+    PostStatusEnum.DRAFT.value: 20,
+    PostStatusEnum.ARCHIVED.value: 10,
+}
+
+
+def get_dataset_email(index):
+    return f'user{index}@{EMAIL_DOMAIN}'
+
+
+def get_insert_model(model):
+    """Return a model sharing the table of `model` whose timestamp fields don't
+    overwrite the values set explicitly with the current time on insert.
+
+    Foreign keys become plain columns. The model lives in its own registry,
+    migrations and the other apps never see it.
+    """
+    attrs = {'__module__': __name__}
+    for field in model._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        if field.is_relation:
+            attrs[field.attname] = models.IntegerField(db_column=field.column, null=field.null)
+            continue
+        clone = field.clone()
+        clone.auto_now = clone.auto_now_add = False
+        attrs[field.name] = clone
+    attrs['Meta'] = type('Meta', (), {
+        'apps': Apps(), 'app_label': model._meta.app_label, 'db_table': model._meta.db_table, 'managed': False,
+    })
+    return type(f'Insert{model.__name__}', (models.Model,), attrs)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a reproducible dataset of users and posts with batched inserts. '
+        f'Users get `user<n>@{EMAIL_DOMAIN}` emails and the password `{PASSWORD}`; user0 is an admin.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--seed', type=int, default=0, help='Same seed and sizes give the same dataset')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=730, help='Posts are created over this many days')
+        parser.add_argument('--end', type=datetime.fromisoformat,
+                            help='Date (ISO format) of the newest post, today by default')
+        parser.add_argument('--clear', action='store_true', help='Delete a previously generated dataset first')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['clear']:
+            deleted, _ = User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+            self.stdout.write(f'Deleted {deleted} rows of the previous dataset')
+
+        user_ids = self.create_users(options['users'], options['batch_size'])
+        end = options['end'] or timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        if timezone.is_naive(end):
+            end = timezone.make_aware(end)
+        self.create_posts(rng, user_ids, options['posts'], options['batch_size'], options['days'], end)
+        # bulk inserts send no signals, count posts and drop cached responses explicitly
+        call_command('repair_post_counters', batch_size=options['batch_size'], stdout=self.stdout)
+        invalidate_model(User)
+        invalidate_model(Post)
+
+    def create_users(self, count, batch_size):
+        # hashing is deliberately slow, every user shares the same hash
+        password = make_password(PASSWORD)
+        for start in range(0, count, batch_size):
+            User.objects.bulk_create([
+                User(email=get_dataset_email(index), username=f'user{index}', password=password,
+                     is_admin=index == 0, is_staff=index == 0)
+                for index in range(start, min(start + batch_size, count))
+            ])
+        self.stdout.write(f'Created {count} users')
+        ids = dict(User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').values_list('email', 'id'))
+        return [ids[get_dataset_email(index)] for index in range(count)]
+
+    def create_posts(self, rng, user_ids, count, batch_size, days, now):
+        if not user_ids:
+            return
+        # a few prolific authors write most of the posts
+        author_weights = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(user_ids))))
+        statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+        first_created = now - timedelta(days=days)
+        step = timedelta(days=days) / max(count, 1)
+
+        # `auto_now`/`auto_now_add` of `Post` would overwrite the spread out timestamps
+        InsertPost = get_insert_model(Post)
+        for start in range(0, count, batch_size):
+            posts = []
+            for index in range(start, min(start + batch_size, count)):
+                created = first_created + step * index + timedelta(seconds=rng.randrange(60))
+                status = rng.choices(statuses, status_weights)[0]
+                posts.append(InsertPost(
+                    author_id_id=user_ids[rng.choices(range(len(user_ids)), cum_weights=author_weights)[0]],
+                    title=self.get_title(rng),
+                    body=self.get_body(rng),
+                    created=created,
+                    modified=created,
+                    status=status,
+                    publish_date=self.get_publish_date(rng, status, created, now),
+                ))
+            with transaction.atomic():
+                InsertPost.objects.bulk_create(posts)
+            self.stdout.write(f'Created {min(start + batch_size, count)}/{count} posts')
+
+    @staticmethod
+    def get_title(rng):
+        return ' '.join(rng.choices(WORDS, k=rng.randint(2, 7))).capitalize()[:50]
+
+    @staticmethod
+    def get_body(rng):
+        # log-normal lengths: most bodies have a few hundred words, some are long reads
+        length = min(max(int(rng.lognormvariate(math.log(1500), 0.8)), 100), 20000)
+        words = rng.choices(WORDS, k=length // 5 + 1)
+        return ' '.join(words)[:length]
+
+    @staticmethod
+    def get_publish_date(rng, status, created, now):
+        if status == PostStatusEnum.PUBLISHED.value:
+            return min(created + timedelta(hours=rng.expovariate(1 / 24)), now)
+        if status == PostStatusEnum.ARCHIVED.value:
+            return created + timedelta(hours=rng.expovariate(1 / 24))
+        if rng.random() < 0.3:
+            # scheduled drafts
+            return now + timedelta(hours=rng.uniform(1, 24 * 30))
+        return None
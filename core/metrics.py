@@ -0,0 +1,328 @@
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+from django.conf import settings
+from promise import Promise
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_LABEL = '__other__'
+
+current_operation = ContextVar('graphql_operation', default=None)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """In-process metric aggregated per label values.
+
+    Updates take a lock, so one instance can be shared by all threads. The
+    number of label sets is capped at `max_series`; further label sets are
+    aggregated under `__other__` so client supplied values (operation names)
+    can't grow the registry without bounds.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), max_series=1000):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._series = {}
+        self._lock = Lock()
+
+    @abstractmethod
+    def new_series(self):
+        """Return the mutable state of a new label set."""
+
+    def get_series(self, labels):
+        """Return the series of `labels`, must be called with the lock held."""
+        key = tuple(labels)
+        series = self._series.get(key)
+        if series is None:
+            if len(self._series) >= self.max_series:
+                key = (OVERFLOW_LABEL,) * len(self.labelnames)
+                series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = self.new_series()
+        return series
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    @abstractmethod
+    def samples(self):
+        """Yield `(suffix, labels, value)` for every sample of the metric."""
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for suffix, labels, value in self.samples():
+            lines.append(f'{self.name}{suffix}{format_labels(labels)} {format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def new_series(self):
+        return [0]
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.get_series(labels)[0] += amount
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, value[0]) for key, value in self._series.items())
+        for key, value in series:
+            yield '_total', list(zip(self.labelnames, key)), value
+
+
+class Gauge(Metric):
+    """Metric set to the current value of something, either explicitly or by
+    `function` called whenever the metric is rendered.
+
+    A value computed by `function` is reused for `max_age` seconds. When
+    `function` raises, the error is logged and the gauge has no sample, the
+    other metrics are still rendered.
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None, max_age=0, **kwargs):
+        super().__init__(name, documentation, labelnames, **kwargs)
+        self.function = function
+        self.max_age = max_age
+        # (value, time.monotonic() it was computed at)
+        self._computed = None
+
+    def new_series(self):
+        return [0]
+
+    def set(self, value, *labels):
+        with self._lock:
+            self.get_series(labels)[0] = value
+
+    def clear(self):
+        super().clear()
+        with self._lock:
+            self._computed = None
+
+    def compute(self):
+        """Return the value of `function`, or None when it failed."""
+        now = time.monotonic()
+        with self._lock:
+            computed = self._computed
+        if computed is not None and now - computed[1] < self.max_age:
+            return computed[0]
+        try:
+            value = self.function()
+        except Exception:
+            logger.exception('Failed to compute the metric %s', self.name)
+            return None
+        with self._lock:
+            self._computed = (value, now)
+        return value
+
+    def samples(self):
+        if self.function is not None:
+            value = self.compute()
+            if value is not None:
+                yield '', [], value
+            return
+        with self._lock:
+            series = sorted((key, value[0]) for key, value in self._series.items())
+        for key, value in series:
+            yield '', list(zip(self.labelnames, key)), value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=(), **kwargs):
+        super().__init__(name, documentation, labelnames, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def new_series(self):
+        # per bucket counts (not cumulative), sum, count
+        return [[0] * len(self.buckets), 0, 0]
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.get_series(labels)
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, list(counts), total, count) for key, (counts, total, count) in self._series.items())
+        for key, counts, total, count in series:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield '_bucket', labels + [('le', format_value(bound))], cumulative
+            yield '_sum', labels, total
+            yield '_count', labels, count
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def clear(self):
+        for metric in self.metrics:
+            metric.clear()
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+
+registry = MetricsRegistry()
+
+OPERATION_LABELS = ('operation_type', 'operation_name')
+FIELD_LABELS = ('parent_type', 'field')
+
+operation_duration = registry.register(Histogram(
+    'graphql_operation_duration_seconds', 'Time spent executing GraphQL operations.', OPERATION_LABELS,
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10),
+))
+operation_errors = registry.register(Counter(
+    'graphql_operation_errors', 'GraphQL operations answered with errors.', OPERATION_LABELS,
+))
+operation_sql_queries = registry.register(Histogram(
+    'graphql_operation_sql_queries', 'SQL queries run by GraphQL operations.', OPERATION_LABELS,
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+))
+operation_sql_duration = registry.register(Histogram(
+    'graphql_operation_sql_duration_seconds', 'Time spent in SQL queries by GraphQL operations.', OPERATION_LABELS,
+    buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5),
+))
+field_duration = registry.register(Histogram(
+    'graphql_field_duration_seconds', 'Time spent resolving fields of sampled GraphQL operations.', FIELD_LABELS,
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1),
+))
+field_errors = registry.register(Counter(
+    'graphql_field_errors', 'Errors raised by field resolvers.', FIELD_LABELS,
+))
+
+
+class OperationStats:
+    """Statistics of the operation being executed, shared by every thread
+    taking part in its execution."""
+
+    def __init__(self, sampled):
+        self.sampled = sampled
+        # until the caller reports a result without errors
+        self.failed = True
+        self.sql_queries = 0
+        self.sql_duration = 0
+        self._lock = Lock()
+
+    def add_query(self, duration):
+        with self._lock:
+            self.sql_queries += 1
+            self.sql_duration += duration
+
+
+@contextmanager
+def track_operation(operation_type, operation_name):
+    """Record duration and SQL statistics of the operation executed within.
+
+    Only a `GRAPHQL_METRICS_FIELD_SAMPLE_RATE` fraction of operations record
+    per-field latencies. The caller sets `failed` of the yielded stats once
+    the operation returned a result.
+    """
+    labels = (operation_type or 'unknown', operation_name or 'anonymous')
+    stats = OperationStats(sampled=random.random() < getattr(settings, 'GRAPHQL_METRICS_FIELD_SAMPLE_RATE', 0.1))
+    token = current_operation.set(stats)
+    started = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        current_operation.reset(token)
+        operation_duration.observe(time.perf_counter() - started, *labels)
+        operation_sql_queries.observe(stats.sql_queries, *labels)
+        operation_sql_duration.observe(stats.sql_duration, *labels)
+        if stats.failed:
+            operation_errors.inc(*labels)
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """Database execute wrapper counting queries of the current operation."""
+    stats = current_operation.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(time.perf_counter() - started)
+
+
+def install_sql_wrapper(sender, connection, **kwargs):
+    """`connection_created` receiver adding `sql_wrapper` to new connections."""
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+class MetricsMiddleware:
+    """Count resolver errors and, for sampled operations, time every field.
+
+    Fields resolving to a promise are timed until the promise settles.
+    """
+
+    def resolve(self, next, root, info, **args):
+        stats = current_operation.get()
+        labels = (info.parent_type.name, info.field_name)
+        started = time.perf_counter() if stats is not None and stats.sampled else None
+        try:
+            result = next(root, info, **args)
+        except Exception:
+            field_errors.inc(*labels)
+            raise
+
+        if Promise.is_thenable(result):
+            def on_resolve(value):
+                if started is not None:
+                    field_duration.observe(time.perf_counter() - started, *labels)
+                return value
+
+            def on_reject(error):
+                field_errors.inc(*labels)
+                raise error
+
+            return Promise.resolve(result).then(on_resolve, on_reject)
+        if started is not None:
+            field_duration.observe(time.perf_counter() - started, *labels)
+        return result
@@ -1 +1,21 @@
-# Create your models here.
+from django.db import models
+
+
+class PersistedQuery(models.Model):
+    """GraphQL document registered by a client under its sha256 hash."""
+    sha256_hash = models.CharField(max_length=64, primary_key=True)
+    query = models.TextField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256_hash
+
+
+class Lease(models.Model):
+    """Named lock held by one process until `expires`, see `core.leases`."""
+    name = models.CharField(max_length=100, primary_key=True)
+    owner = models.CharField(max_length=255)
+    expires = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
@@ -2,20 +2,23 @@ from itertools import chain
 from textwrap import dedent
 
 import graphene
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ImproperlyConfigured, ValidationError
-from django.db import models
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError
+from django.db import connections, models, router, transaction
 from django.db.models.base import ModelBase
 from django.db.models.fields.files import FileField
 from graphene.types.mutation import MutationOptions
 from graphene_django.registry import get_global_registry
 from graphql.error import GraphQLError
 from graphql_jwt.exceptions import PermissionDenied
+from graphql_relay import from_global_id
 
-from .types import Error
+from .response_cache import invalidate_model_on_commit
+from .types import BulkError, Error
 from .utils import (
     snake_to_camel_case, get_fields_from_input, get_model_name,
-    get_output_fields, get_nodes)
+    get_output_fields, get_nodes, get_nodes_by_global_id)
 
 registry = get_global_registry()
 User = get_user_model()
@@ -29,10 +32,60 @@ class BaseInput(graphene.InputObjectType):
         super().__init__(*args, required=True, **kwargs)
 
 
+def get_editable_fields(model):
+    """Return `{name: field}` of model fields which can be set from input."""
+    return {
+        f.name: f for f in model._meta.fields
+        if f.editable and not isinstance(f, models.AutoField)
+    }
+
+
+def unwrap_non_null(type_):
+    return type_.of_type if isinstance(type_, graphene.NonNull) else type_
+
+
+class InputCleaningPlan:
+    """Description of how to clean the input of a model mutation.
+
+    Compiled once per mutation class: input fields are split into IDs, lists
+    of IDs and plain values, and the editable model fields `construct_instance`
+    sets and the models ID fields refer to are looked up in advance.
+    """
+
+    def __init__(self, input_type, model):
+        self.id_fields, self.id_list_fields, self.value_fields = [], [], []
+        for field_name, field in input_type._meta.fields.items():
+            field_type = unwrap_non_null(field.type)
+            if isinstance(field_type, graphene.List) and unwrap_non_null(field_type.of_type) == graphene.ID:
+                self.id_list_fields.append(field_name)
+            elif field_type == graphene.ID:
+                self.id_fields.append(field_name)
+            else:
+                self.value_fields.append(field_name)
+        self.model_fields = get_editable_fields(model)
+        self.file_fields = {name for name, f in self.model_fields.items() if isinstance(f, FileField)}
+        self.related_models = {}
+        for field_name in self.id_fields + self.id_list_fields:
+            try:
+                f = model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                continue
+            if f.is_relation:
+                self.related_models[field_name] = f.related_model
+
+    def get_global_ids(self, input):
+        """Return all IDs referenced by `input`."""
+        ids = [input[field_name] for field_name in self.id_fields if input.get(field_name)]
+        for field_name in self.id_list_fields:
+            ids.extend(input.get(field_name) or [])
+        return ids
+
+
 class ModelMutationOptions(MutationOptions):
     exclude = None
     model = None
     return_field_name = None
+    cleaning_plan = None
 
 
 class BaseMutation(graphene.Mutation):
@@ -69,7 +122,7 @@ class BaseMutation(graphene.Mutation):
         (for example "UserType:2" or "PostType:64")
         """
         if not global_id:
-            return None
+            return None, None
         node, error = None, None
         try:
             node = graphene.Node.get_node_from_global_id(info, global_id, only_type)
@@ -118,19 +171,22 @@ class BaseMutation(graphene.Mutation):
         data to be set in instance fields. Returns `instance` with filled
         fields, but not saved to the database.
         """
-        opts = instance._meta
+        plan = getattr(cls._meta, 'cleaning_plan', None)
+        if plan is not None:
+            fields, file_fields = plan.model_fields, plan.file_fields
+        else:
+            fields = get_editable_fields(type(instance))
+            file_fields = {name for name, f in fields.items() if isinstance(f, FileField)}
 
-        for f in opts.fields:
-            if any([not f.editable,
-                    isinstance(f, models.AutoField),
-                    f.name not in cleaned_data]):
+        for name, data in cleaned_data.items():
+            f = fields.get(name)
+            if f is None:
                 continue
-            data = cleaned_data[f.name]
             if data is None:
                 # We want to reset the file field value when None was passed
                 # in the input, but `FileField.save_form_data` ignores None
                 # values. In that case we manually pass False which clears the file.
-                if isinstance(f, FileField):
+                if name in file_fields:
                     data = False
                 if not f.null:
                     data = f._get_default()
@@ -163,56 +219,81 @@ class ModelMutation(BaseMutation):
         _meta.model = model
         _meta.return_field_name = return_field_name
         _meta.exclude = exclude
+        if hasattr(cls.Arguments, 'input'):
+            _meta.cleaning_plan = InputCleaningPlan(cls.get_input_type(), model)
         super().__init_subclass_with_meta__(_meta=_meta, **options)
         cls._update_mutation_arguments_and_fields(arguments=arguments, fields=fields)
 
     @classmethod
-    def clean_input(cls, info, instance, input):
+    def get_input_type(cls):
+        """Return the input object type of the `input` argument."""
+        input_type = getattr(cls.Arguments, 'input')
+        while isinstance(input_type, (graphene.List, graphene.NonNull)):
+            input_type = input_type.of_type
+        return input_type
+
+    @classmethod
+    def clean_input(cls, info, instance, input, nodes=None):
         """Clean input data received from mutation arguments.
 
         Fields containing IDs or lists of IDs are automatically resolved into
-        model instances. `instance` argument is the model instance the mutation
-        is operating on (before setting the input data). `input` is raw input
-        data the mutation receives. `errors` is a list of errors that occurred
-        during mutation's execution.
+        model instances, with one query per referenced model. `instance`
+        argument is the model instance the mutation is operating on (before
+        setting the input data). `input` is raw input data the mutation
+        receives. `nodes` optionally maps already resolved IDs to instances.
+        `errors` is a list of errors that occurred during mutation's execution.
 
         Override this method to provide custom transformations of incoming
         data.
         """
+        plan = cls._meta.cleaning_plan
+        cleaned_input, errors = {}, []
+        if nodes is None:
+            nodes = get_nodes_by_global_id(plan.get_global_ids(input))
 
-        def is_list_of_ids(field_):
-            return (isinstance(field_.type, graphene.List)
-                    and field_.type.of_type == graphene.ID)
-
-        def is_id_field(field_):
-            return (field_.type == graphene.ID
-                    or isinstance(field_.type, graphene.NonNull)
-                    and field_.type.of_type == graphene.ID)
+        for field_name in plan.value_fields:
+            if field_name in input:
+                cleaned_input[field_name] = input[field_name]
 
-        input_cls = getattr(cls.Arguments, 'input')
-        cleaned_input, errors = {}, []
+        for field_name in plan.id_fields:
+            if field_name in input:
+                value = input[field_name]
+                if value and value not in nodes:
+                    errors.append(cls.create_error(field_name, f"Couldn't resolve to a node: {value}"))
+                elif value and not cls.is_related_node(field_name, nodes[value]):
+                    errors.append(cls.create_node_type_error(field_name))
+                    continue
+                cleaned_input[field_name] = nodes.get(value) if value else value
 
-        for field_name, field in input_cls._meta.fields.items():
+        for field_name in plan.id_list_fields:
             if field_name in input:
                 value = input[field_name]
-                # handle list of IDs field
-                if value is not None and is_list_of_ids(field):
-                    instances, error = cls.get_nodes_or_error(value, field_name) if value else [], None
-                    cleaned_input[field_name] = instances
-                    if error:
-                        errors.append(errors)
-
-                # handle ID field
-                elif value is not None and is_id_field(field):
-                    instance, error = cls.get_node_or_error(info, value, field_name)
-                    cleaned_input[field_name] = instance
-                    if error:
-                        errors.append(error)
-                # handle other fields
-                else:
+                if value is None:
                     cleaned_input[field_name] = value
+                    continue
+                missing_ids = [global_id for global_id in value if global_id not in nodes]
+                if missing_ids:
+                    errors.append(cls.create_error(
+                        field_name, f"Could not resolve to a nodes with the global id list of '{missing_ids}'"))
+                instances = [nodes[global_id] for global_id in value if global_id in nodes]
+                if not all(cls.is_related_node(field_name, instance) for instance in instances):
+                    errors.append(cls.create_node_type_error(field_name))
+                    continue
+                cleaned_input[field_name] = instances
         return cleaned_input, errors
 
+    @classmethod
+    def is_related_node(cls, field_name, node):
+        """Whether `node` is an instance of the model the relation
+        `field_name` refers to, IDs of any type are resolved."""
+        model = cls._meta.cleaning_plan.related_models.get(field_name)
+        return model is None or isinstance(node, model)
+
+    @classmethod
+    def create_node_type_error(cls, field_name):
+        model = cls._meta.cleaning_plan.related_models[field_name]
+        return cls.create_error(field_name, f'Must receive a {registry.get_type_for_model(model)._meta.name} id.')
+
     @classmethod
     def _save_m2m(cls, info, instance, cleaned_data):
         opts = instance._meta
@@ -244,7 +325,7 @@ class ModelMutation(BaseMutation):
         id, input = get_fields_from_input(data, ['id', 'input'])
         if id:
             model = registry.get_type_for_model(cls._meta.model)
-            instance, error = cls.get_node_or_error(id, 'id', model)
+            instance, error = cls.get_node_or_error(info, id, 'id', model)
             if error:
                 return cls(errors=[error])
         else:
@@ -297,3 +378,202 @@ class ModelDeleteMutation(ModelMutation):
         # ID so that the success response contains ID of the deleted object.
         instance.id = db_id
         return cls.success_response(instance)
+
+
+class BulkModelMutation(ModelMutation):
+    """Create or update many instances of a model in one transaction.
+
+    The `input` argument is a list of inputs. Every item goes through
+    `clean_input`, `construct_instance` and `clean_instance`; items holding
+    an `id` update the existing instance, the others create a new one.
+    Nothing is written if any item has errors. Instances are written with
+    `bulk_create`/`bulk_update`, so `save()` and model signals are skipped.
+    """
+    count = graphene.Int(required=True, description='Number of objects affected by the mutation')
+    errors = graphene.List(
+        graphene.NonNull(BulkError),
+        description='List of errors that occurred executing the mutation'
+    )
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def __init_subclass_with_meta__(cls, model: ModelBase = None, return_field_name: str = None, **options):
+        if model is None:
+            raise ImproperlyConfigured('`model` must be specified in Meta class of BulkModelMutation')
+        return_field_name = return_field_name or f'{get_model_name(model)}s'
+        super().__init_subclass_with_meta__(model=model, return_field_name=return_field_name, **options)
+        model_type = registry.get_type_for_model(model)
+        cls._update_mutation_arguments_and_fields(arguments={}, fields={
+            return_field_name: graphene.Field(graphene.List(graphene.NonNull(model_type)))
+        })
+
+    @classmethod
+    def create_bulk_error(cls, index: int, field: str, message: str):
+        return BulkError(index=index, field=snake_to_camel_case(field), message=message)
+
+    @classmethod
+    def check_max_items(cls, items):
+        max_items = getattr(settings, 'GRAPHQL_MAX_BULK_ITEMS', 100)
+        if len(items) > max_items:
+            return [cls.create_bulk_error(None, 'input', f'At most {max_items} items are allowed')]
+        return []
+
+    @classmethod
+    def get_instances(cls, inputs):
+        """Return instances for `inputs`, fetching the updated ones at once.
+
+        An id given more than once is an error, so every instance is written
+        and counted once.
+        """
+        model = cls._meta.model
+        type_name = registry.get_type_for_model(model)._meta.name
+        pks, errors = {}, []
+        for index, input in enumerate(inputs):
+            global_id = input.get('id')
+            if not global_id:
+                continue
+            try:
+                _type, pk = from_global_id(global_id)
+                assert _type == type_name, f'Must receive a {type_name} id.'
+                pk = model._meta.pk.to_python(pk)
+                assert pk not in pks.values(), f'Repeated id: {global_id}'
+                pks[index] = pk
+            except (AssertionError, ValidationError, ValueError) as e:
+                message = e.messages[0] if isinstance(e, ValidationError) else str(e)
+                errors.append(cls.create_bulk_error(index, 'id', message or f'Invalid id: {global_id}'))
+        existing = model.objects.in_bulk(pks.values())
+        instances = []
+        for index, input in enumerate(inputs):
+            if not input.get('id'):
+                instances.append(model())
+                continue
+            instance = existing.get(pks.get(index))
+            if instance is None and index in pks:
+                errors.append(cls.create_bulk_error(index, 'id', f"Couldn't resolve to a node: {input['id']}"))
+            instances.append(instance)
+        return instances, errors
+
+    @classmethod
+    def bulk_insert(cls, instances):
+        """`bulk_create()` setting the primary keys of `instances` on every
+        database.
+
+        Databases which can't return the ids of a bulk insert, e.g. SQLite,
+        save every instance instead, which sends model signals.
+        """
+        model = cls._meta.model
+        if connections[router.db_for_write(model)].features.can_return_ids_from_bulk_insert:
+            model.objects.bulk_create(instances)
+            return
+        for instance in instances:
+            instance.save(force_insert=True)
+
+    @classmethod
+    def bulk_save(cls, info, instances, cleaned_inputs):
+        model = cls._meta.model
+        created = [instance for instance in instances if instance.pk is None]
+        updated = [instance for instance in instances if instance.pk is not None]
+        if created:
+            cls.bulk_insert(created)
+        if updated:
+            update_fields = set()
+            for instance, cleaned_input in zip(instances, cleaned_inputs):
+                if instance.pk is not None:
+                    update_fields.update(cleaned_input)
+            fields = []
+            for f in model._meta.concrete_fields:
+                if f.primary_key:
+                    continue
+                if getattr(f, 'auto_now', False):
+                    for instance in updated:
+                        f.pre_save(instance, add=False)
+                    fields.append(f.name)
+                elif f.name in update_fields:
+                    fields.append(f.name)
+            if fields:
+                model.objects.bulk_update(updated, fields)
+
+    @classmethod
+    def success_response(cls, instances):
+        return cls(**{cls._meta.return_field_name: instances, 'count': len(instances), 'errors': []})
+
+    @classmethod
+    def mutate(cls, root, info: graphene.ResolveInfo, **data):
+        if not cls.user_is_allowed(info.context.user, data):
+            raise PermissionDenied()
+
+        inputs = data.get('input') or []
+        errors = cls.check_max_items(inputs)
+        if errors:
+            return cls(count=0, errors=errors)
+
+        instances, errors = cls.get_instances(inputs)
+        # the ids were already resolved by `get_instances`
+        inputs = [{field: value for field, value in input.items() if field != 'id'} for input in inputs]
+        plan = cls._meta.cleaning_plan
+        nodes = get_nodes_by_global_id(chain.from_iterable(plan.get_global_ids(input) for input in inputs))
+        cleaned_inputs = []
+        for index, (instance, input) in enumerate(zip(instances, inputs)):
+            if instance is None:
+                cleaned_inputs.append(None)
+                continue
+            cleaned_input, input_errors = cls.clean_input(info, instance, input, nodes)
+            cls.construct_instance(instance, cleaned_input)
+            input_errors += cls.clean_instance(instance)
+            errors += [cls.create_bulk_error(index, error.field, error.message) for error in input_errors]
+            cleaned_inputs.append(cleaned_input)
+        if errors:
+            return cls(count=0, errors=errors)
+
+        with transaction.atomic():
+            cls.bulk_save(info, instances, cleaned_inputs)
+            for instance, cleaned_input in zip(instances, cleaned_inputs):
+                cls._save_m2m(info, instance, cleaned_input)
+            # bulk writes don't send model signals
+            invalidate_model_on_commit(cls._meta.model)
+        return cls.success_response(instances)
+
+
+class BulkModelDeleteMutation(BulkModelMutation):
+    """Delete many instances of a model with a single `DELETE ... IN`."""
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def clean_instance(cls, info, instance):
+        """Perform additional logic before deleting the model instance.
+
+        Override this method to return errors and abort the deletion process.
+        """
+        return []
+
+    @classmethod
+    def bulk_delete(cls, info, instances):
+        cls._meta.model.objects.filter(pk__in=[instance.pk for instance in instances]).delete()
+
+    @classmethod
+    def mutate(cls, root, info, **data):
+        user = info.context.user
+        if not cls.user_is_allowed(user, data):
+            raise PermissionDenied()
+
+        ids = data.get('ids') or []
+        errors = cls.check_max_items(ids)
+        if errors:
+            return cls(count=0, errors=errors)
+
+        instances, errors = cls.get_instances([{'id': id} for id in ids])
+        for index, instance in enumerate(instances):
+            if instance is not None:
+                errors += [cls.create_bulk_error(index, error.field, error.message)
+                           for error in cls.clean_instance(info, instance)]
+        if errors:
+            return cls(count=0, errors=errors)
+
+        with transaction.atomic():
+            cls.bulk_delete(info, instances)
+            invalidate_model_on_commit(cls._meta.model)
+        return cls.success_response(instances)
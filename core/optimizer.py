@@ -0,0 +1,123 @@
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql.language.ast import Field, FragmentSpread, InlineFragment
+
+CONNECTION_FIELDS = ('edges', 'node')
+
+
+def get_model_fields(model):
+    """Return model fields keyed by the attribute name graphene-django uses.
+
+    Reverse relations are exposed under their accessor name (e.g. `post_set`).
+    """
+    fields = {}
+    for field in model._meta.get_fields():
+        if field.auto_created and not field.concrete:
+            fields[field.get_accessor_name()] = field
+        else:
+            fields[field.name] = field
+    return fields
+
+
+class QueryOptimizer:
+    """Translate a GraphQL selection set into `only()`, `select_related()`
+    and `prefetch_related()` calls on a queryset.
+
+    Only selections matching model fields are taken into account. Fields
+    backed by custom resolvers are skipped, so such resolvers must not rely
+    on columns the client did not ask for.
+    """
+
+    def __init__(self, fragments):
+        self.fragments = fragments
+
+    def get_fields(self, selection_set):
+        """Flatten fragments and return `{field_name: [Field, ...]}`."""
+        fields = {}
+        if selection_set is None:
+            return fields
+        for selection in selection_set.selections:
+            if isinstance(selection, Field):
+                fields.setdefault(selection.name.value, []).append(selection)
+            elif isinstance(selection, FragmentSpread):
+                fragment = self.fragments[selection.name.value]
+                self.merge(fields, self.get_fields(fragment.selection_set))
+            elif isinstance(selection, InlineFragment):
+                self.merge(fields, self.get_fields(selection.selection_set))
+        return fields
+
+    @staticmethod
+    def merge(fields, other):
+        for name, asts in other.items():
+            fields.setdefault(name, []).extend(asts)
+
+    def get_sub_fields(self, asts):
+        fields = {}
+        for ast in asts:
+            self.merge(fields, self.get_fields(ast.selection_set))
+        return fields
+
+    def unwrap_connection(self, fields):
+        """Descend through `edges { node { ... } }` of a Relay connection."""
+        for connection_field in CONNECTION_FIELDS:
+            if connection_field not in fields:
+                return fields
+            fields = self.get_sub_fields(fields[connection_field])
+        return fields
+
+    def collect(self, model, fields, prefix=''):
+        """Return `(only, select_related, prefetch_related)` lookups."""
+        model_fields = get_model_fields(model)
+        only, select_related, prefetch_related = {f'{prefix}{model._meta.pk.name}'}, [], []
+
+        for name, asts in fields.items():
+            field = model_fields.get(to_snake_case(name))
+            if field is None:
+                continue
+            if not field.is_relation:
+                only.add(f'{prefix}{field.name}')
+            elif field.many_to_one or field.one_to_one and field.concrete:
+                only.add(f'{prefix}{field.name}')
+                select_related.append(f'{prefix}{field.name}')
+                nested = self.collect(field.related_model, self.get_sub_fields(asts), f'{prefix}{field.name}__')
+                only.update(nested[0])
+                select_related.extend(nested[1])
+            else:
+                sub_fields = self.get_sub_fields(asts)
+                if any(connection_field in sub_fields for connection_field in CONNECTION_FIELDS):
+                    # connection fields build their own queryset from the
+                    # related manager, a prefetch would be thrown away
+                    continue
+                related_queryset = self.optimize(field.related_model._default_manager.all(), sub_fields)
+                if not field.many_to_many:
+                    # keep the back reference so the prefetch can be joined
+                    related_queryset = ensure_loaded(related_queryset, field.field.name)
+                prefetch_related.append(Prefetch(f'{prefix}{field.get_accessor_name()}', related_queryset))
+        return only, select_related, prefetch_related
+
+    def optimize(self, queryset, fields):
+        only, select_related, prefetch_related = self.collect(queryset.model, fields)
+        queryset = queryset.only(*only)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+
+def optimize_queryset(queryset, info):
+    """Optimize `queryset` returned by the resolver of the field in `info`.
+
+    Both plain object/list fields and Relay connections are supported.
+    """
+    optimizer = QueryOptimizer(info.fragments)
+    fields = optimizer.unwrap_connection(optimizer.get_sub_fields(info.field_asts))
+    return optimizer.optimize(queryset, fields)
+
+
+def ensure_loaded(queryset, *field_names):
+    """Make sure `field_names` are not deferred by a previous `only()`."""
+    loaded, defer = queryset.query.deferred_loading
+    if defer or not loaded:
+        return queryset
+    return queryset.only(*loaded, *field_names)
@@ -0,0 +1,86 @@
+import json
+import time
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from graphene_django.registry import get_global_registry
+
+registry = get_global_registry()
+
+TAG_KEY_PREFIX = 'graphql:tag:'
+RESPONSE_KEY_PREFIX = 'graphql:response:'
+
+
+def get_cache():
+    return caches[getattr(settings, 'GRAPHQL_RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def get_tag_key(model):
+    return f'{TAG_KEY_PREFIX}{model._meta.label_lower}'
+
+
+def get_tag_versions(models):
+    """Return the current version of the invalidation tag of every model.
+
+    Missing tags (never bumped or evicted) are initialized with the current
+    time so they can't match a version stored before the eviction.
+    """
+    cache = get_cache()
+    keys = sorted(get_tag_key(model) for model in models)
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def invalidate_model(model):
+    """Make every cached response depending on `model` stale."""
+    cache, key = get_cache(), get_tag_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_model_on_commit(model, using=None):
+    """Invalidate `model` once the current transaction is committed."""
+    transaction.on_commit(lambda: invalidate_model(model), using=using)
+
+
+def invalidate_on_change(sender, using=None, **kwargs):
+    """`post_save`/`post_delete` receiver for models exposed in the schema."""
+    if registry.get_type_for_model(sender) is not None:
+        invalidate_model_on_commit(sender, using=using)
+
+
+def get_response_key(document_hash, variables, operation_name):
+    payload = json.dumps([document_hash, variables, operation_name], sort_keys=True, default=str)
+    return f'{RESPONSE_KEY_PREFIX}{sha256(payload.encode("utf-8")).hexdigest()}'
+
+
+class ResponseCache:
+    """Cached results of one operation, valid as long as the tags of the
+    models it selects did not change.
+
+    Tag versions must be read before executing the operation: a write
+    committed while it runs then bumps a tag the stored entry doesn't match.
+    """
+
+    def __init__(self, document, variables, operation_name):
+        self.key = get_response_key(document.document_hash, variables, operation_name)
+        self.versions = get_tag_versions(document.models)
+
+    def get(self):
+        """Return cached `(data, extensions)` or None."""
+        entry = get_cache().get(self.key)
+        if entry is not None and entry['versions'] == self.versions:
+            return entry['result']
+        return None
+
+    def set(self, data, extensions):
+        entry = {'versions': self.versions, 'result': (data, extensions)}
+        get_cache().set(self.key, entry, getattr(settings, 'GRAPHQL_RESPONSE_CACHE_TIMEOUT', 300))
@@ -0,0 +1,151 @@
+from itertools import islice
+
+from graphql import GraphQLError
+from graphql.execution import ExecutionResult
+from graphql.execution.base import ResolveInfo
+from graphql.execution.executor import complete_value_catching_error, resolve_field, resolve_or_error
+from graphql.execution.executors.sync import SyncExecutor
+from graphql.execution.middleware import MiddlewareManager
+from graphql.execution.utils import (
+    ExecutionContext, collect_fields, default_resolve_fn, get_field_def, get_operation_root_type)
+from graphql.pyutils.default_ordered_dict import DefaultOrderedDict
+from graphql.type import GraphQLObjectType, get_nullable_type
+from promise import Promise
+
+from .dataloaders import clear_loaders
+
+
+def wait(value):
+    return Promise.resolve(value).get() if Promise.is_thenable(value) else value
+
+
+def resolve(exe_context, field_def, source, info, args):
+    """Run the resolver of `field_def` through the middleware, returning the
+    raised exception on failure."""
+    resolve_fn = exe_context.get_field_resolver(field_def.resolver or default_resolve_fn)
+    try:
+        return wait(resolve_or_error(resolve_fn, source, info, args, exe_context.executor))
+    except Exception as e:
+        return e
+
+
+def execute_streamed(schema, document_ast, chunk_size, root=None, context=None, variables=None,
+                     operation_name=None, middleware=None):
+    """Execute a query operation selecting a single connection field whose
+    edges are serialized as they are read from the database.
+
+    Returns an `ExecutionResult` when the operation fails before reaching the
+    edges, e.g. on invalid arguments, otherwise a `StreamedResult`.
+    """
+    if middleware and not isinstance(middleware, MiddlewareManager):
+        middleware = MiddlewareManager(*middleware)
+    exe_context = ExecutionContext(
+        schema, document_ast, root, context, variables or {}, operation_name, SyncExecutor(), middleware, False)
+    operation = exe_context.operation
+    if operation.operation != 'query':
+        raise GraphQLError('Only query operations can be streamed.', [operation])
+
+    root_type = get_operation_root_type(schema, operation)
+    fields = collect_fields(exe_context, root_type, operation.selection_set, DefaultOrderedDict(list), set())
+    if len(fields) != 1:
+        raise GraphQLError('A streamed operation must select exactly one field.', [operation])
+    (response_key, field_asts), = fields.items()
+    field_def = get_field_def(schema, root_type, field_asts[0].name.value)
+    connection_type = get_nullable_type(field_def.type)
+    if not isinstance(connection_type, GraphQLObjectType) or 'edges' not in connection_type.fields:
+        raise GraphQLError(f'`{response_key}` is not a connection and can\'t be streamed.', field_asts)
+    sub_fields = exe_context.get_sub_fields(connection_type, field_asts)
+    if sum(asts[0].name.value == 'edges' for asts in sub_fields.values()) > 1:
+        raise GraphQLError('The edges of a streamed connection can only be selected once.', field_asts)
+
+    info = ResolveInfo(
+        field_asts[0].name.value, field_asts, field_def.type, root_type,
+        schema=schema, fragments=exe_context.fragments, root_value=root, operation=operation,
+        variable_values=exe_context.variable_values, context=context, path=[response_key],
+    )
+    args = exe_context.get_argument_values(field_def, field_asts[0])
+    # makes `KeysetConnectionField` read the edges lazily
+    context.graphql_stream_chunk_size = chunk_size
+    try:
+        connection = resolve(exe_context, field_def, root, info, args)
+    finally:
+        del context.graphql_stream_chunk_size
+
+    if connection is None or isinstance(connection, Exception):
+        data = complete_value_catching_error(exe_context, field_def.type, field_asts, info, [response_key], connection)
+        return ExecutionResult(data={response_key: data}, errors=exe_context.errors or None)
+    return StreamedResult(exe_context, connection_type, info, sub_fields, connection, chunk_size)
+
+
+class StreamedResult:
+    """Result of `execute_streamed()` serialized by `iter_json()`.
+
+    The edges are completed `chunk_size` at a time, sharing the batches of
+    the dataloaders which are then cleared, so memory doesn't grow with the
+    number of edges. They are written before the other fields of the
+    connection, whose page info is only known once all edges were read.
+    Field errors are reported after the data.
+    """
+
+    def __init__(self, exe_context, connection_type, info, sub_fields, connection, chunk_size):
+        self.exe_context = exe_context
+        self.connection_type = connection_type
+        self.info = info
+        self.sub_fields = sub_fields
+        self.connection = connection
+        self.chunk_size = chunk_size
+        # database alias the edges are read from, None for the primary
+        self.replica = None
+
+    @property
+    def errors(self):
+        return self.exe_context.errors
+
+    def iter_json(self, encode, format_error):
+        """Yield the JSON response, using `encode(value)` to serialize values."""
+        response_key = self.info.path[0]
+        yield '{"data":{' + encode(response_key) + ':{'
+        keys = sorted(self.sub_fields, key=lambda key: self.sub_fields[key][0].name.value != 'edges')
+        for index, key in enumerate(keys):
+            field_asts = self.sub_fields[key]
+            yield (',' if index else '') + encode(key) + ':'
+            path = [response_key, key]
+            if field_asts[0].name.value == 'edges':
+                yield from self.iter_edges(encode, field_asts, path)
+            else:
+                yield encode(wait(resolve_field(
+                    self.exe_context, self.connection_type, self.connection, field_asts, self.info, path)))
+        yield '}}'
+        if self.errors:
+            yield ',"errors":' + encode([format_error(error) for error in self.errors])
+        yield '}'
+
+    def iter_edges(self, encode, field_asts, path):
+        exe_context = self.exe_context
+        field_def = self.connection_type.fields['edges']
+        info = ResolveInfo(
+            'edges', field_asts, field_def.type, self.connection_type,
+            schema=exe_context.schema, fragments=exe_context.fragments, root_value=exe_context.root_value,
+            operation=exe_context.operation, variable_values=exe_context.variable_values,
+            context=exe_context.context_value, path=path,
+        )
+        edges = resolve(exe_context, field_def, self.connection, info, {})
+        if edges is None or isinstance(edges, Exception):
+            yield encode(complete_value_catching_error(exe_context, field_def.type, field_asts, info, path, edges))
+            return
+
+        edge_type = get_nullable_type(field_def.type).of_type
+        edges = iter(edges)
+        count = 0
+        yield '['
+        for chunk in iter(lambda: list(islice(edges, self.chunk_size)), []):
+            # completed within a promise like `execute()` does, so the
+            # dataloaders batch the loads of the whole chunk
+            completed = Promise.resolve(None).then(lambda _, chunk=chunk, count=count: Promise.all([
+                complete_value_catching_error(exe_context, edge_type, field_asts, info, path + [count + index], edge)
+                for index, edge in enumerate(chunk)
+            ])).get()
+            yield (',' if count else '') + ','.join(encode(edge) for edge in completed)
+            count += len(chunk)
+            clear_loaders(exe_context.context_value)
+        yield ']'
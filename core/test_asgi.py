@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db.backends.utils import CursorWrapper
+from django.test import TransactionTestCase, override_settings
+from graphql_jwt.shortcuts import get_token
+
+from blog.models import Post
+
+from .asgi import GraphQLASGIHandler
+from .response_cache import get_cache
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class GraphQLASGIHandlerTestCase(TransactionTestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.handler = GraphQLASGIHandler(max_workers=2)
+        self.user = get_user_model().objects.create_user(username='test', password='test', email='test@test.com')
+        Post.objects.create(title='Title', body='body', author_id=self.user)
+
+    def tearDown(self):
+        self.handler.pool.shutdown()
+
+    def request(self, body, path='/graphql', headers=()):
+        status, _, body = self.call('POST', path, json.dumps(body).encode(), headers)
+        return status, json.loads(body.decode()) if body else None
+
+    def call(self, method, path, body=b'', headers=(), host=b'testserver'):
+        messages = [{'type': 'http.request', 'body': body}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+            'headers': [(b'host', host), (b'content-type', b'application/json'), *headers],
+        }
+        asyncio.run(self.handler(scope, receive, send))
+        return sent[0]['status'], dict(sent[0]['headers']), sent[1]['body']
+
+    def test_root_fields_are_resolved(self):
+        query = '{ currentUser { username } allPosts(first: 1) { edges { node { title authorId { username } } } } }'
+        status, response = self.request({'query': query})
+        self.assertEqual(status, 200)
+        self.assertEqual(response['data'], {
+            'currentUser': None,
+            'allPosts': {'edges': [{'node': {'title': 'Title', 'authorId': {'username': 'test'}}}]},
+        })
+
+    def test_batched_loaders_and_authentication(self):
+        query = '{ currentUser { posts { title } } }'
+        headers = [(b'authorization', f'JWT {get_token(self.user)}'.encode())]
+        status, response = self.request({'query': query}, headers=headers)
+        self.assertEqual(response['data'], {'currentUser': {'posts': [{'title': 'Title'}]}})
+
+    def test_nested_queries_run_in_the_pool(self):
+        execute = CursorWrapper._execute_with_wrappers
+        threads = set()
+
+        def record_thread(*args, **kwargs):
+            threads.add(threading.current_thread())
+            return execute(*args, **kwargs)
+
+        # `postSet` isn't batched, it queries when resolved
+        query = '{ currentUser { postSet(first: 1) { edges { node { title } } } } }'
+        headers = [(b'authorization', f'JWT {get_token(self.user)}'.encode())]
+        with mock.patch.object(CursorWrapper, '_execute_with_wrappers', autospec=True, side_effect=record_thread):
+            status, response = self.request({'query': query}, headers=headers)
+        self.assertEqual(response['data'], {'currentUser': {'postSet': {'edges': [{'node': {'title': 'Title'}}]}}})
+        self.assertTrue(threads)
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_batch(self):
+        status, response = self.request([{'query': '{ currentUser { username } }'}, {'query': '{ unknown }'}])
+        self.assertEqual(status, 400)
+        self.assertEqual(response[0]['data'], {'currentUser': None})
+        self.assertEqual(response[1]['status'], 400)
+
+    def test_other_paths_are_served_by_django(self):
+        self.assertEqual(self.call('GET', '/unknown')[0], 404)
+        status, headers, body = self.call('GET', '/graphql/schema.graphql')
+        self.assertEqual(status, 200)
+        self.assertIn(b'type Query', body)
+        # middleware ran
+        self.assertEqual(headers[b'X-Frame-Options'], b'SAMEORIGIN')
+
+    @override_settings(GRAPHQL_METRICS_TOKEN='secret')
+    def test_metrics(self):
+        query = 'query Posts { allPosts(first: 1) { edges { node { title } } } }'
+        self.request({'query': query, 'operationName': 'Posts'})
+        self.assertEqual(self.call('GET', '/metrics')[0], 403)
+        status, _, body = self.call('GET', '/metrics', headers=[(b'authorization', b'Bearer secret')])
+        self.assertEqual(status, 200)
+        self.assertIn(b'graphql_operation_duration_seconds_count{operation_type="query",operation_name="Posts"}', body)
+
+    def test_host_is_checked(self):
+        body = json.dumps({'query': '{ currentUser { username } }'}).encode()
+        self.assertEqual(self.call('POST', '/graphql', body, host=b'evil.example.com')[0], 400)
+        self.assertEqual(self.call('GET', '/metrics', host=b'evil.example.com')[0], 400)
+
+    def test_invalid_document(self):
+        status, response = self.request({'query': '{ unknown }'})
+        self.assertEqual(status, 400)
+        self.assertIn('errors', response)
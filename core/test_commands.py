@@ -0,0 +1,82 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from blog.models import Post, PostStatusEnum
+from core.management.commands.generate_dataset import Command
+
+
+class GenerateDatasetTestCase(TestCase):
+
+    def generate(self, **options):
+        call_command('generate_dataset', '--end=2026-01-01', users=3, posts=20, batch_size=7, stdout=StringIO(), **options)
+        return list(Post.objects.order_by('created').values_list(
+            'author_id__username', 'title', 'body', 'status', 'created', 'publish_date'))
+
+    def test_dataset_is_reproducible(self):
+        posts = self.generate()
+        self.assertEqual(len(posts), 20)
+        self.assertEqual(User.objects.filter(is_admin=True).count(), 1)
+        self.assertEqual(self.generate(clear=True), posts)
+        self.assertNotEqual(self.generate(clear=True, seed=1), posts)
+
+    def test_publish_dates_follow_status(self):
+        self.generate()
+        for post in Post.objects.all():
+            if post.status == PostStatusEnum.PUBLISHED.value:
+                self.assertGreaterEqual(post.publish_date, post.created)
+
+    def test_other_saves_keep_automatic_timestamps(self):
+        get_title = Command.get_title
+        saved = []
+
+        def save_post(rng):
+            saved.append(Post.objects.create(title='Saved meanwhile', author_id=User.objects.first()))
+            return get_title(rng)
+
+        with mock.patch.object(Command, 'get_title', staticmethod(save_post)):
+            self.generate()
+        self.assertEqual(len(saved), 20)
+        for post in Post.objects.filter(title='Saved meanwhile'):
+            self.assertGreater(post.created, timezone.now() - timedelta(minutes=1))
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class BenchmarkGraphQLTestCase(TestCase):
+
+    def test_report(self):
+        call_command('generate_dataset', users=2, posts=30, stdout=StringIO())
+        stdout = StringIO()
+        call_command('benchmark_graphql', iterations=2, warmup=1, page_size=5, deep_page=2, stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report['dataset'], {'users': 2, 'posts': 30})
+        self.assertEqual(set(report['operations']), {
+            'allPosts.firstPage', 'allPosts.deepPage', 'post', 'currentUser', 'createPost', 'updatePost', 'deletePost'})
+        self.assertEqual(report['operations']['post']['sql_queries']['max'], 1)
+        self.assertEqual(Post.objects.count(), 30)
+
+
+class BenchmarkJSONTestCase(TestCase):
+
+    def test_report(self):
+        stdout = StringIO()
+        call_command('benchmark_json', posts=10, body_size=100, iterations=2, stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(set(report['backends']), {'json', 'orjson'})
+        self.assertEqual(set(report['backends']['json']), {'response', 'rows'})
+        self.assertGreater(report['backends']['json']['response']['encode_ms']['mean'], 0)
+
+
+class BenchmarkStartupTestCase(TestCase):
+
+    def test_report(self):
+        stdout = StringIO()
+        call_command('benchmark_startup', runs=1, stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(set(report['startup_ms']), {'django_setup', 'schema', 'introspection', 'total'})
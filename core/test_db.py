@@ -0,0 +1,150 @@
+import json
+import unittest
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from graphql_jwt.shortcuts import get_token
+
+from accounts.backends import get_cached_user, get_user_cache, get_user_key
+from blog.models import Post
+
+from .db import PIN_COOKIE, get_pin_cache, read_from, route_operation
+from .response_cache import get_cache
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica0'])
+class ReplicaRouterTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        get_pin_cache().clear()
+
+    def test_reads_outside_operations_go_to_the_primary(self):
+        self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    def test_query_reads_go_to_a_replica(self):
+        request = self.factory.post('/graphql')
+        with route_operation(request, 'query'):
+            self.assertEqual(router.db_for_read(Post), 'replica0')
+            self.assertEqual(router.db_for_write(Post), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    @override_settings(DATABASE_REPLICAS=['replica0', 'replica1'])
+    def test_later_reads_go_to_the_replica_of_the_operation(self):
+        with route_operation(self.factory.post('/graphql'), 'query') as replica:
+            self.assertEqual(router.db_for_read(Post), replica)
+        for _ in range(10):
+            with read_from(replica):
+                self.assertEqual(router.db_for_read(Post), replica)
+
+    def test_mutation_pins_the_client_to_the_primary(self):
+        request = self.factory.post('/graphql', HTTP_AUTHORIZATION='JWT token')
+        with route_operation(request, 'mutation'):
+            self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+        self.assertTrue(request.db_pinned)
+
+        # the next request of the same client, without cookies
+        request = self.factory.post('/graphql', HTTP_AUTHORIZATION='JWT token')
+        with route_operation(request, 'query'):
+            self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+        request = self.factory.post('/graphql', HTTP_AUTHORIZATION='JWT other')
+        with route_operation(request, 'query'):
+            self.assertEqual(router.db_for_read(Post), 'replica0')
+
+    def test_queries_filling_a_shared_cache_read_from_the_primary(self):
+        request = self.factory.post('/graphql')
+        with route_operation(request, 'query', fills_cache=True):
+            self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    def test_pin_cookie_reads_from_the_primary(self):
+        request = self.factory.post('/graphql')
+        request.COOKIES[PIN_COOKIE] = '1'
+        with route_operation(request, 'query'):
+            self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    def test_only_the_primary_is_migrated(self):
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, 'blog'))
+        self.assertFalse(router.allow_migrate('replica0', 'blog'))
+
+
+class PinCookieTestCase(TestCase):
+
+    def post(self, query, **extra):
+        return Client().post('/graphql', json.dumps({'query': query}), content_type='application/json', **extra)
+
+    def test_mutation_sets_the_pin_cookie(self):
+        with override_settings(DATABASE_REPLICAS=['replica0']):
+            response = self.post('mutation { verifyToken(token: "x") { payload } }')
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], settings.GRAPHQL_REPLICA_PIN_SECONDS)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_pin_without_replicas(self):
+        response = self.post('mutation { verifyToken(token: "x") { payload } }')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+# not a database: reads routed to it fail, as reads of rows a lagging
+# replica doesn't have yet would
+@override_settings(DATABASE_REPLICAS=['lagging'])
+class CacheFillsTestCase(TransactionTestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        get_user_cache().clear()
+        self.user = User.objects.create(username='author', email='author@example.com')
+        self.post = Post.objects.create(title='Title', author_id=self.user)
+
+    def query(self):
+        body = {'query': '{ allPosts(first: 10) { edges { node { title } } } }'}
+        response = Client().post('/graphql', json.dumps(body), content_type='application/json')
+        return json.loads(response.content.decode())
+
+    def test_response_cache_is_filled_from_the_primary(self):
+        self.assertEqual(self.query()['data']['allPosts']['edges'], [{'node': {'title': 'Title'}}])
+        self.post.title = 'Changed'
+        self.post.save()
+        self.assertEqual(self.query()['data']['allPosts']['edges'], [{'node': {'title': 'Changed'}}])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.query()['data']['allPosts']['edges'], [{'node': {'title': 'Changed'}}])
+
+    def test_user_cache_is_filled_from_the_primary(self):
+        self.user.is_active = False
+        self.user.save()
+        with route_operation(RequestFactory().post('/graphql'), 'query'):
+            self.assertFalse(get_cached_user(self.user.email).is_active)
+        self.assertFalse(get_user_cache().get(get_user_key(self.user.email)).is_active)
+
+
+@unittest.skipUnless(settings.DATABASE_REPLICAS, 'needs DATABASE_REPLICA_URLS')
+class ReplicaQueriesTestCase(TransactionTestCase):
+    databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+
+    def setUp(self):
+        get_pin_cache().clear()
+        self.replica = connections[settings.DATABASE_REPLICAS[0]]
+        self.user = User.objects.create(username='author', email='author@example.com')
+        Post.objects.create(title='post', author_id=self.user)
+
+    def post(self, client, query):
+        return client.post('/graphql', json.dumps({'query': query}), content_type='application/json')
+
+    def test_reads_after_a_mutation_go_to_the_primary(self):
+        # authenticated, the results don't fill the response cache
+        client = Client(HTTP_AUTHORIZATION=f'JWT {get_token(self.user)}')
+        query = '{ allPosts(first: 10) { edges { node { title } } } }'
+        with override_settings(DATABASE_REPLICAS=[self.replica.alias]), CaptureQueriesContext(self.replica) as queries:
+            self.post(client, query)
+        self.assertTrue(queries.captured_queries)
+
+        with override_settings(DATABASE_REPLICAS=[self.replica.alias]):
+            self.post(client, 'mutation { verifyToken(token: "x") { payload } }')
+            with CaptureQueriesContext(self.replica) as queries:
+                self.post(client, query)
+        self.assertFalse(queries.captured_queries)
@@ -0,0 +1,61 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from blog.models import PostStatusEnum
+from . import encoding
+from .encoding import OrjsonBackend, StdlibJSONBackend, get_json_backend, load_json_backend
+
+VALUE = {
+    'status': PostStatusEnum.PUBLISHED,
+    'created': datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    'score': Decimal('1.50'),
+    'tags': ['a', None, 1, 2.5, True],
+}
+
+
+class JSONBackendTestCase(TestCase):
+
+    def tearDown(self):
+        load_json_backend.cache_clear()
+
+    def test_native_values_are_encoded(self):
+        expected = {'status': 2, 'created': '2026-01-02T03:04:05Z', 'score': '1.50', 'tags': ['a', None, 1, 2.5, True]}
+        self.assertEqual(json.loads(StdlibJSONBackend().dumps(VALUE)), expected)
+
+    @skipIf(encoding.orjson is None, 'orjson is not installed')
+    def test_backends_agree(self):
+        stdlib, fast = StdlibJSONBackend(), OrjsonBackend()
+        self.assertEqual(fast.loads(fast.dumps(VALUE)), stdlib.loads(stdlib.dumps(VALUE)))
+        self.assertEqual(fast.dumps(VALUE, pretty=True), stdlib.dumps(VALUE, pretty=True))
+        self.assertEqual(fast.loads(b'{"query": "{ a }"}'), {'query': '{ a }'})
+
+    def test_missing_library_falls_back_to_stdlib(self):
+        load_json_backend.cache_clear()
+        with mock.patch.object(encoding, 'orjson', None), self.assertLogs('core.encoding', 'WARNING'):
+            self.assertIsInstance(get_json_backend(), StdlibJSONBackend)
+            self.assertNotIsInstance(get_json_backend(), OrjsonBackend)
+
+
+@override_settings(GRAPHQL_JSON_BACKEND='core.encoding.StdlibJSONBackend', DATABASE_REPLICAS=[])
+class ViewJSONBackendTestCase(TestCase):
+
+    def setUp(self):
+        self._client = Client()
+
+    def test_body_is_decoded_by_the_backend(self):
+        with mock.patch.object(StdlibJSONBackend, 'loads', side_effect=ValueError) as loads:
+            response = self._client.post('/graphql', '{"query": "{ currentUser { id } }"}', content_type='application/json')
+        loads.assert_called_once()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('invalid JSON', response.content.decode())
+
+    def test_response_is_encoded_by_the_backend(self):
+        response = self._client.post(
+            '/graphql?pretty=1', json.dumps({'query': '{ currentUser { id } }'}), content_type='application/json')
+        self.assertEqual(json.loads(response.content.decode())['data'], {'currentUser': None})
+        self.assertIn('\n  "data": {\n', response.content.decode())
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from graphql.utils.introspection_query import introspection_query
+
+from schema import schema
+from . import views
+from .introspection import SchemaIntrospection, get_schema_introspection, is_introspection_only
+from .views import document_cache
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class IntrospectionTestCase(TestCase):
+
+    def setUp(self):
+        self._client = Client()
+        document_cache.clear()
+
+    def query(self, query):
+        response = self._client.post('/graphql', json.dumps({'query': query}), content_type='application/json')
+        return json.loads(response.content.decode())
+
+    def test_introspection_only_documents(self):
+        parse = views.parse
+        self.assertTrue(is_introspection_only(parse('{ __schema { queryType { name } } __typename }')))
+        self.assertFalse(is_introspection_only(parse('{ __typename currentUser { id } }')))
+        self.assertFalse(is_introspection_only(parse('query q($name: String!) { __type(name: $name) { name } }')))
+
+    def test_introspection_is_executed_once(self):
+        query = '{ __schema { queryType { name } } }'
+        with mock.patch.object(views, 'execute', wraps=views.execute) as execute:
+            for _ in range(2):
+                self.assertEqual(self.query(query)['data'], {'__schema': {'queryType': {'name': 'Query'}}})
+        self.assertEqual(execute.call_count, 1)
+
+    def test_standard_introspection_query_is_precomputed(self):
+        with mock.patch.object(views, 'execute') as execute:
+            result = self.query(introspection_query)
+        execute.assert_not_called()
+        self.assertEqual(result['data'], schema.introspect())
+
+    def test_precomputed_result_has_the_extensions_of_executed_ones(self):
+        precomputed = self.query(introspection_query)
+        document_cache.clear()
+        # not the text of the standard query, executed
+        executed = self.query('# executed\n' + introspection_query)
+        self.assertEqual(precomputed['extensions'], {'cost': 0})
+        self.assertEqual(executed['extensions'], precomputed['extensions'])
+
+    def test_schema_definition_is_served_with_etag(self):
+        introspection = get_schema_introspection(schema)
+        response = self._client.get('/graphql/schema.graphql')
+        self.assertEqual(response.content.decode(), introspection.sdl)
+        self.assertEqual(response['ETag'], f'"{introspection.version}"')
+        response = self._client.get('/graphql/schema.json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self._client.get('/graphql/schema.json')
+        self.assertEqual(json.loads(response.content.decode())['data'], schema.introspect())
+
+
+class IntrospectionFileTestCase(TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def test_built_file_is_read(self):
+        call_command('build_introspection', output=self.path, stdout=StringIO())
+        with mock.patch.object(SchemaIntrospection, 'execute') as execute:
+            introspection = SchemaIntrospection(schema, self.path)
+        execute.assert_not_called()
+        self.assertEqual(introspection.result, schema.introspect())
+
+    def test_file_of_another_schema_is_ignored(self):
+        with open(self.path, 'w') as f:
+            json.dump({'version': 'other', 'sdl': '', 'introspection': {}}, f)
+        with self.assertLogs('core.introspection', 'WARNING'):
+            introspection = SchemaIntrospection(schema, self.path)
+        self.assertEqual(introspection.result, schema.introspect())
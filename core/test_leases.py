@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.test import TestCase
+
+from .leases import acquire_lease, release_lease
+from .models import Lease
+
+
+class LeaseTestCase(TestCase):
+
+    def test_only_one_owner_holds_the_lease(self):
+        duration = timedelta(minutes=1)
+        self.assertTrue(acquire_lease('job', 'a', duration))
+        self.assertFalse(acquire_lease('job', 'b', duration))
+        # renewal
+        self.assertTrue(acquire_lease('job', 'a', duration))
+
+        release_lease('job', 'b')
+        self.assertFalse(acquire_lease('job', 'b', duration))
+        release_lease('job', 'a')
+        self.assertTrue(acquire_lease('job', 'b', duration))
+
+    def test_expired_lease_is_taken_over(self):
+        self.assertTrue(acquire_lease('job', 'a', timedelta(minutes=-1)))
+        self.assertTrue(acquire_lease('job', 'b', timedelta(minutes=1)))
+        self.assertEqual(Lease.objects.get(name='job').owner, 'b')
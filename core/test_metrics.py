@@ -0,0 +1,89 @@
+import json
+
+from django.db import DatabaseError
+from django.test import TestCase, Client, override_settings
+
+from .metrics import Counter, Gauge, Histogram, registry
+
+
+class MetricTestCase(TestCase):
+
+    def test_histogram_is_rendered_with_cumulative_buckets(self):
+        histogram = Histogram('duration_seconds', 'Duration.', ('name',), buckets=(1, 2))
+        histogram.observe(0.5, 'a')
+        histogram.observe(1.5, 'a')
+        histogram.observe(3, 'a')
+        self.assertEqual(histogram.render().splitlines(), [
+            '# HELP duration_seconds Duration.',
+            '# TYPE duration_seconds histogram',
+            'duration_seconds_bucket{name="a",le="1"} 1',
+            'duration_seconds_bucket{name="a",le="2"} 2',
+            'duration_seconds_bucket{name="a",le="+Inf"} 3',
+            'duration_seconds_sum{name="a"} 5.0',
+            'duration_seconds_count{name="a"} 3',
+        ])
+
+    def test_series_are_capped(self):
+        counter = Counter('errors', 'Errors.', ('name',), max_series=2)
+        for name in ('a', 'b', 'c', 'd'):
+            counter.inc(name)
+        self.assertEqual(counter.render().splitlines()[2:], [
+            'errors_total{name="__other__"} 2',
+            'errors_total{name="a"} 1',
+            'errors_total{name="b"} 1',
+        ])
+
+    def test_gauge_function_is_reused_and_may_fail(self):
+        calls = []
+
+        def function():
+            calls.append(None)
+            if len(calls) > 1:
+                raise DatabaseError('down')
+            return 3
+
+        gauge = Gauge('lag', 'Lag.', function=function, max_age=60)
+        self.assertEqual(gauge.render().splitlines()[2:], ['lag 3'])
+        self.assertEqual(gauge.render().splitlines()[2:], ['lag 3'])
+        self.assertEqual(len(calls), 1)
+
+        gauge.clear()
+        with self.assertLogs('core.metrics', 'ERROR'):
+            self.assertEqual(gauge.render().splitlines()[2:], [])
+
+
+@override_settings(GRAPHQL_METRICS_TOKEN='secret', DATABASE_REPLICAS=[])
+class MetricsEndpointTestCase(TestCase):
+
+    def setUp(self):
+        self._client = Client()
+        registry.clear()
+
+    def query(self, query):
+        body = json.dumps({'query': query, 'operationName': 'Posts'})
+        return self._client.post('/graphql', body, content_type='application/json')
+
+    def metrics(self):
+        response = self._client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode().splitlines()
+
+    def test_operations_and_fields_are_recorded(self):
+        with self.settings(GRAPHQL_METRICS_FIELD_SAMPLE_RATE=1):
+            self.query('query Posts { allPosts(first: 1) { edges { node { title } } } }')
+        lines = self.metrics()
+        self.assertIn('graphql_operation_duration_seconds_count{operation_type="query",operation_name="Posts"} 1', lines)
+        self.assertIn('graphql_operation_sql_queries_sum{operation_type="query",operation_name="Posts"} 1', lines)
+        self.assertIn('graphql_field_duration_seconds_count{parent_type="Query",field="allPosts"} 1', lines)
+
+    def test_errors_are_counted(self):
+        self.query('query Posts { allPosts { edges { node { title } } } }')
+        lines = self.metrics()
+        self.assertIn('graphql_operation_errors_total{operation_type="query",operation_name="Posts"} 1', lines)
+        self.assertIn('graphql_field_errors_total{parent_type="Query",field="allPosts"} 1', lines)
+
+    def test_scrapers_must_send_the_token(self):
+        self.assertEqual(self._client.get('/metrics').status_code, 403)
+        self.assertEqual(self._client.get('/metrics', HTTP_AUTHORIZATION='Bearer other').status_code, 403)
+        with self.settings(GRAPHQL_METRICS_TOKEN=None):
+            self.assertEqual(self._client.get('/metrics', HTTP_AUTHORIZATION='Bearer None').status_code, 403)
@@ -0,0 +1,207 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from graphql_jwt.shortcuts import get_token
+from graphql_relay import to_global_id
+
+from blog.models import Post
+from .testing import GraphQlTestHelper
+
+# every authenticated request loads the session and its user
+SESSION_QUERIES = 2
+
+# writes changing the post counters of an author update them and look up
+# the author's email to drop cached copies of the user
+COUNTER_QUERIES = 2
+
+# full_clean() checks that the author of every saved post exists
+VALIDATION_QUERIES = 1
+
+# number of authors and posts per author seeded before each check, budgets
+# must hold at every scale
+SCALES = (2, 6)
+
+
+class QueryBudgetTestCase(GraphQlTestHelper):
+    """Maximum number of SQL queries of every root field of `schema.py`."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = get_user_model().objects.create_user(
+            username='admin', password='test', email='admin@test.com', is_staff=True, is_admin=True)
+        self._client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+        self.authors = []
+
+    def seed(self, scale):
+        """Create authors until there are `scale`, each with `scale` posts."""
+        User = get_user_model()
+        for index in range(len(self.authors), scale):
+            self.authors.append(User.objects.create_user(
+                username=f'author{index}', password='test', email=f'author{index}@test.com'))
+        Post.objects.bulk_create([
+            Post(title=f'Post {index}', body='body', author_id=author)
+            for author in self.authors
+            for index in range(author.post_set.count(), scale)
+        ])
+
+    def assertBudget(self, query, variables=None, max_queries=0, max_rows=None):
+        """Run `query` at every scale of `SCALES` within the same budget.
+
+        `variables` may be a callable building them once data is seeded.
+        """
+        for scale in SCALES:
+            self.seed(scale)
+            with self.subTest(scale=scale):
+                scale_variables = variables() if callable(variables) else variables
+                with self.assertQueryBudget(max_queries, max_rows):
+                    response = self.query(query, variables=scale_variables)
+                self.assertNotIn('errors', response)
+                for result in response['data'].values():
+                    self.assertFalse(isinstance(result, dict) and result.get('errors'), result)
+
+    def post_id(self):
+        return to_global_id('PostType', Post.objects.filter(author_id=self.authors[0]).latest('pk').pk)
+
+    def test_post(self):
+        self.assertBudget(
+            'query post($id: ID) { post(id: $id) { title authorId { username posts { title } } } }',
+            lambda: {'id': Post.objects.latest('pk').pk},
+            max_queries=SESSION_QUERIES + 2,
+        )
+
+    def test_all_posts(self):
+        self.assertBudget(
+            '{ allPosts(first: 10) { edges { node { title authorId { username } } } } }',
+            max_queries=SESSION_QUERIES + 1,
+            # session, its user, one page (plus the lookahead row) of posts with authors
+            max_rows=2 + 2 * 11,
+        )
+
+    def test_all_posts_with_author_posts(self):
+        self.assertBudget(
+            '{ allPosts(first: 10) { edges { node { title authorId { username posts { title } } } } } }',
+            max_queries=SESSION_QUERIES + 2,
+        )
+
+    def test_search_posts(self):
+        self.assertBudget(
+            '{ searchPosts(query: "post", first: 10) { edges { rank snippet node { title authorId { username } } } } }',
+            max_queries=SESSION_QUERIES + 1,
+        )
+
+    def test_user(self):
+        self.assertBudget(
+            'query user($id: ID!) { user(id: $id) { username posts { title authorId { username } } } }',
+            lambda: {'id': self.authors[0].pk},
+            max_queries=SESSION_QUERIES + 3,
+        )
+
+    def test_current_user(self):
+        self.assertBudget('{ currentUser { username posts { title } } }', max_queries=SESSION_QUERIES + 1)
+
+    def test_all_users(self):
+        self.assertBudget(
+            '{ allUsers(first: 10) { edges { node { username posts { title } } } } }',
+            max_queries=SESSION_QUERIES + 2,
+        )
+
+    def test_create_post(self):
+        self.assertBudget(
+            '''mutation createPost($input: PostCreateInput!) {
+                createPost(input: $input) { post { title authorId { username } } errors { message } }
+            }''',
+            lambda: {'input': {'title': 'New', 'body': 'body', 'authorId': to_global_id('UserType', self.authors[0].pk)}},
+            max_queries=SESSION_QUERIES + COUNTER_QUERIES + VALIDATION_QUERIES + 2,
+        )
+
+    def test_update_post(self):
+        self.assertBudget(
+            '''mutation updatePost($id: ID!, $input: PostInput!) {
+                updatePost(id: $id, input: $input) { post { title } errors { message } }
+            }''',
+            lambda: {'id': self.post_id(), 'input': {'title': 'Updated'}},
+            max_queries=SESSION_QUERIES + 3,
+        )
+
+    def test_delete_post(self):
+        self.assertBudget(
+            'mutation deletePost($id: ID!) { deletePost(id: $id) { errors { message } } }',
+            lambda: {'id': self.post_id()},
+            max_queries=SESSION_QUERIES + COUNTER_QUERIES + 2,
+        )
+
+    def test_bulk_create_posts(self):
+        author_id = lambda: to_global_id('UserType', self.authors[-1].pk)  # noqa: E731
+        # one INSERT per post on databases which can't return the ids of a bulk insert
+        inserts = 1 if connection.features.can_return_ids_from_bulk_insert else 5
+        self.assertBudget(
+            '''mutation bulkCreatePosts($input: [PostCreateInput!]!) {
+                bulkCreatePosts(input: $input) { count errors { message } }
+            }''',
+            lambda: {'input': [{'title': f'New {i}', 'body': 'body', 'authorId': author_id()} for i in range(5)]},
+            max_queries=SESSION_QUERIES + COUNTER_QUERIES + 5 * VALIDATION_QUERIES + 3 + inserts,
+        )
+
+    def test_bulk_update_posts(self):
+        self.assertBudget(
+            '''mutation bulkUpdatePosts($input: [PostBulkUpdateInput!]!) {
+                bulkUpdatePosts(input: $input) { count errors { message } }
+            }''',
+            lambda: {'input': [
+                {'id': to_global_id('PostType', pk), 'title': 'Updated'}
+                for pk in Post.objects.values_list('pk', flat=True)[:5]
+            ]},
+            max_queries=SESSION_QUERIES + 5 * VALIDATION_QUERIES + 5,
+        )
+
+    def test_bulk_delete_posts(self):
+        self.assertBudget(
+            'mutation bulkDeletePosts($ids: [ID!]!) { bulkDeletePosts(ids: $ids) { count errors { message } } }',
+            lambda: {'ids': [to_global_id('PostType', pk) for pk in Post.objects.values_list('pk', flat=True)[:2]]},
+            max_queries=SESSION_QUERIES + COUNTER_QUERIES + 5,
+        )
+
+    def test_register_user(self):
+        counter = iter(range(len(SCALES)))
+        self.assertBudget(
+            '''mutation registerUser($input: UserRegisterInput!) {
+                registerUser(input: $input) { user { username } errors { message } }
+            }''',
+            lambda: {'input': {'email': f'new{next(counter)}@test.com', 'username': 'new', 'password': 'secret'}},
+            max_queries=SESSION_QUERIES + 2,
+        )
+
+    def test_update_user(self):
+        self.assertBudget(
+            '''mutation updateUser($id: ID!, $input: UserInput!) {
+                updateUser(id: $id, input: $input) { user { username } errors { message } }
+            }''',
+            lambda: {'id': to_global_id('UserType', self.authors[0].pk), 'input': {'username': 'updated'}},
+            max_queries=SESSION_QUERIES + 3,
+        )
+
+    def test_delete_user(self):
+        self.assertBudget(
+            'mutation deleteUser($id: ID!) { deleteUser(id: $id) { errors { message } } }',
+            lambda: {'id': to_global_id('UserType', self.authors.pop().pk)},
+            max_queries=SESSION_QUERIES + 5,
+        )
+
+    def test_token_auth(self):
+        self.assertBudget(
+            'mutation { tokenAuth(email: "admin@test.com", password: "test") { token } }',
+            max_queries=SESSION_QUERIES + 1,
+        )
+
+    def test_verify_token(self):
+        self.assertBudget(
+            'mutation verifyToken($token: String!) { verifyToken(token: $token) { payload } }',
+            lambda: {'token': get_token(self.admin)},
+            max_queries=SESSION_QUERIES,
+        )
+
+    def test_refresh_token(self):
+        self.assertBudget(
+            'mutation refreshToken($token: String!) { refreshToken(token: $token) { token } }',
+            lambda: {'token': get_token(self.admin)},
+            max_queries=SESSION_QUERIES + 1,
+        )
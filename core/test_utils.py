@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from graphql import GraphQLError
+from graphql_relay import to_global_id
+
+from accounts.types import UserType
+from blog.models import Post
+from blog.types import PostType
+from .utils import get_nodes
+
+
+class GetNodesTestCase(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='test', password='test', email='test@test.com')
+        self.posts = [Post.objects.create(title=f'Post {i}', body='body', author_id=self.user) for i in range(3)]
+
+    def test_nodes_are_returned_in_order_of_ids(self):
+        posts = self.posts[::-1]
+        ids = [to_global_id(PostType._meta.name, post.id) for post in posts]
+        with self.assertNumQueries(1):
+            self.assertEqual(get_nodes(ids), posts)
+
+    def test_mixed_types_use_one_query_per_model(self):
+        ids = [to_global_id(PostType._meta.name, self.posts[0].id), to_global_id(UserType._meta.name, self.user.id),
+               to_global_id(PostType._meta.name, self.posts[1].id)]
+        with self.assertNumQueries(2):
+            self.assertEqual(get_nodes(ids), [self.posts[0], self.user, self.posts[1]])
+
+    def test_all_missing_ids_are_reported(self):
+        missing = [to_global_id(PostType._meta.name, 0), to_global_id(UserType._meta.name, 0)]
+        with self.assertRaises(GraphQLError) as error:
+            get_nodes([to_global_id(PostType._meta.name, self.posts[0].id)] + missing)
+        for global_id in missing:
+            self.assertIn(global_id, str(error.exception))
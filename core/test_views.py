@@ -0,0 +1,298 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from graphql_jwt.settings import jwt_settings
+from graphql_jwt.shortcuts import get_token
+
+from accounts.backends import claims_cache, get_user_cache
+from blog.models import Post
+
+from .models import PersistedQuery
+from .response_cache import get_cache
+from .utils import LRUCache
+from .views import PERSISTED_QUERY_NOT_FOUND, document_cache, get_document_hash, persisted_query_cache
+
+
+class LRUCacheTestCase(TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats(), {'size': 2, 'maxsize': 2, 'hits': 1, 'misses': 1, 'evictions': 1})
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class DocumentCacheTestCase(TestCase):
+
+    def setUp(self):
+        self._client = Client()
+        document_cache.clear()
+
+    def query(self, query):
+        response = self._client.post('/graphql', json.dumps({'query': query}), content_type='application/json')
+        return json.loads(response.content.decode())
+
+    def test_documents_are_parsed_once(self):
+        query = '{ currentUser { email } }'
+        self.assertEqual(self.query(query)['data'], {'currentUser': None})
+        self.assertEqual(self.query(query)['data'], {'currentUser': None})
+        stats = document_cache.stats()
+        self.assertEqual((stats['size'], stats['hits'], stats['misses']), (1, 1, 1))
+
+    def test_validation_errors_are_cached(self):
+        query = '{ unknownField }'
+        for _ in range(2):
+            self.assertIn('errors', self.query(query))
+        self.assertEqual(document_cache.stats()['hits'], 1)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class PersistedQueryTestCase(TestCase):
+
+    def setUp(self):
+        self._client = Client()
+        persisted_query_cache.clear()
+
+    @staticmethod
+    def extensions(query):
+        return {'persistedQuery': {'version': 1, 'sha256Hash': get_document_hash(query)}}
+
+    def get(self, query):
+        response = self._client.get('/graphql', {'extensions': json.dumps(self.extensions(query))})
+        return response, json.loads(response.content.decode())
+
+    def test_register_on_miss_and_get_by_hash(self):
+        query = '{ currentUser { email } }'
+        _, json_resp = self.get(query)
+        self.assertEqual(json_resp, {'errors': [{'message': PERSISTED_QUERY_NOT_FOUND}]})
+
+        body = {'query': query, 'extensions': self.extensions(query)}
+        self._client.post('/graphql', json.dumps(body), content_type='application/json')
+        self.assertTrue(PersistedQuery.objects.filter(sha256_hash=get_document_hash(query)).exists())
+
+        persisted_query_cache.clear()
+        response, json_resp = self.get(query)
+        self.assertEqual(json_resp['data'], {'currentUser': None})
+        self.assertIn('public', response['Cache-Control'])
+
+    def test_hash_mismatch_is_rejected(self):
+        body = {'query': '{ currentUser { email } }', 'extensions': self.extensions('{ other }')}
+        response = self._client.post('/graphql', json.dumps(body), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PersistedQuery.objects.exists())
+
+    def test_malformed_extensions_are_rejected(self):
+        for extensions in ([1], {'persistedQuery': 'x'}):
+            body = {'query': '{ currentUser { email } }', 'extensions': extensions}
+            response = self._client.post('/graphql', json.dumps(body), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        response = self._client.get('/graphql', {'query': '{ currentUser { email } }', 'extensions': '"x"'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_mutations_are_rejected_over_get(self):
+        query = 'mutation { verifyToken(token: "x") { payload } }'
+        PersistedQuery.objects.create(sha256_hash=get_document_hash(query), query=query)
+        response, _ = self.get(query)
+        self.assertEqual(response.status_code, 405)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class QueryCostTestCase(TestCase):
+
+    def setUp(self):
+        self._client = Client()
+
+    def query(self, query):
+        response = self._client.post('/graphql', json.dumps({'query': query}), content_type='application/json')
+        return response, json.loads(response.content.decode())
+
+    def test_cost_is_reported(self):
+        # allPosts + 10 * (authorId + posts(2 + 20 * 0))
+        _, json_resp = self.query('{ allPosts(first: 10) { edges { node { title authorId { posts { title } } } } } }')
+        self.assertEqual(json_resp['extensions'], {'cost': 2 + 10 * (1 + 2)})
+
+    def test_expensive_query_is_rejected(self):
+        response, json_resp = self.query(
+            '{ allUsers(first: 100) { edges { node { posts { authorId { posts { title } } } } } } }')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('maximum allowed cost', json_resp['errors'][0]['message'])
+
+    def test_deep_query_is_rejected(self):
+        response, json_resp = self.query(
+            '{ currentUser { posts { authorId { posts { authorId { posts { authorId { posts { authorId '
+            '{ posts { authorId { email } } } } } } } } } } } }')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('maximum allowed depth', json_resp['errors'][0]['message'])
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class ResponseCacheTestCase(TransactionTestCase):
+
+    def setUp(self):
+        self._client = Client()
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user(username='test', password='test', email='test@test.com')
+        self.post = Post.objects.create(title='Title', body='body', author_id=self.user)
+
+    def query(self):
+        body = {'query': '{ allPosts(first: 10) { edges { node { title } } } }'}
+        response = self._client.post('/graphql', json.dumps(body), content_type='application/json')
+        return json.loads(response.content.decode())['data']['allPosts']['edges']
+
+    def test_anonymous_queries_are_cached_until_a_write(self):
+        self.assertEqual(self.query(), [{'node': {'title': 'Title'}}])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.query(), [{'node': {'title': 'Title'}}])
+
+        self.post.title = 'Changed'
+        self.post.save()
+        self.assertEqual(self.query(), [{'node': {'title': 'Changed'}}])
+
+    def test_authenticated_queries_are_not_cached(self):
+        self._client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.query()
+        Post.objects.filter(pk=self.post.pk).update(title='Changed')
+        self.assertEqual(self.query(), [{'node': {'title': 'Changed'}}])
+
+    def test_jwt_cookie_queries_are_not_cached(self):
+        self._client.cookies[jwt_settings.JWT_COOKIE_NAME] = get_token(self.user)
+        body = {'query': '{ currentUser { email } }'}
+        self._client.get('/graphql', body)
+        response = self._client.get('/graphql', body)
+        self.assertNotIn('public', response['Cache-Control'])
+
+        response = Client().get('/graphql', body)
+        self.assertEqual(json.loads(response.content.decode())['data'], {'currentUser': None})
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class BatchTestCase(TestCase):
+
+    def setUp(self):
+        self._client = Client()
+        get_cache().clear()
+        claims_cache.clear()
+        self.user = get_user_model().objects.create_user(username='test', password='test', email='test@test.com')
+        self.token = get_token(self.user)
+
+    def post(self, body):
+        response = self._client.post(
+            '/graphql', json.dumps(body), content_type='application/json', HTTP_AUTHORIZATION=f'JWT {self.token}')
+        return response.status_code, json.loads(response.content.decode())
+
+    def test_operations_are_answered_in_order(self):
+        status, response = self.post([
+            {'id': 1, 'query': '{ currentUser { username } }'},
+            {'id': 2, 'query': '{ unknown }'},
+            {'id': 3, 'query': 'query { currentUser { email } }'},
+        ])
+        self.assertEqual(status, 400)
+        self.assertEqual([entry['id'] for entry in response], [1, 2, 3])
+        self.assertEqual([entry['status'] for entry in response], [200, 400, 200])
+        self.assertEqual(response[0]['data'], {'currentUser': {'username': 'test'}})
+        self.assertEqual(response[2]['data'], {'currentUser': {'email': 'test@test.com'}})
+
+    def test_user_is_authenticated_once(self):
+        get_user_cache().clear()
+        with self.assertNumQueries(1):
+            status, response = self.post([{'query': '{ currentUser { username } }'}] * 3)
+        self.assertEqual([entry['data'] for entry in response], [{'currentUser': {'username': 'test'}}] * 3)
+
+    def test_persisted_query_miss_fails_one_operation(self):
+        extensions = {'persistedQuery': {'version': 1, 'sha256Hash': get_document_hash('{ unknown }')}}
+        status, response = self.post([{'extensions': extensions}, {'query': '{ currentUser { username } }'}])
+        self.assertEqual(response[0]['errors'][0]['message'], PERSISTED_QUERY_NOT_FOUND)
+        self.assertEqual(response[1]['data'], {'currentUser': {'username': 'test'}})
+
+    def test_batch_size_is_capped(self):
+        with self.settings(GRAPHQL_MAX_BATCH_SIZE=2):
+            status, response = self.post([{'query': '{ currentUser { username } }'}] * 3)
+        self.assertEqual(status, 400)
+        self.assertIn('limited to 2 operations', response['errors'][0]['message'])
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class StreamingTestCase(TestCase):
+
+    def setUp(self):
+        self._client = Client()
+        self.admin = get_user_model().objects.create_user(
+            username='admin', password='test', email='admin@test.com', is_staff=True)
+        self.authors = [
+            get_user_model().objects.create_user(username=f'author{i}', password='test', email=f'author{i}@test.com')
+            for i in range(3)
+        ]
+        Post.objects.bulk_create([
+            Post(title=f'Post {i}', body='body', author_id=self.authors[i % 3]) for i in range(7)
+        ])
+        self._client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+
+    def stream(self, query, variables=None):
+        response = self._client.post('/graphql', json.dumps({
+            'query': query, 'variables': variables, 'extensions': {'stream': True}}), content_type='application/json')
+        if response.streaming:
+            return response.status_code, json.loads(b''.join(response.streaming_content).decode())
+        return response.status_code, json.loads(response.content.decode())
+
+    def test_edges_are_streamed_in_chunks(self):
+        query = '''{ allPosts(first: 6) {
+            pageInfo { hasNextPage endCursor } edges { cursor node { title authorId { username posts { title } } } }
+        } }'''
+        with self.settings(GRAPHQL_STREAM_CHUNK_SIZE=2):
+            # session, user, the posts with their authors, then the posts of
+            # the authors once per chunk of two edges
+            with self.assertNumQueries(2 + 1 + 3):
+                status, streamed = self.stream(query)
+        self.assertEqual(status, 200)
+        connection = streamed['data']['allPosts']
+        self.assertEqual([edge['node']['title'] for edge in connection['edges']], [f'Post {i}' for i in range(6)])
+        self.assertEqual(
+            connection['edges'][1]['node']['authorId']['posts'], [{'title': 'Post 1'}, {'title': 'Post 4'}])
+        self.assertEqual(connection['pageInfo'], {'hasNextPage': True, 'endCursor': connection['edges'][-1]['cursor']})
+
+        response = self._client.post('/graphql', json.dumps({'query': query}), content_type='application/json')
+        self.assertEqual(json.loads(response.content.decode())['data'], streamed['data'])
+
+    def test_stream_limit_replaces_query_cost(self):
+        with self.settings(GRAPHQL_MAX_QUERY_COST=10, GRAPHQL_STREAM_MAX_LIMIT=5):
+            status, response = self.stream('{ allPosts(first: 5) { edges { node { title } } } }')
+            self.assertEqual(len(response['data']['allPosts']['edges']), 5)
+            status, response = self.stream('{ allPosts(first: 6) { edges { node { title } } } }')
+        self.assertEqual(response['data'], {'allPosts': None})
+        self.assertIn('exceeds the limit of 5 records', response['errors'][0]['message'])
+
+    def test_depth_and_nested_costs_are_checked(self):
+        document_cache.clear()
+        with self.settings(GRAPHQL_MAX_QUERY_DEPTH=4):
+            status, response = self.stream('{ allPosts(first: 5) { edges { node { authorId { username } } } } }')
+        self.assertEqual(status, 400)
+        self.assertIn('maximum allowed depth is 4', response['errors'][0]['message'])
+
+        # the root connection and one author with its posts per edge, whatever the page size
+        query = '{ allPosts(first: 5) { edges { node { title authorId { posts { title } } } } } }'
+        with self.settings(GRAPHQL_MAX_QUERY_COST=5):
+            status, response = self.stream(query)
+        self.assertEqual(status, 200)
+        document_cache.clear()
+        with self.settings(GRAPHQL_MAX_QUERY_COST=4):
+            status, response = self.stream(query)
+        self.assertEqual(status, 400)
+        self.assertIn('maximum allowed cost is 4', response['errors'][0]['message'])
+
+    def test_only_staff_can_stream(self):
+        self._client.force_login(self.authors[0], backend='django.contrib.auth.backends.ModelBackend')
+        status, response = self.stream('{ allPosts(first: 5) { edges { node { title } } } }')
+        self.assertEqual(response['data'], {'allPosts': None})
+        self.assertEqual(response['errors'][0]['message'], 'Only staff users can stream connections.')
+
+    def test_only_single_connections_are_streamed(self):
+        status, response = self.stream('{ currentUser { username } }')
+        self.assertEqual(status, 400)
+        self.assertIn('not a connection', response['errors'][0]['message'])
+        status, response = self.stream('{ allPosts(first: 1) { edges { cursor } } allUsers(first: 1) { edges { cursor } } }')
+        self.assertEqual(status, 400)
@@ -0,0 +1,113 @@
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import post_init
+from django.test import TestCase, Client, override_settings
+
+from .response_cache import get_cache
+
+resolver_path = ContextVar('resolver_path', default=None)
+
+
+class ResolverPathMiddleware:
+    """Remember the path of the field being resolved, so queries can be
+    attributed to the resolver running them."""
+
+    def resolve(self, next, root, info, **args):
+        token = resolver_path.set('.'.join(str(key) for key in info.path))
+        try:
+            return next(root, info, **args)
+        finally:
+            resolver_path.reset(token)
+
+
+class QueryRecorder:
+    """Database execute wrapper and `post_init` receiver recording the SQL
+    run and the model instances loaded within `record()`."""
+
+    def __init__(self):
+        self.queries = []
+        self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((resolver_path.get(), sql, params))
+        return execute(sql, params, many, context)
+
+    def count_row(self, **kwargs):
+        self.rows += 1
+
+    @contextmanager
+    def record(self):
+        graphene = {**settings.GRAPHENE}
+        graphene['MIDDLEWARE'] = [*graphene.get('MIDDLEWARE', []), 'core.testing.ResolverPathMiddleware']
+        post_init.connect(self.count_row, weak=False)
+        try:
+            with override_settings(GRAPHENE=graphene), connection.execute_wrapper(self):
+                yield self
+        finally:
+            post_init.disconnect(self.count_row)
+
+    def format_queries(self):
+        return '\n'.join(
+            f'{index}. [{path or "outside resolvers, e.g. a dataloader batch"}] {sql} {params!r}'
+            for index, (path, sql, params) in enumerate(self.queries, start=1)
+        )
+
+
+# the rows of a TestCase are never committed, replicas of DATABASE_REPLICA_URLS
+# wouldn't see them
+@override_settings(DATABASE_REPLICAS=[])
+class GraphQlTestHelper(TestCase):
+    def setUp(self):
+        self._client = Client()
+        # TestCase never commits, so cached responses are never invalidated
+        get_cache().clear()
+
+    def query(self, query: str, op_name: str = None, variables: dict = None):
+        """
+        Args:
+            query (string) - GraphQL query to run
+            op_name (string) - If the query is a mutation or named query, you must supply the op_name.
+                               For anonymous queries ("{ ... }"), should be None (default).
+            variables (dict) - If provided, the all $variable in GraphQL will be set to this value
+
+        Returns:
+            dict, response from graphql endpoint.  The response has the "data" key.
+                  It will have the "error" key if any error happened.
+        """
+        body = {'query': query}
+        if op_name:
+            body['operation_name'] = op_name
+        if variables:
+            body['variables'] = variables
+
+        response = self._client.post('/graphql', json.dumps(body), content_type='application/json')
+        json_response = json.loads(response.content.decode())
+        return json_response
+
+    def assertResponseNoErrors(self, resp: dict, expected: dict):
+        """
+        Assert that the resp (as returned from query) has the data from expected
+        """
+        self.assertNotIn('errors', resp, 'Response had errors')
+        self.assertEqual(resp['data'], expected, 'Response has correct data')
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries: int, max_rows: int = None):
+        """
+        Assert that the code within runs at most max_queries SQL queries and
+        loads at most max_rows model instances.
+
+        On failure every query is listed with the path of the resolver which
+        ran it.
+        """
+        with QueryRecorder().record() as recorder:
+            yield recorder
+        if len(recorder.queries) > max_queries:
+            self.fail(f'{len(recorder.queries)} queries run, the budget is {max_queries}:\n'
+                      f'{recorder.format_queries()}')
+        if max_rows is not None and recorder.rows > max_rows:
+            self.fail(f'{recorder.rows} rows fetched, the budget is {max_rows}:\n{recorder.format_queries()}')
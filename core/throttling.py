@@ -0,0 +1,60 @@
+import time
+from threading import Lock
+
+from django.conf import settings
+
+from .utils import LRUCache
+
+
+class Throttled(Exception):
+    """Raised by `Throttle.consume()`, the next attempt is allowed in `wait`
+    seconds."""
+
+    def __init__(self, wait):
+        self.wait = wait
+        super().__init__(f'Too many attempts, try again in {max(int(wait + 0.999), 1)} seconds.')
+
+
+def get_client_ip(request):
+    """Return the address of the client of `request`.
+
+    Behind proxies `GRAPHQL_CLIENT_IP_HEADER` names the header, e.g.
+    `HTTP_X_FORWARDED_FOR`, every trusted proxy appends the address it was
+    connected from to, and `GRAPHQL_TRUSTED_PROXIES` their number. Clients
+    may forge the start of the header but not what the proxies appended.
+    """
+    header = getattr(settings, 'GRAPHQL_CLIENT_IP_HEADER', None)
+    if header:
+        addresses = [address.strip() for address in request.META.get(header, '').split(',') if address.strip()]
+        proxies = getattr(settings, 'GRAPHQL_TRUSTED_PROXIES', 1)
+        if len(addresses) >= proxies:
+            return addresses[-proxies]
+    return request.META.get('REMOTE_ADDR')
+
+
+class Throttle:
+    """In-memory token buckets, one per key (e.g. an account or an IP).
+
+    Every bucket holds up to `burst` attempts and refills at `burst` per
+    `period` seconds. Buckets live in this process only and the least
+    recently used are dropped past `maxsize` keys, a dropped bucket starts
+    full again.
+    """
+
+    def __init__(self, burst, period, maxsize=10000):
+        self.burst = burst
+        self.rate = burst / period
+        self.buckets = LRUCache(maxsize)
+        self._lock = Lock()
+
+    def consume(self, key, now=None):
+        """Take an attempt from the bucket of `key`, raising `Throttled` when
+        it is empty."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self.buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self.buckets.set(key, (tokens, now))
+                raise Throttled((1 - tokens) / self.rate)
+            self.buckets.set(key, (tokens - 1, now))
@@ -11,3 +11,10 @@ class Error(graphene.ObjectType):
 
     class Meta:
         description = 'Represents an error in the input of a mutation'
+
+
+class BulkError(Error):
+    index = graphene.Int(description='Index of the item in the input list that caused the error')
+
+    class Meta:
+        description = 'Represents an error in one item of the input of a bulk mutation'
@@ -1,8 +1,11 @@
+from collections import OrderedDict
+from threading import Lock
+
 import graphene
 from django.core.exceptions import ImproperlyConfigured
 from graphene_django.registry import get_global_registry
 from graphql import GraphQLError
-from graphql_relay import from_global_id
+from graphql_relay import from_global_id, to_global_id
 
 registry = get_global_registry()
 
@@ -34,50 +37,84 @@ def get_output_fields(model, return_field_name):
     }
 
 
+_types_by_name = {}
+
+
+def get_type_by_name(type_name):
+    """Return the graphene type registered for a model under `type_name`.
+
+    The name index is rebuilt whenever new types were registered.
+    """
+    if len(_types_by_name) != len(registry._registry):
+        _types_by_name.clear()
+        _types_by_name.update((_type._meta.name, _type) for _type in registry._registry.values())
+    return _types_by_name.get(type_name)
+
+
+def fetch_nodes(pks_by_type, graphene_type=None):
+    """Return `{(type_name, pk): node}` fetching every model with one query.
+
+    `pks_by_type` maps type names to lists of string primary keys. Unknown
+    types and missing nodes are left out of the result.
+    """
+    nodes = {}
+    for type_name, pks in pks_by_type.items():
+        _type = graphene_type or get_type_by_name(type_name)
+        if _type is None:
+            continue
+        for node in _type._meta.model.objects.filter(pk__in=pks):
+            nodes[type_name, str(node.pk)] = node
+    return nodes
+
+
+def get_nodes_by_global_id(ids):
+    """Return `{global_id: node}` for every resolvable ID of `ids`.
+
+    IDs of any registered type are accepted and each model is fetched with
+    a single query. Invalid IDs and IDs of missing nodes are left out.
+    """
+    keys, pks_by_type = {}, {}
+    for graphql_id in set(ids):
+        try:
+            _type, _id = from_global_id(graphql_id)
+        except ValueError:
+            continue
+        keys[graphql_id] = (_type, _id)
+        pks_by_type.setdefault(_type, []).append(_id)
+    nodes = fetch_nodes(pks_by_type)
+    return {graphql_id: nodes[key] for graphql_id, key in keys.items() if key in nodes}
+
+
 def get_nodes(ids, graphene_type=None):
-    """Return a list of nodes.
+    """Return a list of nodes in the order of `ids`.
 
     If the `graphene_type` argument is provided, the IDs will be validated
-    against this type. If the type was not provided, it will be looked up in
-    the Graphene's registry. Raises an error if not all IDs are of the same
-    type.
+    against this type. Otherwise IDs may refer to different types, which are
+    looked up by name in the Graphene's registry; every model is fetched with
+    a single query. Raises an error listing all IDs that could not be
+    resolved.
     """
-    pks, types, invalid_ids = [], [], []
+    keys, pks_by_type, invalid_ids = [], {}, []
     error_msg = "Could not resolve to a nodes with the global id list of '{}'"
     for graphql_id in ids:
         if graphql_id:
             try:
                 _type, _id = from_global_id(graphql_id)
-            except UnicodeDecodeError:
+            except ValueError:
                 invalid_ids.append(graphql_id)
             else:
                 if graphene_type and str(graphene_type) != _type:
                     raise ValueError(f'Must receive an {graphene_type._meta.name} id.')
-                pks.append(_id)
-                types.append(_type)
+                keys.append((_type, _id))
+                pks_by_type.setdefault(_type, []).append(_id)
     if invalid_ids:
         raise GraphQLError(error_msg.format(invalid_ids))
 
-    # If `graphene_type` was not provided, check if all resolved types are
-    # the same. This prevents from accidentally mismatching IDs of different
-    # types.
-    if types and not graphene_type:
-        # get type by name
-        type_name = types[0]
-        for model, _type in registry._registry.items():
-            if _type._meta.name == type_name:
-                graphene_type = _type
-                break
-
-    nodes = list(graphene_type._meta.model.objects.filter(pk__in=pks))
-    nodes.sort(key=lambda e: pks.index(str(e.pk)))  # preserve order in pks
-    if not nodes:
-        raise GraphQLError(error_msg.format(ids))
-    nodes_pk_list = [str(node.pk) for node in nodes]
-    for pk in pks:
-        assert pk in nodes_pk_list, (
-            'There is no node of type {} with pk {}'.format(_type, pk))
-    return nodes
+    nodes = fetch_nodes(pks_by_type, graphene_type)
+    missing_ids = [to_global_id(*key) for key in keys if key not in nodes]
+    if missing_ids:
+        raise GraphQLError(error_msg.format(missing_ids))
+    return [nodes[key] for key in keys]
 
 
 def get_database_id(info, node_id, only_type):
@@ -87,3 +124,56 @@ def get_database_id(info, node_id, only_type):
     if graphene_type != only_type:
         raise AssertionError('Must receive a {only_type._meta.name} id.')
     return _id
+
+
+class LRUCache:
+    """Thread-safe bounded mapping evicting the least recently used entry.
+
+    Keeps hit/miss/eviction counters so the cache size can be tuned.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,432 @@
+from functools import partial
+from hashlib import sha256
+
+from django.conf import settings
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseNotAllowed, StreamingHttpResponse)
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import etag, require_safe
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView as BaseGraphQLView, HttpError
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.execution import ExecutionResult, execute
+from graphql.language.base import parse
+from graphql.validation import validate
+from graphql_jwt.utils import get_http_authorization
+from promise import Promise
+
+from .cost import QueryCostAnalyzer, check_query_cost
+from .dataloaders import clear_loaders
+from .db import read_from, route_operation, set_pin_cookie
+from .encoding import get_json_backend
+from .introspection import get_schema_introspection, is_introspection_only, memoize_introspection
+from .metrics import registry as metrics_registry, track_operation
+from .models import PersistedQuery
+from .response_cache import ResponseCache
+from .streaming import StreamedResult, execute_streamed
+from .utils import LRUCache
+
+document_cache = LRUCache(maxsize=getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 256))
+persisted_query_cache = LRUCache(maxsize=getattr(settings, 'GRAPHQL_PERSISTED_QUERY_CACHE_SIZE', 1024))
+
+PERSISTED_QUERY_NOT_FOUND = 'PersistedQueryNotFound'
+
+
+def get_document_hash(document_string):
+    return sha256(document_string.encode('utf-8')).hexdigest()
+
+
+def get_persisted_query(query_hash):
+    query = persisted_query_cache.get(query_hash)
+    if query is None:
+        query = PersistedQuery.objects.filter(sha256_hash=query_hash).values_list('query', flat=True).first()
+        if query is not None:
+            persisted_query_cache.set(query_hash, query)
+    return query
+
+
+def persist_query(query_hash, query):
+    PersistedQuery.objects.get_or_create(sha256_hash=query_hash, defaults={'query': query})
+    persisted_query_cache.set(query_hash, query)
+
+
+def execute_validated(schema, document_ast, validation_errors, costs, *args, **kwargs):
+    """Execute a document which was already validated against `schema`.
+
+    The static cost of the executed operation is reported in the result
+    `extensions`.
+    """
+    if validation_errors:
+        return ExecutionResult(errors=validation_errors, invalid=True)
+    result = execute(schema, document_ast, *args, **kwargs)
+    operation_name = kwargs.get('operation_name')
+    if operation_name is None and len(costs) == 1:
+        operation_name = next(iter(costs))
+
+    def add_cost(result):
+        if operation_name in costs:
+            result.extensions['cost'] = costs[operation_name]
+        return result
+
+    if Promise.is_thenable(result):
+        # `return_promise=True` executions
+        return result.then(add_cost)
+    return add_cost(result)
+
+
+class CachedDocumentBackend(GraphQLBackend):
+    """Backend parsing and validating each distinct document only once.
+
+    Documents are kept in an LRU cache keyed on the sha256 of the query text,
+    together with their validation errors, so repeated queries go straight to
+    execution. Validation includes the static cost analysis which rejects
+    documents over `GRAPHQL_MAX_QUERY_DEPTH` or `GRAPHQL_MAX_QUERY_COST`.
+    Documents only selecting introspection fields, e.g. the schema queries
+    of GraphiQL, are executed once and their result reused.
+    """
+
+    def __init__(self, cache, executor=None):
+        self.cache = cache
+        self.execute_params = {'executor': executor}
+
+    def document_from_string(self, schema, document_string):
+        key = (id(schema), get_document_hash(document_string))
+        document = self.cache.get(key)
+        if document is None:
+            document_ast = parse(document_string)
+            validation_errors, cost_errors, stream_cost_errors = validate(schema, document_ast), [], []
+            costs, models = {}, set()
+            if not validation_errors:
+                analyzer = QueryCostAnalyzer(schema, document_ast)
+                costs, models = analyzer.analyze(), analyzer.models
+                limits = {
+                    'max_cost': getattr(settings, 'GRAPHQL_MAX_QUERY_COST', 5000),
+                    'max_depth': getattr(settings, 'GRAPHQL_MAX_QUERY_DEPTH', 10),
+                }
+                cost_errors = check_query_cost(costs, **limits)
+                stream_cost_errors = check_query_cost(analyzer.analyze(streamed=True), **limits)
+                costs = {operation_name: cost for operation_name, (cost, _) in costs.items()}
+            execute = partial(execute_validated, schema, document_ast, validation_errors + cost_errors, costs,
+                              **self.execute_params)
+            if not validation_errors and not cost_errors and is_introspection_only(document_ast):
+                execute = memoize_introspection(schema, document_string, execute, costs)
+            document = GraphQLDocument(
+                schema=schema,
+                document_string=document_string,
+                document_ast=document_ast,
+                execute=execute,
+            )
+            document.valid = not validation_errors and not cost_errors
+            # the page size of streamed connections is bounded by their number of rows instead of their cost
+            document.stream_errors = validation_errors + stream_cost_errors
+            document.document_hash = key[1]
+            # used as invalidation tags of cached responses
+            document.models = models
+            self.cache.set(key, document)
+        return document
+
+
+class GraphQLView(BaseGraphQLView):
+    """GraphQL endpoint reusing parsed and validated documents across requests.
+
+    Supports automatic persisted queries: a client may send only the sha256
+    hash of a document in `extensions.persistedQuery`. Unknown hashes are
+    answered with `PersistedQueryNotFound`, after which the client resends
+    the hash together with the query text to register it. Query operations
+    sent over GET are cacheable by HTTP caches when made anonymously.
+
+    Results of anonymous query operations are also kept in the Django cache
+    and invalidated whenever a model they select is written.
+
+    A JSON array of operations is executed as a batch, in order, sharing the
+    request context: the user is authenticated once and the dataloaders are
+    reused across the operations. Results are returned as an array in the
+    same order.
+
+    Staff users may set `extensions.stream` on a query selecting a single
+    connection, e.g. to export posts. Its edges are then read and written
+    to a `StreamingHttpResponse` `GRAPHQL_STREAM_CHUNK_SIZE` at a time, see
+    `core.streaming`, and a page may hold up to `GRAPHQL_STREAM_MAX_LIMIT`
+    edges. The page size doesn't count in the query cost, the depth and the
+    cost of a single edge are still checked.
+    """
+
+    def __init__(self, *args, backend=None, **kwargs):
+        if backend is None:
+            backend = CachedDocumentBackend(document_cache)
+        super().__init__(*args, backend=backend, **kwargs)
+        self.query_to_persist = None
+        self.cacheable = False
+        self.stream = False
+        self.streamed_response = None
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if self.streamed_response is not None:
+            response = self.streamed_response
+        self.add_cache_headers(request, response)
+        set_pin_cookie(request, response)
+        return response
+
+    def add_cache_headers(self, request, response):
+        if request.method.lower() == 'get' and response.get('Content-Type') == 'application/json':
+            patch_vary_headers(response, ['Authorization', 'Cookie'])
+            if self.cacheable and response.status_code == 200 and self.is_anonymous(request):
+                patch_cache_control(response, public=True, max_age=getattr(settings, 'GRAPHQL_GET_CACHE_MAX_AGE', 60))
+            else:
+                patch_cache_control(response, private=True, no_cache=True)
+
+    def parse_body(self, request):
+        if self.get_content_type(request) == 'application/json':
+            self.batch = request.body.lstrip().startswith(b'[')
+            data = self.parse_json_body(request)
+        else:
+            data = super().parse_body(request)
+        if self.batch:
+            max_batch_size = getattr(settings, 'GRAPHQL_MAX_BATCH_SIZE', 10)
+            if len(data) > max_batch_size:
+                raise HttpError(HttpResponseBadRequest(
+                    f'Batches are limited to {max_batch_size} operations, received {len(data)}.'))
+            if not all(isinstance(entry, dict) for entry in data):
+                raise HttpError(HttpResponseBadRequest('Every operation of a batch must be a JSON object.'))
+        return data
+
+    def parse_json_body(self, request):
+        try:
+            data = get_json_backend().loads(request.body)
+        except ValueError:
+            raise HttpError(HttpResponseBadRequest('POST body sent invalid JSON.'))
+        if self.batch:
+            if not isinstance(data, list) or not data:
+                raise HttpError(HttpResponseBadRequest('Batch requests should receive a non-empty list.'))
+        elif not isinstance(data, dict):
+            raise HttpError(HttpResponseBadRequest('The received data is not a valid JSON query.'))
+        return data
+
+    def json_encode(self, request, d, pretty=False):
+        return get_json_backend().dumps(d, pretty=self.pretty or pretty or bool(request.GET.get('pretty')))
+
+    @staticmethod
+    def is_anonymous(request):
+        """Whether `request` carries no credentials at all: no Authorization
+        header, no JWT cookie and no session user."""
+        return 'HTTP_AUTHORIZATION' not in request.META and get_http_authorization(request) is None \
+            and not request.user.is_authenticated
+
+    @staticmethod
+    def get_extensions(request, data):
+        extensions = request.GET.get('extensions') or data.get('extensions') or {}
+        if isinstance(extensions, str):
+            try:
+                extensions = get_json_backend().loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest('Extensions are invalid JSON.'))
+        if not isinstance(extensions, dict):
+            raise HttpError(HttpResponseBadRequest('Extensions should be an object.'))
+        return extensions
+
+    def get_graphql_params(self, request, data):
+        self.query_to_persist = None
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+        extensions = self.get_extensions(request, data)
+        persisted_query = extensions.get('persistedQuery')
+        if persisted_query:
+            query = self.resolve_persisted_query(query, persisted_query)
+        self.stream = bool(extensions.get('stream'))
+        if self.stream and self.batch:
+            raise HttpError(HttpResponseBadRequest('Operations of a batch can\'t be streamed.'))
+        return query, variables, operation_name, id
+
+    def resolve_persisted_query(self, query, persisted_query):
+        if not isinstance(persisted_query, dict):
+            raise HttpError(HttpResponseBadRequest('The persisted query extension should be an object.'))
+        if persisted_query.get('version') != 1:
+            raise HttpError(HttpResponseBadRequest('Unsupported persisted query version.'))
+        query_hash = persisted_query.get('sha256Hash')
+        if not query:
+            query = get_persisted_query(query_hash)
+            if query is None:
+                raise HttpError(HttpResponse(), PERSISTED_QUERY_NOT_FOUND)
+        elif get_document_hash(query) != query_hash:
+            raise HttpError(HttpResponseBadRequest('Provided sha256Hash does not match query.'))
+        else:
+            self.query_to_persist = (query_hash, query)
+        return query
+
+    def get_response(self, request, data, show_graphiql=False):
+        try:
+            query, variables, operation_name, id = self.get_graphql_params(request, data)
+            execution_result = self.execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+        except HttpError as e:
+            return self.encode_batch_error(request, data, e)
+        return self.encode_execution_result(request, execution_result, id, show_graphiql)
+
+    def encode_batch_error(self, request, data, error):
+        """Answer a failed operation of a batch without failing the others."""
+        if not self.batch:
+            raise error
+        status_code = error.response.status_code
+        response = {'errors': [self.format_error(error)], 'id': data.get('id'), 'status': status_code}
+        return self.json_encode(request, response), status_code
+
+    def encode_execution_result(self, request, execution_result, id, show_graphiql=False):
+        """Return the `(body, status_code)` answering a request."""
+        if not execution_result:
+            return None, 200
+        if isinstance(execution_result, StreamedResult):
+            self.streamed_response = self.get_streamed_response(request, execution_result)
+            return None, 200
+
+        status_code = 200
+        response = {}
+        if execution_result.errors:
+            response['errors'] = [self.format_error(e) for e in execution_result.errors]
+        if execution_result.invalid:
+            status_code = 400
+        else:
+            response['data'] = execution_result.data
+        if execution_result.extensions:
+            response['extensions'] = execution_result.extensions
+        if self.batch:
+            response['id'] = id
+            response['status'] = status_code
+
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        document, response_cache, result = self.prepare_execution(
+            request, query, variables, operation_name, show_graphiql)
+        if document is None or result is not None:
+            return result
+        if self.stream:
+            return self.execute_streamed(request, document, variables, operation_name)
+
+        operation_type = document.get_operation_type(operation_name)
+        routing = route_operation(request, operation_type, fills_cache=response_cache is not None)
+        try:
+            with routing, track_operation(operation_type, operation_name) as stats:
+                result = document.execute(**self.get_execute_options(request, variables, operation_name))
+                stats.failed = bool(result.errors)
+        except Exception as e:
+            return ExecutionResult(errors=[e], invalid=True)
+
+        self.store_result(request, document, operation_name, result, response_cache)
+        return result
+
+    def execute_streamed(self, request, document, variables, operation_name):
+        """Return the `StreamedResult` of `document`, or an `ExecutionResult`
+        when it failed before streaming."""
+        if document.stream_errors:
+            return ExecutionResult(errors=document.stream_errors, invalid=True)
+        options = self.get_execute_options(request, variables, operation_name)
+        options.pop('executor', None)
+        try:
+            with route_operation(request, 'query') as replica:
+                result = execute_streamed(
+                    self.schema, document.document_ast, getattr(settings, 'GRAPHQL_STREAM_CHUNK_SIZE', 100), **options)
+        except Exception as e:
+            return ExecutionResult(errors=[e], invalid=True)
+        if isinstance(result, StreamedResult):
+            # the rows are read while streaming, from the replica that
+            # resolved the connection
+            result.replica = replica
+        return result
+
+    def get_streamed_response(self, request, result):
+        operation_name = result.exe_context.operation.name
+
+        def stream():
+            with read_from(result.replica), \
+                    track_operation('query', operation_name and operation_name.value) as stats:
+                yield from result.iter_json(partial(self.json_encode, request), self.format_error)
+                stats.failed = bool(result.errors)
+
+        return StreamingHttpResponse(stream(), content_type='application/json')
+
+    def prepare_execution(self, request, query, variables, operation_name, show_graphiql=False):
+        """Return `(document, response_cache, result)` for a request.
+
+        `result` is set when the request is answered without executing the
+        document: invalid documents and cached responses. `document` is None
+        when there is nothing to execute.
+        """
+        if not query:
+            if show_graphiql:
+                return None, None, None
+            raise HttpError(HttpResponseBadRequest('Must provide query string.'))
+
+        try:
+            document = self.get_backend(request).document_from_string(self.schema, query)
+        except Exception as e:
+            return None, None, ExecutionResult(errors=[e], invalid=True)
+
+        if document.valid and self.query_to_persist:
+            # registered only once the document turned out to be valid
+            persist_query(*self.query_to_persist)
+
+        operation_type = document.get_operation_type(operation_name)
+        if request.method.lower() == 'get' and operation_type and operation_type != 'query':
+            if show_graphiql:
+                return None, None, None
+            raise HttpError(HttpResponseNotAllowed(
+                ['POST'], f'Can only perform a {operation_type} operation from a POST request.'))
+
+        response_cache = None
+        if operation_type == 'query' and self.is_anonymous(request):
+            response_cache = ResponseCache(document, variables, operation_name)
+            cached = response_cache.get()
+            if cached is not None:
+                self.cacheable = True
+                return document, response_cache, ExecutionResult(data=cached[0], extensions=cached[1])
+        return document, response_cache, None
+
+    def get_execute_options(self, request, variables, operation_name):
+        options = {
+            'root': self.get_root_value(request),
+            'variables': variables,
+            'operation_name': operation_name,
+            'context': self.get_context(request),
+            'middleware': self.get_middleware(request),
+        }
+        if self.executor:
+            options['executor'] = self.executor
+        return options
+
+    def store_result(self, request, document, operation_name, result, response_cache):
+        if document.get_operation_type(operation_name) == 'mutation':
+            # following operations of a batch must not see rows loaded before the writes
+            clear_loaders(self.get_context(request))
+        if not result.invalid:
+            self.cacheable = not result.errors
+            if response_cache is not None and self.cacheable:
+                response_cache.set(result.data, result.extensions)
+
+
+def metrics(request):
+    """Expose the metrics of this process in the Prometheus text format.
+
+    Only scrapers sending `Authorization: Bearer <GRAPHQL_METRICS_TOKEN>` are
+    answered, the endpoint is closed while no token is configured.
+    """
+    token = getattr(settings, 'GRAPHQL_METRICS_TOKEN', None)
+    if not token or not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def get_schema_version(request, *args, **kwargs):
+    return get_schema_introspection(graphene_settings.SCHEMA).version
+
+
+@require_safe
+@etag(get_schema_version)
+def schema_definition(request, format):
+    """Serve the SDL (`graphql`) or introspection result (`json`) of the
+    schema for code generators, computed once per process."""
+    introspection = get_schema_introspection(graphene_settings.SCHEMA)
+    if format == 'json':
+        return HttpResponse(get_json_backend().dumps({'data': introspection.result}), content_type='application/json')
+    return HttpResponse(introspection.sdl, content_type='text/plain; charset=utf-8')
@@ -1,6 +1,7 @@
 import graphene
 import graphql_jwt
 
+from accounts.mutations import ObtainJSONWebToken
 from accounts.schema import UserQuery, UserMutation
 from blog.schema import PostQuery, PostMutation
 
@@ -10,7 +11,7 @@ class Query(PostQuery, UserQuery):
 
 
 class Mutation(PostMutation, UserMutation):
-    token_auth = graphql_jwt.ObtainJSONWebToken.Field()
+    token_auth = ObtainJSONWebToken.Field()
     verify_token = graphql_jwt.Verify.Field()
     refresh_token = graphql_jwt.Refresh.Field()
 
@@ -0,0 +1,13 @@
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vlog.settings')
+
+django.setup()
+
+from core.asgi import GraphQLASGIHandler  # noqa: E402 needs configured settings
+from core.introspection import warm_up  # noqa: E402
+
+application = GraphQLASGIHandler()
+warm_up()
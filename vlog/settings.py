@@ -1,3 +1,4 @@
+import importlib.util
 import os
 
 import dj_database_url
@@ -18,8 +19,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'graphene_django',
-
-    'django_extensions',
+    'django_filters',
 
     # apps
     'accounts',
@@ -27,6 +27,10 @@ INSTALLED_APPS = [
     'blog',
 ]
 
+# development only, not part of requirements.txt
+if DEBUG and importlib.util.find_spec('django_extensions'):
+    INSTALLED_APPS.append('django_extensions')
+
 SHELL_PLUS = "ipython"
 
 MIDDLEWARE = [
@@ -41,7 +45,9 @@ MIDDLEWARE = [
 ]
 
 AUTHENTICATION_BACKENDS = [
-    'graphql_jwt.backends.JSONWebTokenBackend',
+    'accounts.backends.CachedJSONWebTokenBackend',
+    'accounts.backends.PasswordHashingPoolBackend',
+    # only loads the users of existing sessions, password logins stop at the backend above
     'django.contrib.auth.backends.ModelBackend',
 ]
 
@@ -72,6 +78,32 @@ DATABASES = {
     )
 }
 
+# Read replicas of the default (primary) database as comma separated URLs,
+# e.g. locally DATABASE_REPLICA_URLS=sqlite:////tmp/replica.db
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(','))):
+    DATABASES[f'replica{index}'] = {
+        **dj_database_url.parse(url, conn_max_age=600),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+
+# Seconds a client reads from the primary after a mutation, and the cache
+# alias pinning clients authenticated with a header
+GRAPHQL_REPLICA_PIN_SECONDS = 10
+GRAPHQL_REPLICA_PIN_CACHE_ALIAS = 'default'
+
+# Local memory caches are per process; point `default` to a shared cache
+# (memcached, redis) when running several workers so response cache
+# invalidation reaches all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -105,5 +137,79 @@ GRAPHENE = {
     'SCHEMA': 'schema.schema',
     'MIDDLEWARE': [
         'graphql_jwt.middleware.JSONWebTokenMiddleware',
+        'core.metrics.MetricsMiddleware',
     ],
+    'RELAY_CONNECTION_MAX_LIMIT': 100,
 }
+
+# Number of parsed and validated GraphQL documents kept in memory
+GRAPHQL_DOCUMENT_CACHE_SIZE = 256
+
+# Number of persisted query documents kept in memory in front of the database
+GRAPHQL_PERSISTED_QUERY_CACHE_SIZE = 1024
+
+# Seconds HTTP caches may keep anonymous GET query responses
+GRAPHQL_GET_CACHE_MAX_AGE = 60
+
+# Maximum number of operations sent in one batch (a JSON array) to the endpoint
+GRAPHQL_MAX_BATCH_SIZE = 10
+
+# Maximum number of items created, updated or deleted by one bulk mutation
+GRAPHQL_MAX_BULK_ITEMS = 100
+
+# Documents nested deeper or estimated to cost more are rejected before execution
+GRAPHQL_MAX_QUERY_DEPTH = 10
+GRAPHQL_MAX_QUERY_COST = 5000
+
+# Cache alias and timeout (seconds) of cached anonymous query results
+GRAPHQL_RESPONSE_CACHE_ALIAS = 'default'
+GRAPHQL_RESPONSE_CACHE_TIMEOUT = 300
+
+# Number of decoded JWT payloads kept in memory until the tokens expire
+GRAPHQL_JWT_CLAIMS_CACHE_SIZE = 1024
+
+# Cache alias and timeout (seconds) of users authenticated by a JWT
+GRAPHQL_USER_CACHE_ALIAS = 'default'
+GRAPHQL_USER_CACHE_TIMEOUT = 60
+
+# Threads running blocking code (ORM, caches) of requests served by `vlog.asgi`
+GRAPHQL_ASGI_THREAD_POOL_SIZE = 8
+
+# Rows read from the database and edges serialized at a time by streamed
+# queries, and the maximum number of edges of a streamed page
+GRAPHQL_STREAM_CHUNK_SIZE = 100
+GRAPHQL_STREAM_MAX_LIMIT = 10000
+
+# Introspection result written by `manage.py build_introspection`, read at
+# startup instead of introspecting the schema when built from the same schema
+GRAPHQL_INTROSPECTION_FILE = os.environ.get('GRAPHQL_INTROSPECTION_FILE')
+
+# Threads hashing and verifying passwords, and calls waiting for one before
+# further calls are rejected
+GRAPHQL_PASSWORD_HASHING_WORKERS = 2
+GRAPHQL_PASSWORD_HASHING_QUEUE_SIZE = 8
+
+# Password attempts (logins and registrations) allowed per IP, per account
+# from an IP and per account from all IPs, as (burst, seconds to refill the
+# burst)
+GRAPHQL_PASSWORD_THROTTLES = {
+    'ip': (20, 60),
+    'account_ip': (5, 60),
+    'account': (30, 300),
+}
+
+# Header holding the client address behind proxies, e.g. HTTP_X_FORWARDED_FOR,
+# and number of trusted proxies appending to it; REMOTE_ADDR is used when unset
+GRAPHQL_CLIENT_IP_HEADER = os.environ.get('GRAPHQL_CLIENT_IP_HEADER')
+GRAPHQL_TRUSTED_PROXIES = int(os.environ.get('GRAPHQL_TRUSTED_PROXIES', 1))
+
+# Decoder of request bodies and encoder of responses. orjson is part of the
+# requirements; the orjson backend falls back to the stdlib `json` one, with
+# a warning, when it isn't installed
+GRAPHQL_JSON_BACKEND = 'core.encoding.OrjsonBackend'
+
+# Fraction of operations recording per-field latencies exposed at /metrics
+GRAPHQL_METRICS_FIELD_SAMPLE_RATE = 0.1
+
+# Bearer token scrapers of /metrics must send, /metrics is closed when unset
+GRAPHQL_METRICS_TOKEN = os.environ.get('GRAPHQL_METRICS_TOKEN')
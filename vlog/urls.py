@@ -1,9 +1,13 @@
 from django.contrib import admin
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
+
+from core.views import GraphQLView, metrics, schema_definition
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('graphql', csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path('graphql/schema.graphql', schema_definition, {'format': 'graphql'}),
+    path('graphql/schema.json', schema_definition, {'format': 'json'}),
+    path('metrics', metrics),
 ]
@@ -5,3 +5,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vlog.settings')
 
 application = get_wsgi_application()
+
+from core.introspection import warm_up  # noqa: E402 needs configured settings
+
+warm_up()